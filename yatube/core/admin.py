@@ -0,0 +1,73 @@
+"""
+Общие настройки админки для больших таблиц.
+
+ScalableModelAdmin не считает полное число строк и кэширует COUNT(*)
+страницы списка. Автокомплит в list_editable берет подпись значения из
+объекта, уже загруженного select_related.
+"""
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.forms import BaseModelFormSet
+
+from .paginator import CachedCountPaginator
+
+ADMIN_COUNT_KEY = 'admin'
+
+
+class JoinedAutocompleteSelect(AutocompleteSelect):
+    """AutocompleteSelect, которому можно заранее дать выбранный объект."""
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.selected
+        if obj is None or [str(v) for v in value] != [str(obj.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, obj.pk, self.choices.field.label_from_instance(obj),
+            {str(obj.pk)}, len(options)))
+        return [(None, options, 0)]
+
+
+class JoinedChoicesFormSet(BaseModelFormSet):
+    """Формы list_editable без запроса подписи на каждую строку."""
+
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if not isinstance(widget, JoinedAutocompleteSelect):
+                continue
+            model_field = form.instance._meta.get_field(name)
+            if model_field.is_cached(form.instance):
+                widget.selected = model_field.get_cached_value(form.instance)
+        return form
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    show_full_result_count = False
+    paginator = CachedCountPaginator
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if ('widget' not in kwargs
+                and db_field.name in self.get_autocomplete_fields(request)):
+            kwargs['widget'] = JoinedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_formset(self, request, **kwargs):
+        kwargs.setdefault('formset', JoinedChoicesFormSet)
+        return super().get_changelist_formset(request, **kwargs)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page,
+            count_key=ADMIN_COUNT_KEY,
+            count_timeout=settings.ADMIN_COUNT_TIMEOUT,
+        )
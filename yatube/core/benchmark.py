@@ -0,0 +1,65 @@
+"""Общие помощники для management-команд с замерами."""
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+
+
+@contextmanager
+def scratch_database(verbosity=0):
+    """Временная тестовая база: замеры не трогают рабочие данные."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity)
+
+
+@contextmanager
+def file_database(path, **overrides):
+    """
+    Подключение default к файлу SQLite path: процессы замера, созданные
+    через fork, работают с одной базой.
+    """
+    saved = {key: connection.settings_dict[key]
+             for key in ('NAME', *overrides)}
+    connection.close()
+    connection.settings_dict.update(NAME=path, **overrides)
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict.update(saved)
+
+
+def isolated_settings(directory):
+    """Общий кэш и файлы замера во временном каталоге, без метрик."""
+    caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+    caches['shared']['LOCATION'] = os.path.join(directory, 'shared.bin')
+    return override_settings(
+        CACHES=caches, METRICS_DIR=None, QUERY_BUDGET_CHECKS=False,
+        MEDIA_ROOT=os.path.join(directory, 'media'))
+
+
+def measure(func, repeat=1):
+    """Возвращает список длительностей вызовов в секундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1,
+                      round(percent / 100 * len(ordered)) - 1))
+    return ordered[rank]
@@ -0,0 +1,288 @@
+"""
+Кэш в общем отображенном в память файле.
+
+Все воркеры одной машины открывают один и тот же файл (LOCATION),
+поэтому видят одни и те же записи, а clear() очищает кэш для всех.
+
+Файл разбит на слэбы: классы слотов фиксированного размера
+(OPTIONS['SLABS'] - словарь «размер слота: число слотов»). Запись
+кладется в самый маленький класс, куда она помещается, в слот
+hash(key) % count с линейным пробированием на PROBES слотов. Если
+свободного слота в окне нет, вытесняется давно не читавшийся
+(выборочный LRU, как в Redis). Доступ разных процессов упорядочен
+блокировкой fcntl.flock на файле, потоков - обычным Lock.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MAGIC = b'YTBCACH1'
+# magic, счетчик обращений (часы LRU), число классов
+FILE_HEADER = struct.Struct('<8sQI')
+# размер слота, число слотов
+SLAB_HEADER = struct.Struct('<II')
+# занят, хэш ключа, длина ключа, длина значения, срок, последнее чтение
+SLOT_HEADER = struct.Struct('<BQHIdQ')
+MAX_SLABS = 16
+DEFAULT_SLABS = {
+    1024: 4096,
+    4096: 2048,
+    16384: 1024,
+    65536: 256,
+}
+DEFAULT_PROBES = 8
+# Значение испорчено (процесс упал посреди записи) - считаем промахом
+UNPICKLING_ERRORS = (
+    pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+    IndexError, TypeError, ValueError,
+)
+
+
+class SharedMemoryCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        slabs = options.get('SLABS', DEFAULT_SLABS)
+        self._slabs = sorted((int(size), int(count))
+                             for size, count in slabs.items())
+        if not self._slabs or len(self._slabs) > MAX_SLABS:
+            raise ValueError(f'SLABS must define 1..{MAX_SLABS} classes')
+        self._probes = int(options.get('PROBES', DEFAULT_PROBES))
+        self._path = location
+        self._thread_lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._map = None
+        self._offsets = []
+        offset = FILE_HEADER.size + SLAB_HEADER.size * MAX_SLABS
+        for size, count in self._slabs:
+            if size <= SLOT_HEADER.size:
+                raise ValueError('Slot size is smaller than its header')
+            self._offsets.append(offset)
+            offset += size * count
+        self._size = offset
+
+    # Файл и блокировки
+
+    def _open(self):
+        """Открывает файл заново в каждом процессе: flock после fork общий."""
+        if self._pid == os.getpid():
+            return
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            layout = self._layout()
+            header = os.pread(fd, len(layout), 0)
+            size = os.fstat(fd).st_size
+            if size != self._size or not self._layout_matches(header):
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self._size)
+                os.pwrite(fd, layout, 0)
+            self._map = mmap.mmap(fd, self._size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._file = fd
+        self._pid = os.getpid()
+
+    def _layout(self):
+        header = FILE_HEADER.pack(MAGIC, 0, len(self._slabs))
+        for size, count in self._slabs:
+            header += SLAB_HEADER.pack(size, count)
+        return header
+
+    def _layout_matches(self, header):
+        """Файл размечен теми же слэбами (часы LRU не сравниваются)."""
+        layout = self._layout()
+        return (
+            header[:8] == MAGIC
+            and header[FILE_HEADER.size:] == layout[FILE_HEADER.size:]
+        )
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            self._open()
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def _tick(self):
+        magic, clock, slabs = FILE_HEADER.unpack_from(self._map, 0)
+        FILE_HEADER.pack_into(self._map, 0, magic, clock + 1, slabs)
+        return clock + 1
+
+    # Слоты
+
+    def _digest(self, key):
+        return int.from_bytes(
+            hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+    def _window(self, index, digest):
+        size, count = self._slabs[index]
+        start = digest % count
+        for step in range(min(self._probes, count)):
+            yield self._offsets[index] + size * ((start + step) % count)
+
+    def _find(self, key, digest):
+        """Ищет слот с ключом во всех классах, пропуская просроченные."""
+        for index in range(len(self._slabs)):
+            for offset in self._window(index, digest):
+                used, slot_digest, key_len, value_len, expires, _ = (
+                    SLOT_HEADER.unpack_from(self._map, offset))
+                if not used or slot_digest != digest:
+                    continue
+                start = offset + SLOT_HEADER.size
+                if self._map[start:start + key_len] != key:
+                    continue
+                if expires and expires <= time.time():
+                    self._map[offset] = 0
+                    return None
+                return offset, key_len, value_len, expires
+        return None
+
+    def _read(self, key, digest):
+        found = self._find(key, digest)
+        if found is None:
+            return None
+        offset, key_len, value_len, expires = found
+        SLOT_HEADER.pack_into(
+            self._map, offset, 1, digest, key_len, value_len, expires,
+            self._tick())
+        start = offset + SLOT_HEADER.size + key_len
+        return self._map[start:start + value_len]
+
+    def _write(self, key, digest, pickled, expires):
+        found = self._find(key, digest)
+        if found is not None:
+            self._map[found[0]] = 0
+        need = SLOT_HEADER.size + len(key) + len(pickled)
+        for index, (size, _) in enumerate(self._slabs):
+            if need <= size:
+                break
+        else:
+            return False
+        victim = None
+        victim_used = None
+        now = time.time()
+        for offset in self._window(index, digest):
+            used, _, _, _, slot_expires, last_used = (
+                SLOT_HEADER.unpack_from(self._map, offset))
+            if not used or (slot_expires and slot_expires <= now):
+                victim = offset
+                break
+            if victim is None or last_used < victim_used:
+                victim, victim_used = offset, last_used
+        # Пока пишутся данные, слот свободен: если процесс упадет посреди
+        # записи, читатели не увидят старый заголовок с новыми байтами
+        self._map[victim] = 0
+        start = victim + SLOT_HEADER.size
+        self._map[start:start + len(key)] = key
+        self._map[start + len(key):start + len(key) + len(pickled)] = pickled
+        SLOT_HEADER.pack_into(
+            self._map, victim, 1, digest, len(key), len(pickled),
+            expires or 0.0, self._tick())
+        return True
+
+    def _prepare(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        key = key.encode()
+        return key, self._digest(key)
+
+    # API Django
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key, digest = self._prepare(key, version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._locked():
+            if self._find(key, digest) is not None:
+                return False
+            return self._write(
+                key, digest, pickled, self.get_backend_timeout(timeout))
+
+    def get(self, key, default=None, version=None):
+        key, digest = self._prepare(key, version)
+        with self._locked():
+            pickled = self._read(key, digest)
+        if pickled is None:
+            return default
+        try:
+            return pickle.loads(pickled)
+        except UNPICKLING_ERRORS:
+            return default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key, digest = self._prepare(key, version)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._locked():
+            self._write(
+                key, digest, pickled, self.get_backend_timeout(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key, digest = self._prepare(key, version)
+        with self._locked():
+            found = self._find(key, digest)
+            if found is None:
+                return False
+            offset, key_len, value_len, _ = found
+            SLOT_HEADER.pack_into(
+                self._map, offset, 1, digest, key_len, value_len,
+                self.get_backend_timeout(timeout) or 0.0, self._tick())
+            return True
+
+    def delete(self, key, version=None):
+        key, digest = self._prepare(key, version)
+        with self._locked():
+            found = self._find(key, digest)
+            if found is not None:
+                self._map[found[0]] = 0
+
+    def has_key(self, key, version=None):
+        key, digest = self._prepare(key, version)
+        with self._locked():
+            return self._find(key, digest) is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись под блокировкой."""
+        key, digest = self._prepare(key, version)
+        with self._locked():
+            found = self._find(key, digest)
+            if found is None:
+                raise ValueError("Key '%s' not found" % key.decode())
+            pickled = self._read(key, digest)
+            try:
+                value = pickle.loads(pickled) + delta
+            except UNPICKLING_ERRORS:
+                # Испорченное значение: как при промахе, его заменит add
+                self._map[found[0]] = 0
+                raise ValueError("Key '%s' not found" % key.decode())
+            self._write(
+                key, digest, pickle.dumps(value, self.pickle_protocol),
+                found[3])
+        return value
+
+    def clear(self):
+        with self._locked():
+            for index, (size, count) in enumerate(self._slabs):
+                for slot in range(count):
+                    self._map[self._offsets[index] + size * slot] = 0
+
+    def close(self, **kwargs):
+        # Отображение живет до конца процесса: закрывать его после
+        # каждого запроса дорого, а файл общий.
+        pass
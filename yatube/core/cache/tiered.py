@@ -0,0 +1,292 @@
+"""
+Двухуровневый кэш с защитой от лавины промахов.
+
+L1 - небольшой LRU в памяти процесса с коротким TTL, L2 - общий
+бэкенд (OPTIONS['L2'] - алиас или сам бэкенд, по умолчанию 'shared').
+Записи с конечным TTL хранятся в L2 вместе с мягким сроком и временем
+последней пересборки.
+
+Защита работает в get_or_set (его же вызывает тег {% cache %} из
+core.templatetags.fragment_cache); обычный get блокировок не берет и
+после мягкого срока возвращает промах:
+
+* вероятностная ранняя пересборка (XFetch): незадолго до мягкого срока
+  отдельный get_or_set с вероятностью, растущей к сроку, пересобирает
+  запись, пока остальные читают старую;
+* single-flight: пересборка берет в L2 блокировку и всегда снимает ее,
+  даже если значение не сохранено; остальные получают устаревшее
+  значение (оно живет в L2 еще GRACE секунд) или недолго ждут готового.
+
+Ключи с префиксами из OPTIONS['L2_ONLY'] (поколения кэша, которые
+другие процессы меняют через incr) не кладутся в L1 и читаются из L2.
+"""
+import math
+import os
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+Entry = namedtuple('Entry', 'value expires delta')
+
+_stats = {}
+_stats_lock = threading.Lock()
+_tracked = threading.local()
+
+
+def stats():
+    """Счетчики попаданий, промахов и пересборок этого процесса."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def count(name):
+    with _stats_lock:
+        _stats[name] = _stats.get(name, 0) + 1
+    tracked = getattr(_tracked, 'stats', None)
+    if tracked is not None:
+        tracked[name] = tracked.get(name, 0) + 1
+
+
+@contextmanager
+def track():
+    """Счетчики одного потока на время блока (для метрик запроса)."""
+    previous = getattr(_tracked, 'stats', None)
+    _tracked.stats = {}
+    try:
+        yield _tracked.stats
+    finally:
+        _tracked.stats = previous
+
+
+class TieredCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2 = options.get('L2', 'shared')
+        self._l1_timeout = options.get('L1_TIMEOUT', 2)
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 512)
+        self._grace = options.get('GRACE', 60)
+        self._beta = options.get('BETA', 1.0)
+        self._lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self._wait_timeout = options.get('WAIT_TIMEOUT', 0.5)
+        self._l2_only = tuple(options.get('L2_ONLY', ()))
+        self._l1 = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def l2(self):
+        if isinstance(self._l2, str):
+            return caches[self._l2]
+        return self._l2
+
+    # L1
+
+    def _l1_get(self, key):
+        with self._l1_lock:
+            item = self._l1.get(key)
+            if item is None:
+                return None
+            stored_until, pickled = item
+            if stored_until <= time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def _l1_set(self, key, stored):
+        pickled = pickle.dumps(stored, self.pickle_protocol)
+        with self._l1_lock:
+            self._l1[key] = (time.monotonic() + self._l1_timeout, pickled)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._l1_lock:
+            self._l1.pop(key, None)
+
+    # Пересборка
+
+    def _rebuilding(self):
+        if not hasattr(self._local, 'keys'):
+            self._local.keys = {}
+        return self._local.keys
+
+    def _lock_key(self, key):
+        return f'rebuild:{key}'
+
+    def _acquire(self, key):
+        """Берет блокировку пересборки; True - пересобирать нам."""
+        rebuilding = self._rebuilding()
+        if key in rebuilding:
+            return True
+        token = f'{os.getpid()}:{threading.get_ident()}:{time.time()}'
+        if self.l2.add(self._lock_key(key), token, self._lock_timeout,
+                       version=0):
+            rebuilding[key] = (token, time.monotonic())
+            return True
+        return False
+
+    def _release(self, key):
+        """Снимает блокировку и возвращает длительность пересборки."""
+        held = self._rebuilding().pop(key, None)
+        if held is None:
+            return None
+        token, started = held
+        if self.l2.get(self._lock_key(key), version=0) == token:
+            self.l2.delete(self._lock_key(key), version=0)
+        return time.monotonic() - started
+
+    def _is_fresh(self, entry, early=False):
+        if entry.expires is None:
+            return True
+        now = time.time()
+        if early and entry.delta > 0:
+            # XFetch: now - delta * beta * ln(rand) >= expires
+            now -= entry.delta * self._beta * math.log(
+                random.random() or 1e-12)
+        return now < entry.expires
+
+    def _wait(self, key):
+        deadline = time.monotonic() + self._wait_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.01)
+            stored = self.l2.get(key, version=0)
+            if stored is not None:
+                return stored
+            if not self.l2.has_key(self._lock_key(key), version=0):
+                break
+        return None
+
+    def _in_l1(self, key):
+        """Можно ли держать ключ (до make_key) в L1."""
+        return not key.startswith(self._l2_only)
+
+    def _lookup(self, key, l1, early=False):
+        """(свежая ли, запись или None) из L1, затем из L2."""
+        stored = self._l1_get(key) if l1 else None
+        if stored is not None and (
+                not isinstance(stored, Entry)
+                or self._is_fresh(stored, early)):
+            count('l1_hits')
+            return True, stored
+        stored = self.l2.get(key, version=0)
+        if stored is not None and (
+                not isinstance(stored, Entry)
+                or self._is_fresh(stored, early)):
+            count('l2_hits')
+            if l1:
+                self._l1_set(key, stored)
+            return True, stored
+        return False, stored
+
+    @staticmethod
+    def _value(stored):
+        return stored.value if isinstance(stored, Entry) else stored
+
+    # API Django
+
+    def get(self, key, default=None, version=None):
+        l1 = self._in_l1(key)
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        fresh, stored = self._lookup(key, l1)
+        if fresh:
+            return self._value(stored)
+        count('misses')
+        return default
+
+    def _store(self, key, value, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        delta = self._release(key) or 0.0
+        if timeout is None:
+            return value, None
+        ttl = max(timeout - time.time(), 0)
+        entry = Entry(value, timeout, delta)
+        return entry, ttl + self._grace
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l1 = self._in_l1(key)
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        stored, l2_timeout = self._store(key, value, timeout)
+        count('rebuilds')
+        self.l2.set(key, stored, l2_timeout, version=0)
+        if l1:
+            self._l1_set(key, stored)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        stored, l2_timeout = self._store(key, value, timeout)
+        added = self.l2.add(key, stored, l2_timeout, version=0)
+        self._l1_delete(key)
+        return added
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        full = self.make_key(key, version=version)
+        self.validate_key(full)
+        fresh, stored = self._lookup(full, self._in_l1(key), early=True)
+        if fresh:
+            return self._value(stored)
+        if self._acquire(full):
+            count('misses' if stored is None else 'early_rebuilds')
+            try:
+                return self._rebuild(key, default, timeout, version)
+            finally:
+                self._release(full)
+        if stored is not None:
+            count('stale_hits')
+            return self._value(stored)
+        stored = self._wait(full)
+        if stored is not None:
+            count('waited_hits')
+            return self._value(stored)
+        count('misses')
+        return self._rebuild(key, default, timeout, version)
+
+    def _rebuild(self, key, default, timeout, version):
+        value = default() if callable(default) else default
+        if value is not None:
+            self.set(key, value, timeout, version=version)
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self._l1_delete(key)
+        self.l2.delete(key, version=0)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self._l1_delete(key)
+        stored = self.l2.get(key, version=0)
+        if stored is None:
+            return False
+        if not isinstance(stored, Entry):
+            return self.l2.touch(key, timeout, version=0)
+        stored, l2_timeout = self._store(key, stored.value, timeout)
+        self.l2.set(key, stored, l2_timeout, version=0)
+        return True
+
+    def has_key(self, key, version=None):
+        return self.get(key, version=version) is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарность обеспечивает L2; числа хранятся в нем без обертки."""
+        key = self.make_key(key, version=version)
+        self._l1_delete(key)
+        return self.l2.incr(key, delta, version=0)
+
+    def clear(self):
+        with self._l1_lock:
+            self._l1.clear()
+        self.l2.clear()
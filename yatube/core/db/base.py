@@ -0,0 +1,82 @@
+"""
+SQLite для нескольких воркеров.
+
+ENGINE 'core.db' - стандартный бэкенд sqlite3 с двумя параметрами
+в OPTIONS:
+
+* pragmas - PRAGMA, которые выполняются при каждом подключении
+  (journal_mode=WAL, synchronous, mmap_size, busy_timeout...);
+* transaction_mode - как начинать транзакцию atomic(). IMMEDIATE сразу
+  берет блокировку записи и ждет ее busy_timeout; при обычном BEGIN
+  транзакция, которая начала с чтения, получает «database is locked»
+  без ожидания, если другой процесс успел записать.
+
+При CONN_MAX_AGE подключение переживает запрос, поэтому в начале и в
+конце запроса оно проверяется (is_usable): отвечает ли база и не
+подменили ли ее файл (восстановление из копии, импорт). Иначе старое
+подключение продолжило бы читать удаленный файл.
+"""
+import os
+import re
+
+from django.db.backends.sqlite3 import base
+
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    @property
+    def pragmas(self):
+        return self.settings_dict['OPTIONS'].get('pragmas', {})
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ValueError(f'Неизвестный transaction_mode: {mode}.')
+        return mode
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            if not (PRAGMA_VALUE.match(name)
+                    and PRAGMA_VALUE.match(str(value))):
+                raise ValueError(f'Недопустимая PRAGMA: {name}={value}.')
+            connection.execute(f'PRAGMA {name} = {value}')
+        self.file_identity = self.get_file_identity()
+        return connection
+
+    def get_file_identity(self):
+        if self.is_in_memory_db():
+            return None
+        try:
+            stat = os.stat(self.settings_dict['NAME'])
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return self.get_file_identity() == self.file_identity
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Проверка живого подключения вне транзакции
+        if (self.connection is not None and self.get_autocommit()
+                and not self.is_usable()):
+            self.close()
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        self.cursor().execute(f'BEGIN {mode}' if mode else 'BEGIN')
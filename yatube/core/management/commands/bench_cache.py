@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import tiered
+from core.cache.shared import SharedMemoryCache
+
+
+def make_backends(directory):
+    return {
+        'locmem': lambda: LocMemCache('bench', {}),
+        'filebased': lambda: FileBasedCache(
+            os.path.join(directory, 'files'), {}),
+        'shared': lambda: SharedMemoryCache(
+            os.path.join(directory, 'shared.bin'), {}),
+    }
+
+
+def worker(factory, keys, payload, rounds, results):
+    """Имитация воркера: берет фрагмент из кэша или «рендерит» его."""
+    cache = factory()
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            if cache.get(key) is None:
+                cache.set(key, payload)
+            else:
+                hits += 1
+    results.put((hits, time.perf_counter() - start))
+
+
+def stampede_worker(factory, payload, render, requests, barrier, results):
+    """Воркер читает одну горячую запись; промах - дорогой рендер."""
+    cache = factory()
+    barrier.wait()
+    rebuilds = 0
+
+    def rebuild():
+        nonlocal rebuilds
+        time.sleep(render)
+        rebuilds += 1
+        return payload
+
+    for _ in range(requests):
+        cache.get_or_set('hot', rebuild, 0.05)
+        time.sleep(0.002)
+    results.put((rebuilds, tiered.stats()))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает SharedMemoryCache с LocMemCache и FileBasedCache: '
+        'скорость get/set в одном процессе и долю попаданий у '
+        'нескольких воркеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=200)
+        parser.add_argument('--size', type=int, default=8192)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--render-ms', type=float, default=20,
+            help='Время пересборки записи в тесте на лавину промахов.')
+
+    def handle(self, *args, **options):
+        payload = 'x' * options['size']
+        keys = [f'fragment:{i}' for i in range(options['keys'])]
+        with tempfile.TemporaryDirectory() as directory:
+            backends = make_backends(directory)
+            self.stdout.write(
+                f'{"backend":>10} {"set us":>9} {"get us":>9} '
+                f'{"hit rate":>9} {"worker s":>9}')
+            for name, factory in backends.items():
+                set_us, get_us = self.single(factory(), keys, payload)
+                hit_rate, elapsed = self.shared(factory, keys, payload,
+                                                options)
+                self.stdout.write(
+                    f'{name:>10} {set_us:>9.1f} {get_us:>9.1f} '
+                    f'{hit_rate:>9.1%} {elapsed:>9.3f}')
+            self.stdout.write(
+                f'\nЛавина: {options["workers"]} воркеров, запись живет '
+                f'50 мс, рендер {options["render_ms"]:g} мс')
+            self.stdout.write(f'{"backend":>10} {"rebuilds":>9}  counters')
+            shared = backends['shared']
+            stampede_backends = {
+                'shared': shared,
+                'tiered': lambda: tiered.TieredCache(
+                    None, {'OPTIONS': {'L2': shared()}}),
+            }
+            for name, factory in stampede_backends.items():
+                rebuilds, counters = self.stampede(factory, payload, options)
+                self.stdout.write(f'{name:>10} {rebuilds:>9}  {counters}')
+
+    def single(self, cache, keys, payload):
+        cache.clear()
+        start = time.perf_counter()
+        for key in keys:
+            cache.set(key, payload)
+        set_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        get_time = time.perf_counter() - start
+        cache.clear()
+        return set_time / len(keys) * 1e6, get_time / len(keys) * 1e6
+
+    def shared(self, factory, keys, payload, options):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(
+                factory, keys, payload, options['rounds'], results))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        factory().clear()
+        total = len(keys) * options['rounds'] * options['workers']
+        hits = sum(hits for hits, _ in outcomes)
+        return hits / total, max(elapsed for _, elapsed in outcomes)
+
+    def stampede(self, factory, payload, options):
+        factory().clear()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        barrier = context.Barrier(options['workers'])
+        processes = [
+            context.Process(target=stampede_worker, args=(
+                factory, payload, options['render_ms'] / 1000, 200,
+                barrier, results))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        factory().clear()
+        counters = {}
+        for _, stats in outcomes:
+            for name, value in stats.items():
+                counters[name] = counters.get(name, 0) + value
+        return sum(rebuilds for rebuilds, _ in outcomes), counters
@@ -0,0 +1,63 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.template.loader import get_template
+
+from core.benchmark import measure
+
+# Прежний вариант навигации: по ссылке на каждую страницу
+FULL_RANGE = """
+{% for i in page_obj.paginator.page_range %}
+    {% if page_obj.number == i %}
+      <li class="page-item active">
+        <span class="page-link">{{ i }}</span>
+      </li>
+    {% else %}
+      <li class="page-item">
+        <a class="page-link" href="?{{ page_query }}page={{ i }}">{{ i }}</a>
+      </li>
+    {% endif %}
+{% endfor %}
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает навигацию по всем номерам страниц с окном вокруг '
+        'текущей (includes/paginator.html): время отрисовки и размер '
+        'HTML для лент разной длины.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, nargs='+',
+            default=[10, 100, 1000, 10000, 50000])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        templates = {
+            'full': engines['django'].from_string(FULL_RANGE),
+            'window': get_template('includes/paginator.html'),
+        }
+        self.stdout.write(
+            f'{"pages":>7} {"full ms":>9} {"full KB":>9} '
+            f'{"window ms":>10} {"window KB":>10}')
+        for pages in options['pages']:
+            paginator = Paginator(range(pages), 1)
+            context = {
+                'page_obj': paginator.get_page(pages // 2 or 1),
+                'page_query': '',
+            }
+            row = []
+            for template in templates.values():
+                html = template.render(context)
+                timings = measure(
+                    lambda: template.render(context), options['repeat'])
+                row += [statistics.median(timings) * 1000, len(html) / 1024]
+            self.stdout.write(
+                f'{pages:>7} {row[0]:>9.2f} {row[1]:>9.1f} '
+                f'{row[2]:>10.2f} {row[3]:>10.1f}')
+        self.stdout.write(
+            'На главной навигация выводится дважды: над лентой и под ней.')
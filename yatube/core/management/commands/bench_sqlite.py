@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from core.benchmark import file_database, isolated_settings, percentile
+from posts import seeding
+from posts.models import Post
+
+User = get_user_model()
+
+# Стандартный sqlite3: журнал DELETE, BEGIN DEFERRED, новое подключение
+# на каждый запрос
+BEFORE = {'CONN_MAX_AGE': 0, 'OPTIONS': {}}
+
+
+def worker(username, post_ids, options, barrier, results):
+    """Воркер сайта: читает ленты и пишет посты и комментарии."""
+    rng = random.Random(username)
+    client = Client()
+    client.force_login(User.objects.get(username=username))
+    persistent = connection.settings_dict['CONN_MAX_AGE'] != 0
+    counts = {'read': 0, 'write': 0, 'locked': 0}
+    latencies = {'read': [], 'write': []}
+    barrier.wait()
+    deadline = time.monotonic() + options['seconds']
+    while time.monotonic() < deadline:
+        post_id = rng.choice(post_ids)
+        kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+        start = time.perf_counter()
+        try:
+            if kind == 'read' and rng.random() < 0.5:
+                client.get(reverse('posts:index'))
+            elif kind == 'read':
+                client.get(reverse(
+                    'posts:post_detail', kwargs={'post_id': post_id}))
+            elif rng.random() < 0.5:
+                client.post(reverse('posts:post_create'), {'text': 'Пост'})
+            else:
+                client.post(
+                    reverse('posts:add_comment', kwargs={'post_id': post_id}),
+                    {'text': 'Комментарий'})
+        except OperationalError:
+            counts['locked'] += 1
+            continue
+        finally:
+            # Что делают сигналы request_started/request_finished
+            if persistent:
+                for each in connections.all():
+                    each.close_if_unusable_or_obsolete()
+            else:
+                connections.close_all()
+        latencies[kind].append(time.perf_counter() - start)
+        counts[kind] += 1
+    results.put((counts, latencies))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает файл SQLite несколькими процессами, которые читают '
+        'ленты и пишут посты и комментарии, со стандартными настройками '
+        'sqlite3 и с настройками из DATABASES (WAL, PRAGMA, постоянные '
+        'подключения). Показывает пропускную способность, задержки и '
+        'число ошибок «database is locked».'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument(
+            '--rounds', type=int, default=2,
+            help='Сколько раз прогнать оба режима в случайном порядке.')
+
+    def handle(self, *args, **options):
+        configured = connection.settings_dict
+        modes = {
+            'before': BEFORE,
+            'after': {
+                'CONN_MAX_AGE': configured['CONN_MAX_AGE'],
+                'OPTIONS': configured['OPTIONS'],
+            },
+        }
+        with tempfile.TemporaryDirectory() as directory, \
+                isolated_settings(directory):
+            template = os.path.join(directory, 'template.sqlite3')
+            with file_database(template, **BEFORE):
+                self.stdout.write('Готовим базу...')
+                call_command('migrate', verbosity=0, interactive=False)
+                seeding.seed(
+                    users=options['workers'] * 10, groups=5,
+                    posts=options['posts'], comments=options['posts'],
+                    follows=options['workers'] * 20, images=0,
+                    random_seed=1)
+            rows = {name: self.empty() for name in modes}
+            order = list(modes)
+            for number in range(options['rounds']):
+                random.shuffle(order)
+                for name in order:
+                    # Каждому прогону - своя база и свой общий кэш, чтобы
+                    # режим не достался кэш и блокировки предыдущего
+                    run = os.path.join(directory, f'{name}-{number}')
+                    os.mkdir(run)
+                    path = os.path.join(run, 'db.sqlite3')
+                    shutil.copy(template, path)
+                    with isolated_settings(run), \
+                            file_database(path, **modes[name]):
+                        self.merge(rows[name], self.run_mode(options))
+        self.report(rows, options['seconds'] * options['rounds'])
+
+    @staticmethod
+    def empty():
+        return {'read': 0, 'write': 0, 'locked': 0}, {'read': [], 'write': []}
+
+    @staticmethod
+    def merge(row, other):
+        counts, latencies = row
+        for key, value in other[0].items():
+            counts[key] += value
+        for key, values in other[1].items():
+            latencies[key] += values
+
+    def run_mode(self, options):
+        usernames = list(User.objects.order_by('pk').values_list(
+            'username', flat=True)[:options['workers']])
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(len(usernames))
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(
+                username, post_ids, options, barrier, results))
+            for username in usernames
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        row = self.empty()
+        for result in collected:
+            self.merge(row, result)
+        return row
+
+    def report(self, rows, seconds):
+        self.stdout.write(
+            f'{"mode":>7} {"reads/s":>8} {"writes/s":>9} {"locked":>7} '
+            f'{"read p99":>9} {"write p50":>10} {"write p99":>10}')
+        for name, (counts, latencies) in rows.items():
+            self.stdout.write(
+                f'{name:>7} {counts["read"] / seconds:>8.1f} '
+                f'{counts["write"] / seconds:>9.1f} {counts["locked"]:>7} '
+                f'{percentile(latencies["read"], 99) * 1000:>7.1f}ms '
+                f'{percentile(latencies["write"], 50) * 1000:>8.1f}ms '
+                f'{percentile(latencies["write"], 99) * 1000:>8.1f}ms')
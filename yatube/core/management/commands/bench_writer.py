@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import override_settings
+
+from core.benchmark import file_database, isolated_settings, percentile
+from core.writer import Writer, WriterError
+from posts import seeding, writes
+from posts.models import Post, User
+
+
+def writer_process(path, ready, stop, results):
+    writer = Writer(path)
+    thread = threading.Thread(target=writer.serve, args=(ready,))
+    thread.start()
+    stop.wait()
+    writer.stop()
+    thread.join()
+    results.put(writer.committed / max(writer.batches, 1))
+
+
+def worker(user_id, author_ids, post_ids, seconds, barrier, results):
+    """Воркер сайта, который только пишет: комментарии и подписки."""
+    rng = random.Random(user_id)
+    latencies = []
+    errors = 0
+    barrier.wait()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            if rng.random() < 0.7:
+                writes.add_comment(
+                    post_id=rng.choice(post_ids), author_id=user_id,
+                    text='Комментарий')
+            elif rng.random() < 0.5:
+                writes.follow(
+                    user_id=user_id, author_id=rng.choice(author_ids))
+            else:
+                writes.unfollow(
+                    user_id=user_id, author_id=rng.choice(author_ids))
+        except (OperationalError, WriterError):
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запись из многих процессов напрямую в SQLite (каждый '
+        'ждет блокировку в busy_timeout) с записью через процесс записи '
+        'с групповой фиксацией (core.writer).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=64)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        rows = {}
+        with tempfile.TemporaryDirectory() as directory, \
+                isolated_settings(directory):
+            template = os.path.join(directory, 'template.sqlite3')
+            with file_database(template):
+                self.stdout.write('Готовим базу...')
+                call_command('migrate', verbosity=0, interactive=False)
+                seeding.seed(
+                    users=options['writers'] * 2, groups=5, posts=1000,
+                    comments=0, follows=0, images=0, random_seed=1)
+            for name in ('direct', 'writer'):
+                path = os.path.join(directory, f'{name}.sqlite3')
+                shutil.copy(template, path)
+                socket = os.path.join(directory, f'{name}.sock')
+                with file_database(path), override_settings(
+                        WRITER_SOCKET=socket if name == 'writer' else None):
+                    rows[name] = self.run_mode(
+                        socket if name == 'writer' else None, options)
+        self.stdout.write(
+            f'{"mode":>7} {"writes/s":>9} {"p50":>9} {"p99":>9} '
+            f'{"max":>9} {"errors":>7} {"batch":>6}')
+        for name, (latencies, errors, batch) in rows.items():
+            self.stdout.write(
+                f'{name:>7} {len(latencies) / options["seconds"]:>9.1f} '
+                f'{percentile(latencies, 50) * 1000:>7.1f}ms '
+                f'{percentile(latencies, 99) * 1000:>7.1f}ms '
+                f'{max(latencies or [0]) * 1000:>7.1f}ms {errors:>7} '
+                f'{batch:>6.1f}')
+
+    def run_mode(self, socket, options):
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        writers, authors = (
+            user_ids[:options['writers']], user_ids[options['writers']:])
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        server = None
+        if socket:
+            ready, stop = context.Event(), context.Event()
+            batches = context.Queue()
+            server = context.Process(
+                target=writer_process, args=(socket, ready, stop, batches))
+            server.start()
+            ready.wait()
+        barrier = context.Barrier(len(writers))
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(
+                user_id, authors, post_ids, options['seconds'], barrier,
+                results))
+            for user_id in writers
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        batch = 1.0
+        if server is not None:
+            stop.set()
+            batch = batches.get()
+            server.join()
+        latencies = [value for values, _ in collected for value in values]
+        errors = sum(errors for _, errors in collected)
+        return latencies, errors, batch
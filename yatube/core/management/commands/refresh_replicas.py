@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает реплики DATABASE_REPLICAS с основной базы через online '
+        'backup API sqlite3 раз в REPLICA_REFRESH_INTERVAL секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            default=settings.REPLICA_REFRESH_INTERVAL)
+        parser.add_argument(
+            '--once', action='store_true', help='Один снимок и выход.')
+
+    def handle(self, *args, **options):
+        aliases = replicas.replicas()
+        if not aliases:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        try:
+            while True:
+                for alias in aliases:
+                    started = time.monotonic()
+                    replicas.refresh(alias)
+                    if options['verbosity'] > 1:
+                        self.stdout.write(
+                            f'{alias}: снимок за '
+                            f'{(time.monotonic() - started) * 1000:.1f} мс')
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.writer import Writer
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает единственный процесс записи: операции воркеров '
+        'приходят по WRITER_SOCKET и фиксируются пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket', default=settings.WRITER_SOCKET,
+            help='Путь unix-сокета (по умолчанию WRITER_SOCKET).')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.WRITER_BATCH_SIZE)
+        parser.add_argument(
+            '--batch-wait', type=float, default=settings.WRITER_BATCH_WAIT,
+            help='Сколько секунд собирать пачку после первой операции.')
+
+    def handle(self, *args, **options):
+        if not options['socket']:
+            raise CommandError('Задайте WRITER_SOCKET или --socket.')
+        writer = Writer(
+            options['socket'], options['batch_size'], options['batch_wait'])
+        self.stdout.write(f'Процесс записи слушает {options["socket"]}')
+        try:
+            writer.serve()
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            f'Зафиксировано операций: {writer.committed}, '
+            f'пачек: {writer.batches}.')
@@ -0,0 +1,326 @@
+"""
+Метрики запросов в формате Prometheus.
+
+MetricsMiddleware замеряет каждый запрос и раскладывает замеры по
+имени маршрута (posts:index, posts:profile...) в гистограммы: полное
+время ответа, число и время SQL-запросов, время отрисовки шаблонов,
+попадания и промахи кэша. Время шаблонов считает бэкенд DjangoTemplates
+из этого модуля, кэш - счетчики core.cache.tiered.
+
+Каждый процесс копит гистограммы в памяти и раз в
+METRICS_FLUSH_INTERVAL секунд целиком переписывает свой файл
+METRICS_DIR/<pid>.json. Страница /metrics складывает файлы всех
+процессов, поэтому воркерам не нужен общий сетевой сервис. Файлы
+завершившихся процессов она прибавляет к METRICS_DIR/aggregate.json и
+удаляет (как mark_process_dead в prometheus_client): счетчики
+Prometheus не должны уменьшаться, а каталог - расти с каждым
+перезапуском воркеров.
+"""
+import atexit
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from glob import glob
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends import django as django_backend
+from django.template.exceptions import TemplateDoesNotExist
+
+from core.cache import tiered
+
+TIME_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+# имя: (описание, границы корзин)
+HISTOGRAMS = {
+    'yatube_request_duration_seconds': (
+        'Полное время ответа.', TIME_BUCKETS),
+    'yatube_db_queries': (
+        'Число SQL-запросов за запрос.', COUNT_BUCKETS),
+    'yatube_db_duration_seconds': (
+        'Время SQL-запросов за запрос.', TIME_BUCKETS),
+    'yatube_template_render_seconds': (
+        'Время отрисовки шаблонов за запрос.', TIME_BUCKETS),
+    'yatube_cache_hits': (
+        'Попаданий в кэш за запрос.', COUNT_BUCKETS),
+    'yatube_cache_misses': (
+        'Промахов кэша за запрос.', COUNT_BUCKETS),
+}
+CACHE_HITS = ('l1_hits', 'l2_hits', 'stale_hits', 'waited_hits')
+CACHE_MISSES = ('misses', 'early_rebuilds')
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+UNRESOLVED = '<unresolved>'
+AGGREGATE = 'aggregate.json'
+
+
+class Registry:
+    """Гистограммы одного процесса: {имя: {маршрут: [корзины..., сумма]}}."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._values = {}
+        self._flushed = 0.0
+        self._directories = set()
+
+    def _check_pid(self):
+        # После fork потомок начинает с пустых значений
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._values = {}
+            self._flushed = 0.0
+
+    def observe(self, name, view, value):
+        buckets = HISTOGRAMS[name][1]
+        with self._lock:
+            self._check_pid()
+            row = self._values.setdefault(name, {}).setdefault(
+                view, [0] * (len(buckets) + 2))
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(buckets)
+            row[index] += 1
+            row[-1] += value
+
+    def dump(self):
+        with self._lock:
+            self._check_pid()
+            return json.loads(json.dumps(self._values))
+
+    def flush(self, directory, interval=0):
+        """Переписывает файл процесса, если прошло interval секунд."""
+        now = time.monotonic()
+        with self._lock:
+            self._check_pid()
+            if now - self._flushed < interval:
+                return
+            self._flushed = now
+            data = json.dumps(self._values)
+            pid = self._pid
+        os.makedirs(directory, exist_ok=True)
+        write(os.path.join(directory, f'{pid}.json'), data)
+
+    def attach(self, directory):
+        """
+        Продолжает счет из файла процесса с тем же pid и сохраняет
+        значения при выходе.
+        """
+        if directory not in self._directories:
+            self._directories.add(directory)
+            atexit.register(self.flush, directory)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        try:
+            with open(path) as stream:
+                values = json.load(stream)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._check_pid()
+            if not self._values:
+                self._values = values
+
+
+registry = Registry()
+
+
+def load(path):
+    try:
+        with open(path) as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+def merge(total, values):
+    for name, views in values.items():
+        if name not in HISTOGRAMS:
+            continue
+        for view, row in views.items():
+            merged = total.setdefault(name, {}).setdefault(
+                view, [0] * len(row))
+            for index, value in enumerate(row):
+                merged[index] += value
+    return total
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def write(path, data):
+    # Запись во временный файл и замена: читатель не увидит половину
+    fd, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as stream:
+        stream.write(data)
+    os.replace(temporary, path)
+
+
+def collect(directory):
+    """
+    Складывает гистограммы из файлов всех процессов; файлы завершившихся
+    переносит в общий итог.
+    """
+    os.makedirs(directory, exist_ok=True)
+    aggregate = os.path.join(directory, AGGREGATE)
+    with open(os.path.join(directory, '.lock'), 'w') as lock:
+        # Два одновременных /metrics не перенесут один файл дважды
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        dead = {}
+        live = {}
+        for path in glob(os.path.join(directory, '*.json')):
+            name = os.path.basename(path)[:-len('.json')]
+            if name.isdigit():
+                (live if is_alive(int(name)) else dead)[path] = load(path)
+        total = load(aggregate) or {}
+        if dead:
+            for values in dead.values():
+                merge(total, values or {})
+            write(aggregate, json.dumps(total))
+            for path in dead:
+                os.unlink(path)
+    for values in live.values():
+        merge(total, values or {})
+    return total
+
+
+def escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace(
+        '"', r'\"')
+
+
+def render(values):
+    """Текстовый формат Prometheus."""
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for view, row in sorted(values.get(name, {}).items()):
+            label = f'view="{escape(view)}"'
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), row):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}}} {row[-1]}')
+            lines.append(f'{name}_count{{{label}}} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def render_gauge(name, description, label, samples):
+    """Значения, снятые в момент запроса /metrics; None - +Inf."""
+    lines = [f'# HELP {name} {description}', f'# TYPE {name} gauge']
+    for key, value in sorted(samples.items()):
+        value = '+Inf' if value is None else round(value, 3)
+        lines.append(f'{name}{{{label}="{escape(key)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class Measurement:
+    """Замеры текущего запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+_current = threading.local()
+
+
+class Template(django_backend.Template):
+
+    def render(self, context=None, request=None):
+        measurement = getattr(_current, 'measurement', None)
+        if measurement is None:
+            return super().render(context, request)
+        # Вложенный render_to_string уже входит во внешний замер
+        measurement.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            measurement.template_depth -= 1
+            if not measurement.template_depth:
+                measurement.template_time += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Стандартный бэкенд шаблонов с замером времени отрисовки."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.directory = getattr(settings, 'METRICS_DIR', None)
+        if not self.directory:
+            raise MiddlewareNotUsed
+        self.interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        self.get_response = get_response
+        registry.attach(self.directory)
+
+    def __call__(self, request):
+        measurement = Measurement()
+        _current.measurement = measurement
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                cache_stats = stack.enter_context(tiered.track())
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(measurement))
+                response = self.get_response(request)
+        finally:
+            _current.measurement = None
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        observed = {
+            'yatube_request_duration_seconds': duration,
+            'yatube_db_queries': measurement.queries,
+            'yatube_db_duration_seconds': measurement.db_time,
+            'yatube_template_render_seconds': measurement.template_time,
+            'yatube_cache_hits': sum(
+                cache_stats.get(name, 0) for name in CACHE_HITS),
+            'yatube_cache_misses': sum(
+                cache_stats.get(name, 0) for name in CACHE_MISSES),
+        }
+        for name, value in observed.items():
+            registry.observe(name, view, value)
+        registry.flush(self.directory, self.interval)
+        return response
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WriteToken',
+            fields=[
+                ('token', models.CharField(max_length=32, primary_key=True, serialize=False, verbose_name='Токен')),
+                ('result', models.TextField(verbose_name='Результат (JSON)')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Выполнена')),
+            ],
+            options={
+                'verbose_name': 'Токен операции записи',
+                'verbose_name_plural': 'Токены операций записи',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import models
+
+
+class WriteToken(models.Model):
+    """Выполненная операция core.writer: повтор по токену ее не повторит."""
+    token = models.CharField(
+        max_length=32,
+        primary_key=True,
+        verbose_name='Токен'
+    )
+    result = models.TextField(
+        verbose_name='Результат (JSON)'
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Выполнена'
+    )
+
+    class Meta:
+        verbose_name = 'Токен операции записи'
+        verbose_name_plural = 'Токены операций записи'
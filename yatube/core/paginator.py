@@ -0,0 +1,219 @@
+import base64
+import binascii
+import datetime
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+# Номера страниц вокруг текущей и у краев в окне навигации
+ON_EACH_SIDE = 2
+ON_ENDS = 1
+
+
+def page_window(number, num_pages, on_each_side=ON_EACH_SIDE,
+                on_ends=ON_ENDS):
+    """
+    Компактный список номеров страниц для навигации.
+
+    Соседи текущей страницы и по on_ends страниц с краев; пропуски -
+    None (только если скрыто больше одной страницы). Размер окна не
+    зависит от числа страниц.
+    """
+    pages = []
+    if number > on_each_side + on_ends + 2:
+        pages.extend(range(1, on_ends + 1))
+        pages.append(None)
+        pages.extend(range(number - on_each_side, number + 1))
+    else:
+        pages.extend(range(1, number + 1))
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages.extend(range(number + 1, number + on_each_side + 1))
+        pages.append(None)
+        pages.extend(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages.extend(range(number + 1, num_pages + 1))
+    return pages
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder режет микросекунды, а курсору нужна точность."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator, который кэширует COUNT(*) по тексту запроса.
+
+    count_key различает версии данных (например, поколение ленты);
+    без него считает каждый раз, как обычный Paginator.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 count_timeout=None, **kwargs):
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+        super().__init__(object_list, per_page, **kwargs)
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        query = str(self.object_list.query).encode()
+        key = 'paginator:count:{}:{}'.format(
+            hashlib.sha1(query).hexdigest(), self.count_key)
+        return cache.get_or_set(
+            key, lambda: super(CachedCountPaginator, self).count,
+            self.count_timeout)
+
+
+class CursorPaginator(CachedCountPaginator):
+    """
+    Паджинатор по ключу (keyset pagination).
+
+    Страница выбирается условием по полям сортировки, а не OFFSET,
+    поэтому не нужен ни COUNT(*), ни просмотр пропущенных строк.
+    Номерные страницы (`page`) по-прежнему работают через
+    стандартный Paginator для старых ссылок; их COUNT(*) кэшируется,
+    если передан count_key (например, поколение ленты).
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), merge=None, **kwargs):
+        self.ordering = tuple(ordering)
+        # merge(values, direction, limit) - дополнительный источник
+        # объектов за точкой курсора, уже упорядоченный по ходу обхода.
+        self.merge = merge
+        super().__init__(object_list.order_by(*self.ordering),
+                         per_page, **kwargs)
+
+    def get_cursor_page(self, cursor=None):
+        """Возвращает страницу по курсору; битый курсор - первая страница."""
+        try:
+            direction, number, values = self.decode_cursor(cursor)
+        except ValueError:
+            direction, number, values = NEXT, 1, None
+        items = self._fetch(values, direction)
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if direction == PREVIOUS:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        if has_previous and number <= 1:
+            number = 2
+        if direction == PREVIOUS and not has_previous:
+            number = 1
+        page = self._get_page(items, number, self)
+        page.cursor_mode = True
+        page.cursor = cursor or ''
+        page.next_cursor = None
+        page.previous_cursor = None
+        if items and has_next:
+            page.next_cursor = self.encode_cursor(
+                NEXT, number + 1, items[-1])
+        if items and has_previous:
+            page.previous_cursor = self.encode_cursor(
+                PREVIOUS, number - 1, items[0])
+        return page
+
+    def _fetch(self, values, direction):
+        """Читает per_page + 1 объектов за точкой курсора по ходу обхода."""
+        limit = self.per_page + 1
+        queryset = self.object_list
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, direction))
+        if direction == PREVIOUS:
+            queryset = queryset.reverse()
+        items = list(queryset[:limit])
+        if self.merge is not None:
+            items += list(self.merge(values, direction, limit))
+            items = self._unique(self._sort(items, direction))[:limit]
+        return items
+
+    def encode_cursor(self, direction, number, obj):
+        values = [self._value(obj, field) for field in self._fields()]
+        data = json.dumps([direction, number, values], cls=CursorEncoder)
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            raise ValueError('Empty cursor')
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, number, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()).decode())
+        except (binascii.Error, UnicodeError, TypeError, ValueError):
+            raise ValueError('Malformed cursor')
+        fields = self._fields()
+        if (direction not in (NEXT, PREVIOUS) or not isinstance(number, int)
+                or not isinstance(values, list)
+                or len(values) != len(fields)):
+            raise ValueError('Malformed cursor')
+        model = self.object_list.model
+        try:
+            values = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(fields, values)
+            ]
+        except ValidationError:
+            raise ValueError('Malformed cursor')
+        return direction, max(number, 1), values
+
+    def _fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    @staticmethod
+    def _value(obj, field):
+        if isinstance(obj, dict):
+            return obj[field]
+        return getattr(obj, field)
+
+    def _sort(self, items, direction):
+        """Сортирует объекты по ключу курсора в направлении обхода."""
+        for field in reversed(self.ordering):
+            descending = field.startswith('-')
+            if direction == PREVIOUS:
+                descending = not descending
+            name = field.lstrip('-')
+            items.sort(key=lambda obj: self._value(obj, name),
+                       reverse=descending)
+        return items
+
+    def _unique(self, items):
+        """Убирает объекты с одинаковым ключом из разных источников."""
+        fields = self._fields()
+        seen = set()
+        unique = []
+        for obj in items:
+            key = tuple(self._value(obj, field) for field in fields)
+            if key not in seen:
+                seen.add(key)
+                unique.append(obj)
+        return unique
+
+    def _seek(self, values, direction):
+        """Строит условие (a, b) < (x, y) с учетом направления сортировки."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-')
+            if direction == PREVIOUS:
+                descending = not descending
+            lookup = '{}__{}'.format(name, 'lt' if descending else 'gt')
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
@@ -0,0 +1,139 @@
+"""
+Бюджеты SQL-запросов представлений и поиск N+1.
+
+Представление объявляет бюджет декоратором @query_budget(n), настройка
+QUERY_BUDGETS ({'posts:index': n}) его переопределяет. При
+QUERY_BUDGET_CHECKS (по умолчанию в разработке и тестах)
+QueryBudgetMiddleware записывает запросы каждого ответа вместе с
+местом, откуда они пришли: строкой шаблона или строкой кода проекта.
+Одинаковые по форме запросы (SQL без параметров), повторенные не
+меньше QUERY_REPEAT_THRESHOLD раз, - признак ленивой загрузки в цикле;
+они пишутся в лог, а при превышении бюджета попадают в текст
+QueryBudgetExceeded.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Node
+
+logger = logging.getLogger(__name__)
+
+# IN (%s, %s, ...) разной длины - одна и та же форма запроса
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+RENDER_CODE = Node.render_annotated.__code__
+MAX_SQL_LENGTH = 300
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Декоратор: представление укладывается в limit SQL-запросов."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def shape(sql):
+    return IN_LIST.sub('(%s, ...)', sql)
+
+
+def location():
+    """Строка шаблона или кода проекта, из которой пришел запрос."""
+    code_line = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is RENDER_CODE:
+            node = frame.f_locals['self']
+            origin = getattr(node, 'origin', None)
+            name = origin and (origin.template_name or origin.name)
+            return f'{name}:{node.token.lineno}'
+        filename = frame.f_code.co_filename
+        if (code_line is None and filename.startswith(settings.BASE_DIR)
+                and filename != __file__):
+            code_line = (
+                f'{os.path.relpath(filename, settings.BASE_DIR)}:'
+                f'{frame.f_lineno}')
+        frame = frame.f_back
+    return code_line or '?'
+
+
+class Recorder:
+    """Запросы одного ответа: форма и место вызова."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((shape(sql), location()))
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """[(форма, число, Counter мест)] для повторов, частые первыми."""
+        shapes = Counter(sql for sql, _ in self.queries)
+        return [
+            (sql, number, Counter(
+                where for other, where in self.queries if other == sql))
+            for sql, number in shapes.most_common() if number >= threshold
+        ]
+
+
+def report(repeated):
+    lines = []
+    for sql, number, places in repeated:
+        if len(sql) > MAX_SQL_LENGTH:
+            sql = sql[:MAX_SQL_LENGTH] + '...'
+        lines.append(f'  {number} x {sql}')
+        for where, times in places.most_common():
+            lines.append(f'      {times} x {where}')
+    return '\n'.join(lines)
+
+
+class QueryBudgetMiddleware:
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_BUDGET_CHECKS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 3)
+        self.budgets = getattr(settings, 'QUERY_BUDGETS', {})
+
+    def budget(self, match):
+        if match is None:
+            return None
+        if match.view_name in self.budgets:
+            return self.budgets[match.view_name]
+        return getattr(match.func, 'query_budget', None)
+
+    def __call__(self, request):
+        recorder = Recorder()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+        repeated = recorder.repeated(self.threshold)
+        budget = self.budget(match)
+        if budget is not None and len(recorder.queries) > budget:
+            message = (
+                f'{view}: {len(recorder.queries)} SQL-запросов при '
+                f'бюджете {budget}.')
+            if repeated:
+                message += '\nПовторы:\n' + report(repeated)
+            raise QueryBudgetExceeded(message)
+        if repeated:
+            logger.warning(
+                '%s: повторяющиеся SQL-запросы (N+1?):\n%s',
+                view, report(repeated))
+        return response
@@ -0,0 +1,180 @@
+"""
+Чтение с реплик SQLite.
+
+ReplicaRouter отдает чтения реплике только внутри представлений,
+объявленных core.replicas.require_GET, и только на GET/HEAD; запись и
+все остальные чтения (формы, транзакции, фоновые потоки) идут в
+основную базу. Реплику для запроса выбирает ReplicaMiddleware среди
+перечисленных в DATABASE_REPLICAS, чье отставание не больше
+REPLICA_MAX_LAG секунд.
+
+Чтобы пользователь видел свои изменения, после записи (запрос не GET,
+запись в обычном представлении, операция core.writer) ответ ставит
+cookie на REPLICA_PIN_SECONDS: пока она жива, чтения этого браузера
+идут в основную базу.
+
+Реплика - копия файла основной базы, которую `manage.py
+refresh_replicas` раз в REPLICA_REFRESH_INTERVAL секунд снимает через
+online backup API sqlite3 и подменяет атомарно. Время снимка - mtime
+файла, отсюда отставание и метрика yatube_replica_lag_seconds.
+Фрагменты кэша ключуются поколениями (posts.generations), поэтому
+запрос, которому нужно поколение новее снимка, дочитывает из основной
+базы (require).
+"""
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.views.decorators import http
+
+PIN_COOKIE = 'replica_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+_state = threading.local()
+
+
+def require_GET(view):
+    """require_GET, чтения которого можно отдать реплике."""
+    view = http.require_GET(view)
+    view.replica_reads = True
+    return view
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def written():
+    """Отмечает, что текущий запрос писал в основную базу."""
+    _state.written = True
+
+
+def require(timestamp):
+    """Запросу нужны записи не старше timestamp: старая реплика не годится.
+
+    Иначе фрагмент кэша нового поколения собрался бы из данных до
+    изменения и жил бы до следующего.
+    """
+    if (getattr(_state, 'replica', None) is not None
+            and timestamp > _state.snapshot):
+        _state.replica = None
+
+
+def snapshot(source, target):
+    """Копирует базу source в target, не останавливая запись в source."""
+    started = time.time()
+    temporary = f'{target}.tmp'
+    source_connection = sqlite3.connect(source)
+    copy = sqlite3.connect(temporary)
+    try:
+        source_connection.backup(copy)
+        # Копия WAL-базы тоже в WAL; реплике -wal не нужен, а чужой
+        # -wal рядом с подмененным файлом ее бы испортил
+        copy.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        copy.close()
+        source_connection.close()
+    os.utime(temporary, (started, started))
+    # Открытые подключения дочитывают старый файл, пока core.db не
+    # заметит подмену и не переподключится
+    os.replace(temporary, target)
+    return started
+
+
+def refresh(alias):
+    return snapshot(
+        connections[DEFAULT_DB_ALIAS].settings_dict['NAME'],
+        connections[alias].settings_dict['NAME'])
+
+
+def taken(path):
+    """Время начала снимка в path; None, если снимка нет."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def taken_at(alias):
+    return taken(connections[alias].settings_dict['NAME'])
+
+
+def lag(alias):
+    """Отставание реплики в секундах; None, если снимка нет."""
+    started = taken_at(alias)
+    return None if started is None else max(time.time() - started, 0.0)
+
+
+def fresh_replicas():
+    """{alias: время снимка} реплик не старше REPLICA_MAX_LAG."""
+    oldest = time.time() - getattr(settings, 'REPLICA_MAX_LAG', 10)
+    fresh = {}
+    for alias in replicas():
+        started = taken_at(alias)
+        if started is not None and started >= oldest:
+            fresh[alias] = started
+    return fresh
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = getattr(_state, 'replica', None)
+        # Внутри транзакции читаем то, что в ней записано
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        written()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приезжает на реплику вместе со снимком
+        if db in replicas():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.__dict__.clear()
+        try:
+            response = self.get_response(request)
+            pin = request.method not in SAFE_METHODS or (
+                getattr(_state, 'written', False)
+                and not getattr(_state, 'replica_reads', False))
+        finally:
+            _state.__dict__.clear()
+        if pin:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 15),
+                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (not getattr(view_func, 'replica_reads', False)
+                or request.method not in SAFE_METHODS):
+            return None
+        _state.replica_reads = True
+        if PIN_COOKIE in request.COOKIES:
+            return None
+        fresh = fresh_replicas()
+        if fresh:
+            _state.replica = random.choice(list(fresh))
+            _state.snapshot = fresh[_state.replica]
+        return None
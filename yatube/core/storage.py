@@ -0,0 +1,82 @@
+"""
+Хранилище файлов с именами по содержимому.
+
+Файл сохраняется как <каталог upload_to>/ab/cd/<sha256><расширение>,
+поэтому одинаковые загрузки попадают в один файл, а каталоги
+разбиты по первым байтам хэша и не разрастаются. Сколько записей
+ссылается на файл, хранилище не знает: это учитывает приложение.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+HASHED_STEM = re.compile(r'[0-9a-f]{64}')
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    directory, filename = os.path.split(name)
+    extension = os.path.splitext(filename)[1].lower()
+    shards = [
+        digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH]
+        for i in range(SHARD_LEVELS)
+    ]
+    return '/'.join(filter(None, [directory, *shards, digest + extension]))
+
+
+def is_hashed(name):
+    """Имя уже дано хранилищем по содержимому."""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return HASHED_STEM.fullmatch(stem) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return super().save(
+            hashed_name(name, content_hash(content)), content, max_length)
+
+    def get_available_name(self, name, max_length=None):
+        # Имя определяется содержимым: занятое имя - тот же файл.
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Пишем во временный файл и переименовываем: одновременная
+        # загрузка того же содержимого просто заменит файл таким же.
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    output.write(chunk)
+            # mkstemp создает файл 0600, а его должен читать веб-сервер
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, full_path)
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return name
@@ -0,0 +1,62 @@
+"""
+Тег {% cache %}, который пересобирает фрагмент через get_or_set.
+
+Стандартный тег делает get и set отдельно, и защита TieredCache от
+лавины промахов (блокировка пересборки, устаревшее значение на время
+пересборки) до него не доходит. Синтаксис тот же, что у {% load cache %}.
+"""
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode, do_cache
+
+register = template.Library()
+
+
+class FragmentCacheNode(CacheNode):
+
+    def fragment_cache(self, context):
+        if self.cache_name:
+            try:
+                cache_name = self.cache_name.resolve(context)
+            except template.VariableDoesNotExist:
+                raise template.TemplateSyntaxError(
+                    f'"cache" tag got an unknown variable: '
+                    f'{self.cache_name.var!r}')
+            try:
+                return caches[cache_name]
+            except InvalidCacheBackendError:
+                raise template.TemplateSyntaxError(
+                    f'Invalid cache name specified for cache tag: '
+                    f'{cache_name!r}')
+        try:
+            return caches['template_fragments']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time_var.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                f'"cache" tag got an unknown variable: '
+                f'{self.expire_time_var.var!r}')
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"cache" tag got a non-integer timeout value: '
+                    f'{expire_time!r}')
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        cache_key = make_template_fragment_key(self.fragment_name, vary_on)
+        return self.fragment_cache(context).get_or_set(
+            cache_key, lambda: self.nodelist.render(context), expire_time)
+
+
+@register.tag('cache')
+def do_fragment_cache(parser, token):
+    node = do_cache(parser, token)
+    return FragmentCacheNode(
+        node.nodelist, node.expire_time_var, node.fragment_name,
+        node.vary_on, node.cache_name)
@@ -0,0 +1,11 @@
+from django import template
+
+from core.paginator import page_window as get_page_window
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page_obj):
+    """Номера страниц вокруг текущей; None - пропуск."""
+    return get_page_window(page_obj.number, page_obj.paginator.num_pages)
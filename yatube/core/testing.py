@@ -0,0 +1,33 @@
+"""Тесты без файлов работающего сайта: общего кэша и метрик."""
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+def isolated_files(directory):
+    """Общий кэш и метрики во временном каталоге directory."""
+    caches = {alias: dict(config) for alias, config in settings.CACHES.items()}
+    caches['shared']['LOCATION'] = os.path.join(directory, 'shared.bin')
+    return override_settings(
+        CACHES=caches, METRICS_DIR=os.path.join(directory, 'metrics'))
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Иначе cache.clear() в тестах очищал бы кэш запущенного сайта, а
+    прогон оставлял бы после себя его файлы.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        self.directory = tempfile.TemporaryDirectory()
+        self.isolation = isolated_files(self.directory.name)
+        self.isolation.enable()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self.isolation.disable()
+        self.directory.cleanup()
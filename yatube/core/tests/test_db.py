@@ -0,0 +1,81 @@
+import os
+import sqlite3
+import tempfile
+
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase
+
+from core.db.base import DatabaseWrapper
+
+ALIAS = 'sqlite_file'
+
+
+class SQLiteBackendTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'db.sqlite3')
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': self.path,
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {
+                'pragmas': {
+                    'journal_mode': 'WAL',
+                    'synchronous': 'NORMAL',
+                    'busy_timeout': 1234,
+                },
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+        self.db = DatabaseWrapper(settings_dict, ALIAS)
+        connections[ALIAS] = self.db
+        self.addCleanup(connections.__delitem__, ALIAS)
+        self.addCleanup(self.db.close)
+
+    def pragma(self, name):
+        with self.db.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Проверяем, что PRAGMA из OPTIONS выполняются при подключении."""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_invalid_pragma(self):
+        """Проверяем, что PRAGMA с посторонним SQL не выполняется."""
+        self.db.settings_dict['OPTIONS']['pragmas'] = {
+            'journal_mode': 'WAL; DROP TABLE x'}
+
+        with self.assertRaises(ValueError):
+            self.db.ensure_connection()
+
+    def test_immediate_transaction(self):
+        """Проверяем, что atomic() сразу берет блокировку записи."""
+        self.db.ensure_connection()
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+
+        with transaction.atomic(using=ALIAS):
+            with self.assertRaisesMessage(
+                    sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+
+        other.execute('BEGIN IMMEDIATE')
+        other.rollback()
+
+    def test_replaced_file_closes_connection(self):
+        """Проверяем, что подключение к подмененному файлу закрывается."""
+        self.db.ensure_connection()
+        self.db.close_if_unusable_or_obsolete()
+        self.assertIsNotNone(self.db.connection)
+
+        replacement = self.path + '.new'
+        sqlite3.connect(replacement).close()
+        os.replace(replacement, self.path)
+        self.db.close_if_unusable_or_obsolete()
+
+        self.assertIsNone(self.db.connection)
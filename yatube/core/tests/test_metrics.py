@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import subprocess
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+
+
+def sample(text, name, view):
+    match = re.search(
+        rf'^{name}{{view="{re.escape(view)}"}} (\S+)$', text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        override = override_settings(
+            METRICS_DIR=self.directory.name, METRICS_FLUSH_INTERVAL=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        patcher = mock.patch.object(metrics, 'registry', metrics.Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = Client()
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_request_measured(self):
+        """Проверяем, что запрос попадает в гистограммы своего маршрута."""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        text = self.scrape()
+        for name in metrics.HISTOGRAMS:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    sample(text, f'{name}_count', 'posts:index'), 2)
+        self.assertGreater(
+            sample(text, 'yatube_db_queries_sum', 'posts:index'), 0)
+        self.assertGreater(sample(
+            text, 'yatube_template_render_seconds_sum', 'posts:index'), 0)
+        self.assertGreater(
+            sample(text, 'yatube_cache_hits_sum', 'posts:index'), 0)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 2', text)
+
+    def test_workers_aggregated(self):
+        """Проверяем, что /metrics складывает файлы всех процессов."""
+        other = metrics.Registry()
+        other.observe('yatube_db_queries', 'posts:index', 7)
+        with open(os.path.join(self.directory.name, '1.json'), 'w') as f:
+            json.dump(other.dump(), f)
+        self.client.get(reverse('posts:index'))
+
+        text = self.scrape()
+
+        self.assertEqual(
+            sample(text, 'yatube_db_queries_count', 'posts:index'), 2)
+        self.assertGreater(
+            sample(text, 'yatube_db_queries_sum', 'posts:index'), 7)
+
+    def test_dead_workers_folded_into_aggregate(self):
+        """Проверяем, что файлы завершившихся процессов сливаются в итог."""
+        process = subprocess.Popen(['true'])
+        process.wait()
+        other = metrics.Registry()
+        other.observe('yatube_db_queries', 'posts:index', 7)
+        path = os.path.join(self.directory.name, f'{process.pid}.json')
+        with open(path, 'w') as f:
+            json.dump(other.dump(), f)
+
+        for _ in range(2):
+            text = self.scrape()
+            self.assertEqual(
+                sample(text, 'yatube_db_queries_sum', 'posts:index'), 7)
+
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.directory.name, metrics.AGGREGATE)))
+
+    def test_external_address_denied(self):
+        """Проверяем, что с внешнего адреса метрики недоступны."""
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.5')
+
+        self.assertEqual(response.status_code, 404)
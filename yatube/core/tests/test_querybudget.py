@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.template import engines
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from core.querybudget import QueryBudgetExceeded, query_budget
+
+User = get_user_model()
+
+TEMPLATE = """<ul>
+{% for user in users %}
+  <li>{{ user.groups.count }}</li>
+{% endfor %}
+</ul>"""
+
+
+@query_budget(2)
+def lazy_view(request):
+    template = engines['django'].from_string(TEMPLATE)
+    return HttpResponse(template.render({'users': User.objects.all()}))
+
+
+urlpatterns = [
+    path('lazy/', lazy_view, name='lazy'),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, QUERY_BUDGET_CHECKS=True)
+class QueryBudgetTests(TestCase):
+
+    def test_budget_exceeded(self):
+        """Проверяем, что превышение бюджета указывает строку шаблона."""
+        for number in range(3):
+            User.objects.create(username=f'user_{number}')
+
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            self.client.get('/lazy/')
+
+        message = str(raised.exception)
+        self.assertIn('lazy: 4 SQL-запросов при бюджете 2', message)
+        self.assertIn('3 x <unknown source>:3', message)
+
+    def test_within_budget_repeats_logged(self):
+        """Проверяем, что повторы в пределах бюджета пишутся в лог."""
+        for number in range(3):
+            User.objects.create(username=f'user_{number}')
+
+        with self.settings(QUERY_BUDGETS={'lazy': 10}), \
+                self.assertLogs('core.querybudget', 'WARNING') as logs:
+            response = self.client.get('/lazy/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('<unknown source>:3', logs.output[0])
+
+    def test_checks_disabled(self):
+        """Проверяем, что без QUERY_BUDGET_CHECKS бюджет не проверяется."""
+        for number in range(3):
+            User.objects.create(username=f'user_{number}')
+
+        with self.settings(QUERY_BUDGET_CHECKS=False):
+            response = self.client.get('/lazy/')
+
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.urls import reverse
+
+from core import replicas
+from core.db.base import DatabaseWrapper
+from posts import generations
+from posts.models import Post
+
+ALIAS = 'sqlite_replica'
+
+
+@replicas.require_GET
+def read_view(request):
+    return HttpResponse(router.db_for_read(Post))
+
+
+def write_view(request):
+    router.db_for_write(Post)
+    return HttpResponse(router.db_for_read(Post))
+
+
+@replicas.require_GET
+def generation_view(request):
+    generations.version((generations.GLOBAL,))
+    before = router.db_for_read(Post)
+    generations.bump(generations.GLOBAL)
+    generations.version((generations.GLOBAL,))
+    return HttpResponse(f'{before} {router.db_for_read(Post)}')
+
+
+class SnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, 'db.sqlite3')
+        self.target = os.path.join(directory.name, 'replica.sqlite3')
+        primary = sqlite3.connect(self.source)
+        self.addCleanup(primary.close)
+        primary.execute('PRAGMA journal_mode = WAL')
+        primary.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+        primary.execute('INSERT INTO item VALUES (1)')
+        primary.commit()
+        self.primary = primary
+
+    def count(self, db):
+        with db.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            return cursor.fetchone()[0]
+
+    def test_snapshot(self):
+        """Проверяем снимок WAL-базы: данные, журнал DELETE и время."""
+        started = replicas.snapshot(self.source, self.target)
+
+        copy = sqlite3.connect(self.target)
+        self.addCleanup(copy.close)
+        self.assertEqual(
+            copy.execute('SELECT id FROM item').fetchall(), [(1,)])
+        self.assertEqual(
+            copy.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+        self.assertFalse(os.path.exists(f'{self.target}-wal'))
+        self.assertFalse(os.path.exists(f'{self.target}.tmp'))
+        self.assertEqual(replicas.taken(self.target), started)
+        self.assertIsNone(replicas.taken(f'{self.target}.missing'))
+
+    def test_replica_reconnects_to_new_snapshot(self):
+        """Проверяем, что подключение к реплике видит следующий снимок."""
+        replicas.snapshot(self.source, self.target)
+        db = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': self.target,
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {'pragmas': {'query_only': 1}},
+        }, ALIAS)
+        connections[ALIAS] = db
+        self.addCleanup(connections.__delitem__, ALIAS)
+        self.addCleanup(db.close)
+        self.assertEqual(self.count(db), 1)
+
+        self.primary.execute('INSERT INTO item VALUES (2)')
+        self.primary.commit()
+        replicas.snapshot(self.source, self.target)
+        db.close_if_unusable_or_obsolete()
+
+        self.assertEqual(self.count(db), 2)
+        with self.assertRaises(OperationalError), db.cursor() as cursor:
+            cursor.execute('INSERT INTO item VALUES (3)')
+
+
+# Внутри транзакции TestCase маршрутизатор всегда выбирает основную базу
+class ReplicaRoutingTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = replicas.ReplicaMiddleware(self.handle)
+        patcher = mock.patch.object(
+            replicas, 'fresh_replicas',
+            return_value={'replica': time.time() - 1})
+        self.fresh_replicas = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handle(self, request):
+        view = request.view
+        self.middleware.process_view(request, view, (), {})
+        return view(request)
+
+    def call(self, view, method='get'):
+        request = getattr(self.factory, method)('/')
+        request.view = view
+        return self.middleware(request)
+
+    def test_read_view_uses_replica(self):
+        """Проверяем, что require_GET читает с реплики, запись - в основную."""
+        response = self.call(read_view)
+
+        self.assertEqual(response.content, b'replica')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_without_fresh_replica(self):
+        """Проверяем, что без свежей реплики чтения идут в основную базу."""
+        self.fresh_replicas.return_value = {}
+
+        response = self.call(read_view)
+
+        self.assertEqual(response.content, b'default')
+
+    def test_read_your_writes(self):
+        """Проверяем, что после записи чтения идут в основную базу."""
+        for method in ('post', 'get'):
+            with self.subTest(method=method):
+                response = self.call(write_view, method)
+
+                self.assertEqual(response.content, b'default')
+                self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+        self.factory.cookies[replicas.PIN_COOKIE] = '1'
+        response = self.call(read_view)
+
+        self.assertEqual(response.content, b'default')
+
+    def test_newer_generation(self):
+        """Проверяем, что поколение новее снимка читается из основной базы."""
+        generations.version((generations.GLOBAL,))
+
+        response = self.call(generation_view)
+
+        self.assertEqual(response.content, b'replica default')
+
+    def test_migrations_skip_replica(self):
+        """Проверяем, что миграции не применяются к реплике."""
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+    def test_lag_metric(self):
+        """Проверяем отставание реплики на странице /metrics."""
+        with mock.patch.object(replicas, 'lag', return_value=1.23456):
+            response = self.client.get(reverse('metrics'))
+
+        self.assertContains(
+            response, 'yatube_replica_lag_seconds{alias="replica"} 1.235')
@@ -0,0 +1,106 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache.shared import SLOT_HEADER, SharedMemoryCache
+
+PARAMS = {'OPTIONS': {'SLABS': {256: 8, 1024: 4}, 'PROBES': 4}}
+
+
+def increment(location, times):
+    cache = SharedMemoryCache(location, PARAMS)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'cache.bin')
+        self.cache = SharedMemoryCache(self.location, PARAMS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_basic_operations(self):
+        """Проверяем set/get/add/delete/incr и размещение по слэбам."""
+        self.cache.set('key', 'value')
+        self.cache.set('large', 'x' * 600)
+
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(len(self.cache.get('large')), 600)
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.cache.set('number', 1)
+        self.assertEqual(self.cache.incr('number', 2), 3)
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_value_larger_than_slot_not_stored(self):
+        """Проверяем, что запись крупнее самого большого слота пропускается."""
+        self.cache.set('huge', 'x' * 2000)
+
+        self.assertIsNone(self.cache.get('huge'))
+
+    def test_expired_entries(self):
+        """Проверяем, что просроченная запись не читается."""
+        self.cache.set('key', 'value', timeout=0.01)
+        time.sleep(0.02)
+
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_corrupted_value_is_miss(self):
+        """Проверяем, что испорченное значение читается как промах."""
+        self.cache.set('key', 'value')
+        self.cache.set('number', 1)
+        for key in ('key', 'number'):
+            _, digest = self.cache._prepare(key, None)
+            offset, key_len, value_len, _ = self.cache._find(
+                self.cache.make_key(key).encode(), digest)
+            start = offset + SLOT_HEADER.size + key_len
+            self.cache._map[start:start + value_len] = b'\x00' * value_len
+
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+        with self.assertRaises(ValueError):
+            self.cache.incr('number')
+        self.assertTrue(self.cache.add('number', 5))
+        self.assertEqual(self.cache.incr('number'), 6)
+
+    def test_lru_eviction_keeps_recently_read(self):
+        """Проверяем, что при переполнении вытесняются давно не читанные."""
+        self.cache.set('hot', 'value')
+        for i in range(50):
+            self.cache.get('hot')
+            self.cache.set(f'cold{i}', i)
+
+        self.assertEqual(self.cache.get('hot'), 'value')
+        self.assertLess(
+            sum(self.cache.get(f'cold{i}') is not None for i in range(50)), 50)
+
+    def test_shared_between_processes(self):
+        """Проверяем, что процессы видят общий кэш и incr атомарен."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [
+            context.Process(target=increment, args=(self.location, 100))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertEqual(self.cache.get('counter'), 400)
+
+    def test_clear_visible_to_other_instances(self):
+        """Проверяем, что clear() очищает кэш для всех процессов."""
+        other = SharedMemoryCache(self.location, PARAMS)
+        self.cache.set('key', 'value')
+        self.assertEqual(other.get('key'), 'value')
+
+        other.clear()
+
+        self.assertIsNone(self.cache.get('key'))
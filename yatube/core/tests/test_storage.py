@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage, is_hashed
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_identical_content_stored_once(self):
+        """Проверяем, что одинаковые файлы сохраняются в один."""
+        first = self.storage.save('posts/a.JPG', ContentFile(b'meme'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'meme'))
+        other = self.storage.save('posts/a.jpg', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(is_hashed(first))
+        self.assertFalse(is_hashed('posts/a.jpg'))
+        with self.storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'meme')
+
+    def test_sharded_by_hash_prefix(self):
+        """Проверяем раскладку по каталогам из первых байтов хэша."""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'meme'))
+
+        directory, filename = os.path.split(name)
+        self.assertEqual(directory, f'posts/{filename[:2]}/{filename[2:4]}')
+        self.assertTrue(filename.endswith('.jpg'))
+        self.assertEqual(
+            os.listdir(self.storage.path(directory)), [filename])
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import tiered
+from core.cache.tiered import TieredCache
+
+
+def make_cache(**options):
+    return TieredCache(None, {'OPTIONS': {'L2': 'l2', **options}})
+
+
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.override = override_settings(CACHES={'l2': {
+            'BACKEND': 'core.cache.shared.SharedMemoryCache',
+            'LOCATION': os.path.join(self.directory.name, 'cache.bin'),
+            'OPTIONS': {'SLABS': {1024: 64}},
+        }})
+        self.override.enable()
+        self.cache = make_cache()
+        # Другой воркер: свой L1 и свои блокировки
+        self.other = make_cache()
+
+    def tearDown(self):
+        self.override.disable()
+        self.directory.cleanup()
+
+    def test_l1_in_front_of_l2(self):
+        """Проверяем, что L1 отвечает без L2, а другие воркеры читают L2."""
+        self.cache.set('key', 'value', 60)
+        self.assertEqual(self.other.get('key'), 'value')
+
+        caches['l2'].clear()
+        hits = tiered.stats().get('l1_hits', 0)
+
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(tiered.stats()['l1_hits'], hits + 1)
+
+    def test_single_flight_serves_stale(self):
+        """Проверяем, что истекшую запись пересобирает один воркер."""
+        self.cache.set('key', 'old', 0.05)
+        time.sleep(0.1)
+        seen = []
+
+        def rebuild():
+            seen.append(self.other.get_or_set('key', 'other'))
+            return 'new'
+
+        self.assertEqual(self.cache.get_or_set('key', rebuild, 60), 'new')
+        self.assertEqual(seen, ['old'])
+        self.assertEqual(self.other.get('key'), 'new')
+
+    def test_waits_for_rebuild_without_stale(self):
+        """Проверяем, что без старого значения воркер ждет пересборку."""
+        def rebuild():
+            time.sleep(0.05)
+            return 'value'
+
+        thread = threading.Thread(
+            target=self.cache.get_or_set, args=('key', rebuild, 60))
+        thread.start()
+        time.sleep(0.01)
+
+        self.assertEqual(self.other.get_or_set('key', 'other', 60), 'value')
+        thread.join()
+
+    def test_get_takes_no_lock(self):
+        """Проверяем, что get и пустая пересборка не оставляют блокировку."""
+        self.assertIsNone(self.cache.get('key'))
+        self.assertIsNone(self.cache.get_or_set('key', lambda: None))
+
+        started = time.monotonic()
+        self.assertEqual(self.other.get_or_set('key', 'value', 60), 'value')
+        self.assertLess(time.monotonic() - started, 0.1)
+        self.assertFalse(caches['l2'].has_key('rebuild::1:key', version=0))
+
+    def test_early_recompute(self):
+        """Проверяем, что дорогую запись пересобирают до истечения срока."""
+        def rebuild():
+            time.sleep(0.01)
+            return 'value'
+
+        self.cache.get_or_set('key', rebuild, 60)
+        eager = make_cache(BETA=10 ** 9)
+        rebuilds = tiered.stats().get('early_rebuilds', 0)
+
+        self.assertEqual(self.other.get_or_set('key', 'other'), 'value')
+        self.assertEqual(eager.get('key'), 'value')
+        self.assertEqual(eager.get_or_set('key', 'new'), 'new')
+        self.assertEqual(tiered.stats()['early_rebuilds'], rebuilds + 1)
+
+    def test_incr_invalidates_l1(self):
+        """Проверяем, что incr виден сразу и хранится в L2 атомарно."""
+        self.cache.add('generation', 1, None)
+        self.assertEqual(self.cache.get('generation'), 1)
+
+        self.assertEqual(self.other.incr('generation'), 2)
+        self.assertEqual(self.cache.incr('generation'), 3)
+        self.assertEqual(self.cache.get('generation'), 3)
+
+    def test_l2_only_keys(self):
+        """Проверяем, что ключи L2_ONLY не залеживаются в L1 воркера."""
+        cache = make_cache(L2_ONLY=('gen:',))
+        cache.add('gen:global', 1, None)
+        self.assertEqual(cache.get('gen:global'), 1)
+
+        self.other.incr('gen:global')
+
+        self.assertEqual(cache.get('gen:global'), 2)
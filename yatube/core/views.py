@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics as request_metrics
+from . import replicas
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,23 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики всех процессов для Prometheus (внутренние адреса и staff)."""
+    if not (request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+            or request.user.is_staff):
+        raise Http404
+    directory = getattr(settings, 'METRICS_DIR', None)
+    if directory:
+        request_metrics.registry.flush(directory)
+        values = request_metrics.collect(directory)
+    else:
+        values = {}
+    lag = request_metrics.render_gauge(
+        'yatube_replica_lag_seconds',
+        'Время с начала последнего снимка реплики.', 'alias',
+        {alias: replicas.lag(alias) for alias in replicas.replicas()})
+    return HttpResponse(
+        request_metrics.render(values) + lag,
+        content_type=request_metrics.CONTENT_TYPE)
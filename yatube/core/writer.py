@@ -0,0 +1,323 @@
+"""
+Единственный процесс записи в SQLite с групповой фиксацией.
+
+SQLite пропускает одного писателя за раз; остальные воркеры ждут
+блокировку в busy_timeout, и под нагрузкой это хвост задержек. Если
+задан WRITER_SOCKET, операции, объявленные @operation, не выполняются
+в воркере, а уходят по unix-сокету процессу `manage.py run_writer`.
+Он собирает пришедшие за WRITER_BATCH_WAIT секунд операции (не больше
+WRITER_BATCH_SIZE) и выполняет их в одной транзакции, каждую в своей
+точке сохранения; ответ уходит воркеру только после фиксации. Если
+пачка не фиксируется целиком (например, отложенная проверка внешнего
+ключа), операции повторяются по одной.
+
+Каждая отправка несет токен, и результат фиксируется вместе с ним
+(WriteToken). Если ответ не пришел, воркер не знает, зафиксирована ли
+пачка, и выполняет операцию на месте с тем же токеном: транзакции
+SQLite идут по очереди, поэтому уже выполненная операция только
+вернет сохраненный результат. Старые токены удаляет процесс записи.
+
+Без WRITER_SOCKET, а также если процесс записи не запущен, операция
+выполняется на месте в своей транзакции. Операции ищутся в модулях
+writes.py приложений; аргументы и результат - JSON.
+"""
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core import replicas
+from core.models import WriteToken
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+OPERATIONS = {}
+_local = threading.local()
+
+
+class WriterError(Exception):
+    """Операция не выполнена процессом записи."""
+
+
+def operation(func):
+    """Объявляет функцию операцией записи; вызов идет через submit."""
+    name = f'{func.__module__}.{func.__qualname__}'
+    OPERATIONS[name] = func
+
+    def submit_operation(**kwargs):
+        return submit(name, kwargs)
+
+    submit_operation.__name__ = func.__name__
+    submit_operation.__doc__ = func.__doc__
+    submit_operation.operation = name
+    return submit_operation
+
+
+def run(name, kwargs, token=None):
+    with transaction.atomic():
+        if token is not None:
+            done = WriteToken.objects.filter(token=token).values_list(
+                'result', flat=True).first()
+            if done is not None:
+                return json.loads(done)
+        result = OPERATIONS[name](**kwargs)
+        if token is not None:
+            WriteToken.objects.create(token=token, result=json.dumps(result))
+        return result
+
+
+# Протокол: кадры с длиной (4 байта) и JSON
+
+def send_frame(sock, data):
+    payload = json.dumps(data).encode()
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def recv_exactly(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('Соединение закрыто.')
+        data += chunk
+    return data
+
+
+def recv_frame(sock):
+    size, = HEADER.unpack(recv_exactly(sock, HEADER.size))
+    return json.loads(recv_exactly(sock, size))
+
+
+# Воркер
+
+def connect():
+    path = settings.WRITER_SOCKET
+    if getattr(_local, 'path', None) != path:
+        disconnect()
+    sock = getattr(_local, 'sock', None)
+    if sock is None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(getattr(settings, 'WRITER_TIMEOUT', 30))
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            raise
+        _local.sock, _local.path = sock, path
+    return sock
+
+
+def disconnect():
+    sock = getattr(_local, 'sock', None)
+    _local.sock = None
+    if sock is not None:
+        sock.close()
+
+
+def send(request):
+    """Отправляет кадр процессу записи; None - процесс недоступен."""
+    try:
+        sock = connect()
+    except OSError:
+        return None
+    try:
+        send_frame(sock, request)
+        return sock
+    except OSError:
+        # Соединение устарело (процесс записи перезапускался):
+        # кадр не дошел, повторяем по новому соединению
+        disconnect()
+    try:
+        sock = connect()
+        send_frame(sock, request)
+    except OSError:
+        disconnect()
+        return None
+    return sock
+
+
+def submit(name, kwargs):
+    """Выполняет операцию в процессе записи и ждет фиксации."""
+    replicas.written()
+    if not getattr(settings, 'WRITER_SOCKET', None):
+        return run(name, kwargs)
+    token = uuid.uuid4().hex
+    sock = send({'operation': name, 'kwargs': kwargs, 'token': token})
+    if sock is None:
+        logger.warning('Процесс записи недоступен, пишем на месте.')
+        return run(name, kwargs, token)
+    try:
+        response = recv_frame(sock)
+    except (OSError, ValueError) as exc:
+        disconnect()
+        # Пачка могла быть зафиксирована: токен не даст выполнить дважды
+        logger.warning(
+            '%s: нет ответа процесса записи (%s), пишем на месте.', name, exc)
+        return run(name, kwargs, token)
+    if 'error' in response:
+        raise WriterError(f'{name}: {response["error"]}')
+    return response['result']
+
+
+# Процесс записи
+
+class Item:
+
+    def __init__(self, name, kwargs, token=None):
+        self.name = name
+        self.kwargs = kwargs
+        self.token = token
+        self.response = None
+        self.done = threading.Event()
+
+    def execute(self):
+        """Выполняет операцию в точке сохранения текущей транзакции."""
+        try:
+            if self.name not in OPERATIONS:
+                raise KeyError(f'Неизвестная операция {self.name}.')
+            self.response = {
+                'result': run(self.name, self.kwargs, self.token)}
+        except Exception as exc:
+            logger.exception('Операция %s не выполнена.', self.name)
+            self.response = {'error': f'{type(exc).__name__}: {exc}'}
+
+
+class Handler(socketserver.BaseRequestHandler):
+
+    def setup(self):
+        with self.server.lock:
+            self.server.clients.add(self.request)
+
+    def finish(self):
+        with self.server.lock:
+            self.server.clients.discard(self.request)
+
+    def handle(self):
+        while True:
+            try:
+                request = recv_frame(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            item = Item(request.get('operation'), request.get('kwargs', {}),
+                        request.get('token'))
+            self.server.writer.items.put(item)
+            item.done.wait()
+            send_frame(self.request, item.response)
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # воркеры подключаются разом при старте
+    request_queue_size = 128
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.clients = set()
+
+    def close_clients(self):
+        """Закрывает соединения воркеров: они переподключатся."""
+        with self.lock:
+            for client in self.clients:
+                client.shutdown(socket.SHUT_RDWR)
+
+
+class Writer:
+
+    def __init__(self, path, batch_size=None, batch_wait=None):
+        self.path = path
+        self.batch_size = batch_size or getattr(
+            settings, 'WRITER_BATCH_SIZE', 64)
+        self.batch_wait = batch_wait if batch_wait is not None else getattr(
+            settings, 'WRITER_BATCH_WAIT', 0.002)
+        self.items = queue.Queue()
+        self.batches = 0
+        self.committed = 0
+        self.purged = time.monotonic()
+        autodiscover_modules('writes')
+
+    def next_batch(self):
+        first = self.items.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = (self.items.get(timeout=timeout) if timeout > 0
+                        else self.items.get_nowait())
+            except queue.Empty:
+                break
+            if item is None:
+                self.items.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def commit(self, batch):
+        """Одна транзакция на пачку; при сбое фиксации - по одной."""
+        # Как request_started у воркера: проверка постоянного подключения
+        for connection in connections.all():
+            if not connection.in_atomic_block:
+                connection.close_if_unusable_or_obsolete()
+        try:
+            with transaction.atomic():
+                for item in batch:
+                    item.execute()
+        except DatabaseError:
+            logger.exception('Пачка не зафиксирована, пишем по одной.')
+            for item in batch:
+                item.execute()
+        self.batches += 1
+        self.committed += len(batch)
+        for item in batch:
+            item.done.set()
+        self.purge()
+
+    def purge(self):
+        """Удаляет токены старше WRITER_TOKEN_TTL, не чаще раза в минуту."""
+        if time.monotonic() - self.purged < 60:
+            return
+        self.purged = time.monotonic()
+        ttl = getattr(settings, 'WRITER_TOKEN_TTL', 60 * 60)
+        WriteToken.objects.filter(
+            created__lt=timezone.now() - timedelta(seconds=ttl)).delete()
+
+    def serve(self, ready=None):
+        """Принимает операции, пока не вызван stop."""
+        # Сокет от прошлого запуска
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = Server(self.path, Handler)
+        server.writer = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        if ready is not None:
+            ready.set()
+        try:
+            batch = self.next_batch()
+            while batch is not None:
+                self.commit(batch)
+                batch = self.next_batch()
+        finally:
+            server.shutdown()
+            server.close_clients()
+            server.server_close()
+            os.unlink(self.path)
+
+    def stop(self):
+        """Завершает serve после уже принятых операций."""
+        self.items.put(None)
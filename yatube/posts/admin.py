@@ -1,9 +1,35 @@
 from django.contrib import admin
+from django.utils.text import capfirst
 
-from .models import Group, Post
+from core.admin import ScalableModelAdmin
 
+from . import fulltext, reaper
+from .models import Comment, Deletion, Follow, Group, Post
 
-class PostAdmin(admin.ModelAdmin):
+
+class DeferredDeleteMixin:
+    """Удаление скрывает объект, а зависимые строки удалит reap_deleted."""
+
+    def get_deleted_objects(self, objs, request):
+        # Права на удаление зависимых строк проверяем как обычно, но не
+        # выводим их список: у автора это все его посты и комментарии
+        objs = list(objs)
+        _, _, perms_needed, protected = super().get_deleted_objects(
+            objs, request)
+        opts = self.model._meta
+        return (
+            [f'{capfirst(opts.verbose_name)}: {obj}' for obj in objs],
+            {opts.verbose_name_plural: len(objs)}, perms_needed, protected)
+
+    def delete_model(self, request, obj):
+        reaper.schedule(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            reaper.schedule(obj)
+
+
+class PostAdmin(DeferredDeleteMixin, ScalableModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,15 +38,60 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
+    empty_value_display = '-пусто-'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE '%...%' по всей таблице - полнотекстовый индекс
+        if not search_term.strip():
+            return queryset, False
+        if not fulltext.match_expression(search_term):
+            return queryset.none(), False
+        return queryset.filter(pk__in=fulltext.post_ids(
+            search_term, kinds=(fulltext.POST,))), False
+
+
+class CommentAdmin(ScalableModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    list_filter = ('created',)
+    date_hierarchy = 'created'
+    ordering = ('-created', '-id')
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
     empty_value_display = '-пусто-'
 
 
-class GroupAdmin(admin.ModelAdmin):
+class FollowAdmin(ScalableModelAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+
+
+class GroupAdmin(DeferredDeleteMixin, admin.ModelAdmin):
     list_display = ('pk', 'title', 'slug', 'description')
+    search_fields = ('title', 'slug')
+
+
+class DeletionAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'object_id', 'requested', 'done', 'total')
+    list_filter = ('kind',)
+    readonly_fields = ('kind', 'object_id', 'requested', 'done', 'total')
+
+    def has_add_permission(self, request):
+        return False
 
 
 admin.site.register(Group, GroupAdmin)
 
 admin.site.register(Post, PostAdmin)
+
+admin.site.register(Comment, CommentAdmin)
+
+admin.site.register(Follow, FollowAdmin)
+
+admin.site.register(Deletion, DeletionAdmin)
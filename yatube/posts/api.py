@@ -0,0 +1,156 @@
+"""
+JSON API лент и комментариев только для чтения.
+
+Строки читаются через .values() только для запрошенных полей
+(`?fields=id,text`), без создания моделей, и листаются курсором, как
+HTML-ленты. ETag строится из поколения кэша области и адреса запроса:
+пока область не менялась, ответ побайтно тот же, и повторный запрос с
+If-None-Match получает 304, не читая саму ленту.
+"""
+import hashlib
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core.paginator import CursorPaginator
+from core.querybudget import query_budget
+from core.replicas import require_GET
+
+from . import generations
+from .models import Comment, Deletion, Group, Post, User
+from .views import (COMMENTS_ORDERING, COMMENTS_PER_PAGE, POSTS_ORDERING,
+                    POSTS_PER_PAGE)
+
+# Имя поля в ответе -> поле для .values()
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+}
+
+
+def image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+CONVERTERS = {
+    'image': image_url,
+}
+
+
+def error(detail, status):
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def parse_fields(request, available):
+    """Запрошенные поля в порядке available; ValueError для неизвестных."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    names = {name.strip() for name in requested.split(',') if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        raise ValueError(
+            'Неизвестные поля: {}.'.format(', '.join(sorted(unknown))))
+    return [name for name in available if name in names]
+
+
+def serialize(row, fields, available):
+    item = {}
+    for name in fields:
+        value = row[available[name]]
+        convert = CONVERTERS.get(name)
+        item[name] = value if convert is None else convert(value)
+    return item
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def feed_response(request, queryset, available, ordering, per_page, scope):
+    """Страница ленты в JSON с курсорами и ETag поколения области."""
+    try:
+        fields = parse_fields(request, available)
+    except ValueError as exc:
+        return error(str(exc), status=400)
+    version = generations.version(scope)
+    etag = quote_etag(hashlib.sha1(
+        f'{version}:{request.get_full_path()}'.encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        keys = [field.lstrip('-') for field in ordering]
+        lookups = dict.fromkeys(
+            [available[name] for name in fields] + keys)
+        paginator = CursorPaginator(
+            queryset.values(*lookups), per_page, ordering=ordering)
+        page = paginator.get_cursor_page(request.GET.get('cursor'))
+        response = JsonResponse({
+            'results': [serialize(row, fields, available) for row in page],
+            'next': page_link(request, page.next_cursor),
+            'previous': page_link(request, page.previous_cursor),
+        }, json_dumps_params={'ensure_ascii': False})
+    response['ETag'] = etag
+    return response
+
+
+def posts_response(request, posts, scope):
+    return feed_response(
+        request, posts, POST_FIELDS, POSTS_ORDERING, POSTS_PER_PAGE, scope)
+
+
+@query_budget(3)
+@require_GET
+def index(request):
+    return posts_response(request, Post.objects.all(), (generations.GLOBAL,))
+
+
+@query_budget(4)
+@require_GET
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True).first()
+    if group_id is None:
+        return error('Группа не найдена.', status=404)
+    return posts_response(
+        request, Post.objects.filter(group_id=group_id),
+        (generations.GROUP, group_id))
+
+
+@query_budget(4)
+@require_GET
+def profile(request, username):
+    author_id = User.objects.filter(username=username).exclude(
+        pk__in=Deletion.scheduled(Deletion.USER)).values_list(
+        'id', flat=True).first()
+    if author_id is None:
+        return error('Пользователь не найден.', status=404)
+    return posts_response(
+        request, Post.objects.filter(author_id=author_id),
+        (generations.AUTHOR, author_id))
+
+
+@query_budget(4)
+@require_GET
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error('Пост не найден.', status=404)
+    return feed_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        COMMENTS_ORDERING, COMMENTS_PER_PAGE, (generations.POST, post_id))
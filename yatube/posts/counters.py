@@ -0,0 +1,147 @@
+"""Денормализованные счетчики постов, комментариев и подписок."""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (Comment, Deletion, Follow, Group, Post, StoredImage,
+                     User, UserStats)
+
+
+def get_stats(user):
+    # Только чтение: строку создают сигнал или reconcile_counters, иначе
+    # страница профиля брала бы блокировку записи SQLite и не читалась
+    # бы с реплики
+    return (UserStats.objects.filter(user_id=user.pk).first()
+            or UserStats(user=user))
+
+
+def bump(queryset, field, delta):
+    if delta < 0:
+        # Не уходим ниже нуля: расхождение исправит reconcile_counters.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    updated = bump(UserStats.objects.filter(user_id=user_id), field, delta)
+    # При каскадном удалении пользователя его строка уже удалена.
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        bump(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        bump(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def post_created(post):
+    bump_user(post.author_id, 'posts_count', 1)
+    bump_group(post.group_id, 1)
+
+
+def post_moved(old_group_id, new_group_id):
+    if old_group_id != new_group_id:
+        bump_group(old_group_id, -1)
+        bump_group(new_group_id, 1)
+
+
+def post_deleted(post):
+    if post.deleted:
+        # Скрытый пост вычтен из счетчиков в posts_hidden
+        return
+    bump_user(post.author_id, 'posts_count', -1)
+    bump_group(post.group_id, -1)
+
+
+def posts_hidden(posts):
+    """Посты скрыты до удаления: вычитаем их из счетчиков сразу."""
+    visible = posts.filter(deleted=False).order_by()
+    for author_id, total in visible.values('author_id').annotate(
+            total=Count('pk')).values_list('author_id', 'total'):
+        bump_user(author_id, 'posts_count', -total)
+    for group_id, total in visible.exclude(group=None).values(
+            'group_id').annotate(total=Count('pk')).values_list(
+            'group_id', 'total'):
+        bump_group(group_id, -total)
+
+
+def user_hidden(user_id):
+    """Пользователь скрыт до удаления: его подписки больше не считаются."""
+    bump(UserStats.objects.filter(user_id__in=Follow.objects.filter(
+        user_id=user_id).values('author_id')), 'followers_count', -1)
+    bump(UserStats.objects.filter(user_id__in=Follow.objects.filter(
+        author_id=user_id).values('user_id')), 'following_count', -1)
+    UserStats.objects.filter(user_id=user_id).update(
+        followers_count=0, following_count=0)
+
+
+def comment_changed(comment, delta):
+    if comment.post_id is not None:
+        bump(Post.objects.filter(pk=comment.post_id), 'comments_count', delta)
+
+
+def follow_changed(follow, delta):
+    if delta < 0 and Deletion.objects.filter(
+            kind=Deletion.USER,
+            object_id__in=(follow.user_id, follow.author_id)).exists():
+        # Подписки скрытого пользователя вычтены в user_hidden
+        return
+    bump_user(follow.author_id, 'followers_count', delta)
+    bump_user(follow.user_id, 'following_count', delta)
+
+
+def count_of(model, field, condition=Q()):
+    """Подзапрос COUNT(*) строк model, ссылающихся на внешнюю строку."""
+    return Coalesce(Subquery(
+        model._base_manager.filter(condition, **{field: OuterRef('pk')})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+# Скрытые до удаления посты и подписки скрытых пользователей не
+# считаются, но файлы картинок скрытые посты еще держат
+VISIBLE_POSTS = Q(deleted=False)
+VISIBLE_FOLLOWS = (
+    ~Q(user__in=Deletion.scheduled(Deletion.USER))
+    & ~Q(author__in=Deletion.scheduled(Deletion.USER))
+)
+
+COUNTERS = (
+    (Group, 'posts_count', Post, 'group', VISIBLE_POSTS),
+    (Post, 'comments_count', Comment, 'post', Q()),
+    (UserStats, 'posts_count', Post, 'author', VISIBLE_POSTS),
+    (UserStats, 'followers_count', Follow, 'author', VISIBLE_FOLLOWS),
+    (UserStats, 'following_count', Follow, 'user', VISIBLE_FOLLOWS),
+    (StoredImage, 'references', Post, 'image', Q()),
+)
+
+
+def reconcile():
+    """
+    Пересчитывает все счетчики пачкой UPDATE ... SET = (SELECT COUNT(*)).
+
+    Возвращает словарь «счетчик: число исправленных строк».
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing.iterator()],
+        ignore_conflicts=True)
+    # Скрытые посты еще держат свои файлы
+    images = Post.all_objects.exclude(image='').exclude(
+        image__in=StoredImage.objects.values('name')).values_list(
+        'image', flat=True).distinct()
+    StoredImage.objects.bulk_create(
+        [StoredImage(name=name) for name in images.iterator()],
+        ignore_conflicts=True)
+    fixed = {}
+    for model, field, source, lookup, condition in COUNTERS:
+        # У UserStats первичный ключ - user, подзапрос смотрит на него же.
+        actual = count_of(source, lookup, condition)
+        drifted = model._base_manager.annotate(actual=actual).exclude(
+            **{field: F('actual')})
+        fixed[f'{model.__name__}.{field}'] = model._base_manager.filter(
+            pk__in=drifted.values('pk')
+        ).update(**{field: actual})
+    return fixed
@@ -0,0 +1,276 @@
+"""
+Ленты подписок: гибрид fan-out on write и fan-out on read.
+
+Посты обычных авторов раскладываются в Timeline подписчиков при
+публикации. Посты «знаменитостей» никуда не копируются: при чтении
+ленты они подмешиваются из закэшированных списков последних постов
+автора.
+
+Режим автора хранит UserStats.timeline_mode, а меняют его условные
+UPDATE, поэтому одновременные подписки и отписки не теряют изменений.
+Автор становится знаменитостью, когда подписчиков не меньше
+TIMELINE_CELEBRITY_THRESHOLD, а обратно переходит, когда их меньше
+доли TIMELINE_CELEBRITY_DEMOTE_RATIO от порога. Понижаемый автор
+(DEMOTING) и подмешивается, и раскладывается, пока
+`manage.py demote_celebrities` пачками дописывает ленты его
+подписчиков; повторы в ленте убирает CursorPaginator.
+"""
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core.paginator import NEXT
+
+from . import generations
+from .models import Follow, Post, Timeline, UserStats
+
+CELEBRITIES_KEY = 'feed:celebrities:{}'
+RECENT_POSTS_KEY = 'feed:recent:{}'
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def celebrity_ids():
+    """Множество id авторов, чьи посты подмешиваются при чтении."""
+    key = CELEBRITIES_KEY.format(
+        generations.version((generations.CELEBRITIES,)))
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(UserStats.objects.exclude(
+            timeline_mode=UserStats.PUSH).values_list('user_id', flat=True))
+        cache.set(key, ids, settings.FEED_CACHE_TIMEOUT)
+    return ids
+
+
+def is_celebrity(author_id):
+    return author_id in celebrity_ids()
+
+
+def is_pulled(author_id):
+    """Посты автора только подмешиваются и не раскладываются."""
+    return is_celebrity(author_id) and UserStats.objects.filter(
+        user_id=author_id, timeline_mode=UserStats.PULL).exists()
+
+
+def demote_threshold():
+    return (settings.TIMELINE_CELEBRITY_THRESHOLD
+            * settings.TIMELINE_CELEBRITY_DEMOTE_RATIO)
+
+
+def switch(queryset, mode):
+    """Переводит авторов queryset в mode; меняет множество знаменитостей."""
+    switched = queryset.exclude(timeline_mode=mode).update(timeline_mode=mode)
+    if switched:
+        generations.bump(generations.CELEBRITIES)
+    return switched
+
+
+def recent_posts(author_id):
+    """Последние посты автора как список пар (pub_date, id), новые первыми."""
+    key = RECENT_POSTS_KEY.format(author_id)
+    posts = cache.get(key)
+    if posts is None:
+        posts = list(
+            Post.objects.filter(author_id=author_id)
+            .order_by('-pub_date', '-id')
+            .values_list('pub_date', 'id')
+            [:settings.TIMELINE_CELEBRITY_RECENT_POSTS]
+        )
+        cache.set(key, posts, None)
+    return posts
+
+
+def forget_recent_posts(author_id):
+    key = RECENT_POSTS_KEY.format(author_id)
+    cache.delete(key)
+    # Список, собранный до фиксации, еще без изменений транзакции
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(key))
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора пачками."""
+    if is_celebrity(post.author_id):
+        forget_recent_posts(post.author_id)
+        if is_pulled(post.author_id):
+            return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True)
+    batch_size = settings.TIMELINE_BATCH_SIZE
+    for user_ids in chunked(followers.iterator(), batch_size):
+        Timeline.objects.bulk_create([
+            Timeline(user_id=user_id, post_id=post.id, pub_date=post.pub_date)
+            for user_id in user_ids
+        ], ignore_conflicts=True)
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту подписчика уже опубликованные посты автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date')
+    batch_size = settings.TIMELINE_BATCH_SIZE
+    for rows in chunked(posts.iterator(), batch_size):
+        Timeline.objects.bulk_create([
+            Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in rows
+        ], ignore_conflicts=True)
+
+
+def backfill_followers(author_id, user_ids):
+    """Дописывает посты автора в ленты подписчиков user_ids."""
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR IGNORE INTO {Timeline._meta.db_table} '
+            '(user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} AS follow '
+            f'JOIN {Post._meta.db_table} AS post '
+            'ON post.author_id = follow.author_id '
+            'WHERE follow.author_id = %s AND NOT post.deleted '
+            f'AND follow.user_id IN ({placeholders})',
+            [author_id, *user_ids],
+        )
+        return cursor.rowcount
+
+
+def rebuild_timeline():
+    """
+    Дописывает в ленты недостающие записи одним INSERT ... SELECT,
+    например после массовой загрузки. Возвращает число новых записей.
+    """
+    stats = UserStats.objects
+    switch(stats.filter(
+        followers_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD),
+        UserStats.PULL)
+    stats.filter(
+        timeline_mode=UserStats.PULL, followers_count__lt=demote_threshold()
+    ).update(timeline_mode=UserStats.DEMOTING)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR IGNORE INTO {Timeline._meta.db_table} '
+            '(user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} AS follow '
+            f'JOIN {Post._meta.db_table} AS post '
+            'ON post.author_id = follow.author_id '
+            'WHERE NOT post.deleted AND follow.author_id NOT IN ('
+            f'SELECT user_id FROM {UserStats._meta.db_table} '
+            'WHERE timeline_mode = %s)',
+            [UserStats.PULL],
+        )
+        return cursor.rowcount
+
+
+def prune_timeline(user_id, author_id):
+    """Убирает из ленты бывшего подписчика посты автора."""
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def followed(user_id, author_id):
+    """Подписка оформлена: заполняем ленту или повышаем автора."""
+    # Счетчик уже увеличен сигналом; условие в UPDATE, а не в Python
+    promoted = switch(UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD),
+        UserStats.PULL)
+    if promoted:
+        forget_recent_posts(author_id)
+    if promoted or is_pulled(author_id):
+        return
+    backfill_timeline(user_id, author_id)
+
+
+def unfollowed(user_id, author_id):
+    """Подписка снята: чистим ленту, при необходимости понижаем автора."""
+    prune_timeline(user_id, author_id)
+    if not is_celebrity(author_id):
+        return
+    # Ленты оставшихся подписчиков дописывает demote_celebrities
+    UserStats.objects.filter(
+        user_id=author_id, timeline_mode=UserStats.PULL,
+        followers_count__lt=demote_threshold(),
+    ).update(timeline_mode=UserStats.DEMOTING)
+
+
+def demote(batch_size, pause=0, progress=None):
+    """
+    Переводит понижаемых авторов на раскладку: дописывает ленты их
+    подписчиков пачками по batch_size, каждую отдельным запросом, и
+    затем снимает подмешивание. Между пачками ждет pause секунд;
+    progress(author_id, число подписчиков) вызывается после каждой.
+    """
+    demoting = UserStats.objects.filter(timeline_mode=UserStats.DEMOTING)
+    for author_id in demoting.values_list('user_id', flat=True):
+        last = 0
+        while True:
+            # Подписавшихся позже дописывает followed
+            user_ids = list(Follow.objects.filter(
+                author_id=author_id, user_id__gt=last,
+            ).order_by('user_id').values_list(
+                'user_id', flat=True)[:batch_size])
+            if not user_ids:
+                break
+            backfill_followers(author_id, user_ids)
+            last = user_ids[-1]
+            if progress is not None:
+                progress(author_id, len(user_ids))
+            time.sleep(pause)
+        # Если автора успели снова повысить, он остается знаменитостью
+        if switch(demoting.filter(user_id=author_id), UserStats.PUSH):
+            forget_recent_posts(author_id)
+
+
+def timeline_entries(user):
+    """Записи ленты читателя вместе с постами, авторами и группами."""
+    return Timeline.objects.filter(
+        user=user, post__deleted=False).select_related(
+        'post__author', 'post__group')
+
+
+def celebrity_merge(user):
+    """
+    Источник для CursorPaginator.merge: последние посты знаменитостей,
+    на которых подписан читатель, в виде несохраненных записей Timeline.
+    """
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return None
+    authors = list(Follow.objects.filter(
+        user=user, author_id__in=celebrities
+    ).values_list('author_id', flat=True))
+    if not authors:
+        return None
+
+    def merge(values, direction, limit):
+        candidates = []
+        for author_id in authors:
+            candidates.extend(recent_posts(author_id))
+        if values is not None:
+            key = tuple(values)
+            if direction == NEXT:
+                candidates = [row for row in candidates if row < key]
+            else:
+                candidates = [row for row in candidates if row > key]
+        candidates.sort(reverse=direction == NEXT)
+        candidates = candidates[:limit]
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [post_id for _, post_id in candidates])
+        return [
+            Timeline(user_id=user.pk, post=posts[post_id],
+                     pub_date=pub_date)
+            for pub_date, post_id in candidates if post_id in posts
+        ]
+
+    return merge
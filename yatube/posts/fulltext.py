@@ -0,0 +1,146 @@
+"""
+Полнотекстовый поиск по постам и комментариям (SQLite FTS5).
+
+Тексты постов и комментариев лежат в одной виртуальной таблице
+posts_search. rowid строки - id объекта, умноженный на два, плюс вид
+объекта (POST или COMMENT), поэтому строку обновляют и удаляют по
+первичному ключу без просмотра таблицы; post_id - пост, к которому
+относится текст. Индекс обновляют сигналы, а целиком пересобирает
+команда rebuild_search_index.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+
+TABLE = 'posts_search'
+POST = 0
+COMMENT = 1
+# Больше слов в запросе не нужно, а длинный MATCH дорог
+MAX_TERMS = 10
+TERM = re.compile(r'\w+')
+
+
+def row_id(kind, pk):
+    return pk * 2 + kind
+
+
+def match_expression(query):
+    """
+    Выражение MATCH из пользовательского запроса.
+
+    Синтаксис FTS5 пользователю не доступен: каждое слово берется в
+    кавычки и ищется по префиксу, слова объединяются через AND.
+    """
+    terms = TERM.findall(query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _execute(sql, params=()):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _store(kind, pk, post_id, text):
+    _execute(
+        f'INSERT OR REPLACE INTO {TABLE} (rowid, text, post_id) '
+        'VALUES (%s, %s, %s)',
+        [row_id(kind, pk), text, post_id],
+    )
+
+
+def index_post(post):
+    _store(POST, post.pk, post.pk, post.text)
+
+
+def index_comment(comment):
+    _store(COMMENT, comment.pk, comment.post_id, comment.text)
+
+
+def remove(kind, pk):
+    _execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [row_id(kind, pk)])
+
+
+def remove_posts(posts):
+    """Убирает из индекса посты из queryset posts и комментарии к ним."""
+    sql, params = posts.values('id').query.sql_with_params()
+    _execute(
+        f'DELETE FROM {TABLE} WHERE rowid IN ('
+        f'SELECT id * 2 + {POST} FROM {Post._meta.db_table} '
+        f'WHERE id IN ({sql}) UNION ALL '
+        f'SELECT id * 2 + {COMMENT} FROM {Comment._meta.db_table} '
+        f'WHERE post_id IN ({sql}))',
+        [*params, *params],
+    )
+
+
+def rebuild():
+    """Заново индексирует все посты и комментарии; возвращает число строк."""
+    visible = f'SELECT id FROM {Post._meta.db_table} WHERE NOT deleted'
+    with transaction.atomic():
+        _execute(f'DELETE FROM {TABLE}')
+        for kind, model, post_field in (
+                (POST, Post, 'id'), (COMMENT, Comment, 'post_id')):
+            _execute(
+                f'INSERT INTO {TABLE} (rowid, text, post_id) '
+                f'SELECT id * 2 + {kind}, text, {post_field} '
+                f'FROM {model._meta.db_table} '
+                f'WHERE {post_field} IN ({visible})'
+            )
+        _execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        return _execute(f'SELECT COUNT(*) FROM {TABLE}')[0][0]
+
+
+def post_ids(query, kinds=(POST, COMMENT)):
+    """Подзапрос id постов, чей текст подходит под запрос (для pk__in)."""
+    kinds = ', '.join(str(kind) for kind in kinds)
+    return RawSQL(
+        f'SELECT post_id FROM {TABLE} '
+        f'WHERE {TABLE} MATCH %s AND rowid %% 2 IN ({kinds})',
+        [match_expression(query)],
+    )
+
+
+class SearchResults:
+    """
+    Найденные посты от самых релевантных (bm25) к менее релевантным.
+
+    Пост находится по своему тексту или по тексту комментариев. Объект
+    поддерживает count() и срезы, поэтому его можно отдать Paginator:
+    в базу уходит только запрос нужной страницы.
+    """
+
+    def __init__(self, query, posts=None):
+        self.expression = match_expression(query)
+        if posts is None:
+            posts = Post.objects.select_related('author', 'group')
+        self.posts = posts
+
+    def count(self):
+        if not self.expression:
+            return 0
+        return _execute(
+            f'SELECT COUNT(DISTINCT post_id) FROM {TABLE} '
+            f'WHERE {TABLE} MATCH %s',
+            [self.expression],
+        )[0][0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step is not None:
+            raise TypeError('SearchResults поддерживает только срезы.')
+        start = index.start or 0
+        if not self.expression or index.stop is not None and (
+                index.stop <= start):
+            return []
+        limit = -1 if index.stop is None else index.stop - start
+        ids = [row[0] for row in _execute(
+            f'SELECT post_id FROM {TABLE} WHERE {TABLE} MATCH %s '
+            'GROUP BY post_id ORDER BY MIN(rank), post_id DESC '
+            'LIMIT %s OFFSET %s',
+            [self.expression, limit, start],
+        )]
+        posts = self.posts.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
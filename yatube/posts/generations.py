@@ -0,0 +1,79 @@
+"""
+Поколения кэша лент.
+
+Ключ фрагмента включает номер поколения своей области (вся лента,
+группа, автор, лента подписок читателя, комментарии поста). Изменение
+поста или комментария увеличивает номера затронутых областей, и старые
+фрагменты просто перестают читаться, поэтому их TTL может быть большим.
+
+Рядом с номером хранится время увеличения: фрагмент нового поколения
+нельзя собирать из реплики, снятой раньше (core.replicas.require).
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core import replicas
+
+GLOBAL = 'global'
+GROUP = 'group'
+AUTHOR = 'author'
+FOLLOWER = 'follower'
+POST = 'post'
+# Множество авторов, чьи посты подмешиваются в ленты при чтении
+CELEBRITIES = 'celebrities'
+
+
+def key(scope, pk=None):
+    return f'gen:{scope}' if pk is None else f'gen:{scope}:{pk}'
+
+
+def initial():
+    # Поколение, потерянное при вытеснении, не должно повторить старое
+    # значение, поэтому отсчет начинается с текущего времени.
+    return int(time.time() * 1000)
+
+
+def stamp(item):
+    return f'{item}:at'
+
+
+def version(*scopes):
+    """Строка поколений нескольких областей для ключа фрагмента."""
+    keys = [key(*scope) for scope in scopes]
+    found = cache.get_many(keys + [stamp(item) for item in keys])
+    replicas.require(max(
+        (found.get(stamp(item), 0) for item in keys), default=0))
+    for item in keys:
+        if item not in found:
+            # Время изменения потеряно вместе с номером
+            replicas.require(time.time())
+            cache.add(item, initial(), None)
+            found[item] = cache.get(item)
+    return '.'.join(str(found[item]) for item in keys)
+
+
+def increment(scope, pk=None):
+    try:
+        cache.incr(key(scope, pk))
+    except ValueError:
+        cache.add(key(scope, pk), initial(), None)
+    cache.set(stamp(key(scope, pk)), time.time(), None)
+
+
+def bump(scope, pk=None):
+    increment(scope, pk)
+    # До фиксации другие запросы (и снимок реплики) видят старые строки
+    # и могли собрать из них фрагмент нового поколения: после фиксации
+    # поколение меняется еще раз. Откат оставляет лишь лишний промах.
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: increment(scope, pk))
+
+
+def bump_post(post, old_group_id=None):
+    """Пост изменился: устаревают общая лента, группа(ы) и профиль автора."""
+    bump(GLOBAL)
+    bump(AUTHOR, post.author_id)
+    for group_id in {post.group_id, old_group_id} - {None}:
+        bump(GROUP, group_id)
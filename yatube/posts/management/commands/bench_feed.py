@@ -0,0 +1,101 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import isolated_settings, measure, scratch_database
+from core.paginator import CursorPaginator
+from posts import counters, feeds
+from posts.models import Follow, Post, UserStats
+from posts.views import POSTS_PER_PAGE, TIMELINE_ORDERING
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает раскладку постов по лентам (push) с подмешиванием '
+        'при чтении (pull) и показывает, с какого числа подписчиков '
+        'публикация перестает укладываться в бюджет задержки. '
+        'Работает на временной базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--followers', type=int, nargs='+',
+            default=[10, 100, 1000, 5000, 20000])
+        parser.add_argument('--posts', type=int, default=5)
+        parser.add_argument('--reads', type=int, default=20)
+        parser.add_argument(
+            '--budget-ms', type=float, default=100.0,
+            help='Допустимая задержка публикации поста.')
+        parser.add_argument(
+            '--read-ratio', type=float, default=0.05,
+            help='Сколько чтений ленты приходится на подписчика за пост.')
+
+    def handle(self, *args, **options):
+        # Кэш и метрики работающего сайта замер не трогает
+        with tempfile.TemporaryDirectory() as directory, \
+                isolated_settings(directory), scratch_database():
+            rows = [
+                self.run_size(size, options)
+                for size in options['followers']
+            ]
+        self.stdout.write(
+            f'{"followers":>10} {"push ms/post":>13} {"pull ms/read":>13} '
+            f'{"pull ms/post":>13}')
+        for size, push, pull in rows:
+            pull_per_post = pull * size * options['read_ratio']
+            self.stdout.write(
+                f'{size:>10} {push * 1000:>13.2f} {pull * 1000:>13.3f} '
+                f'{pull_per_post * 1000:>13.2f}')
+        (small, small_push, _), (large, large_push, _) = rows[0], rows[-1]
+        per_follower = (large_push - small_push) / max(large - small, 1)
+        budget = options['budget_ms'] / 1000
+        if per_follower <= 0:
+            self.stdout.write('Раскладка не зависит от числа подписчиков.')
+            return
+        crossover = int(small + (budget - small_push) / per_follower)
+        self.stdout.write(self.style.SUCCESS(
+            f'Раскладка превышает {options["budget_ms"]:.0f} мс примерно с '
+            f'{max(crossover, 0)} подписчиков: используйте это значение '
+            f'для TIMELINE_CELEBRITY_THRESHOLD.'
+        ))
+
+    def run_size(self, size, options):
+        cache.clear()
+        author = User.objects.create(username=f'bench_author_{size}')
+        User.objects.bulk_create(
+            User(username=f'bench_{size}_{i}') for i in range(size))
+        followers = User.objects.filter(
+            username__startswith=f'bench_{size}_')
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author) for user in followers)
+        reader = followers.first()
+        # bulk_create не шлет сигналов: счетчики подписчиков считаем сами
+        counters.reconcile()
+        stats = UserStats.objects.filter(user=author)
+
+        feeds.switch(stats, UserStats.PUSH)
+        push = measure(
+            lambda: Post.objects.create(author=author, text='push'),
+            options['posts'])
+
+        def read(merge):
+            paginator = CursorPaginator(
+                feeds.timeline_entries(reader), POSTS_PER_PAGE,
+                ordering=TIMELINE_ORDERING, merge=merge)
+            list(paginator.get_cursor_page())
+
+        pushed = measure(lambda: read(None), options['reads'])
+        feeds.switch(stats, UserStats.PULL)
+        if feeds.celebrity_merge(reader) is None:
+            raise CommandError(
+                f'Посты автора bench_author_{size} не подмешиваются в ленту.')
+        pulled = measure(
+            lambda: read(feeds.celebrity_merge(reader)), options['reads'])
+        cache.clear()
+        pull_overhead = max(
+            0.0, sum(pulled) / len(pulled) - sum(pushed) / len(pushed))
+        return size, sum(push) / len(push), pull_overhead
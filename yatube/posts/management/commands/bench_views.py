@@ -0,0 +1,176 @@
+import json
+import statistics
+import tempfile
+import time
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.benchmark import isolated_settings, percentile, scratch_database
+from posts import seeding, urls
+from posts.models import Post, UserStats
+
+PERCENTILES = (50, 90, 99)
+
+
+def sample_kwargs():
+    """Аргументы адресов: популярный автор, его свежий пост и группа."""
+    author_id = UserStats.objects.order_by(
+        '-followers_count').values_list('user_id', flat=True).first()
+    post = Post.objects.filter(author_id=author_id).select_related(
+        'author').order_by('-comments_count').first()
+    if post is None:
+        post = Post.objects.select_related('author').first()
+    group_post = Post.objects.filter(group__isnull=False).select_related(
+        'group').first()
+    return {
+        'post_id': post.pk,
+        'username': post.author.username,
+        'slug': group_post.group.slug,
+    }
+
+
+def reader():
+    """Читатель с самым большим числом подписок."""
+    stats = UserStats.objects.select_related('user').order_by(
+        '-following_count').first()
+    return stats.user
+
+
+def request(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - start
+    return response, elapsed * 1000, len(queries)
+
+
+def measure_url(client, url, repeat):
+    """Холодный запрос с пустым кэшем и repeat теплых."""
+    cache.clear()
+    response, cold_ms, cold_queries = request(client, url)
+    timings, queries = [], []
+    for _ in range(repeat):
+        response, elapsed, count = request(client, url)
+        timings.append(elapsed)
+        queries.append(count)
+    result = {
+        'status': response.status_code,
+        'bytes': len(response.content),
+        'cold_ms': round(cold_ms, 3),
+        'cold_queries': cold_queries,
+        'queries': int(statistics.median(queries)),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(percentile(timings, percent), 3)
+    return result
+
+
+def compare(previous, current, tolerance):
+    """Строки о регрессиях текущего прогона относительно прошлого."""
+    regressions = []
+    for size, views in current['sizes'].items():
+        for name, result in views.items():
+            old = previous.get('sizes', {}).get(size, {}).get(name)
+            if old is None:
+                continue
+            checks = (
+                ('p50_ms', old['p50_ms'] * (1 + tolerance)),
+                ('queries', old['queries']),
+                ('bytes', old['bytes'] * (1 + tolerance)),
+            )
+            for metric, limit in checks:
+                if result[metric] > limit:
+                    regressions.append(
+                        f'{size} {name} {metric}: {old[metric]} -> '
+                        f'{result[metric]}')
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет временную базу данными нескольких размеров и замеряет '
+        'все адреса posts.urls: перцентили задержки, число SQL-запросов '
+        'и размер ответа. Результат сохраняется в JSON и может '
+        'сравниваться с прошлым прогоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000],
+            help='Число постов; остальные данные растут пропорционально.')
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--output', default='bench-views.json')
+        parser.add_argument(
+            '--compare', metavar='PATH',
+            help='Прошлый результат: регрессия завершает команду ошибкой.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост задержки и размера ответа.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        result = {
+            'created': timezone.now().isoformat(),
+            'django': django.get_version(),
+            'requests': options['requests'],
+            'sizes': {},
+        }
+        # Кэш, файлы и метрики работающего сайта замер не трогает
+        with tempfile.TemporaryDirectory() as directory, \
+                isolated_settings(directory), scratch_database():
+            seeded = 0
+            for size in sorted(options['sizes']):
+                self.seed(size - seeded, options['seed'] + size)
+                seeded = size
+                result['sizes'][str(size)] = self.run_size(options)
+        with open(options['output'], 'w') as output:
+            json.dump(result, output, indent=2, sort_keys=True)
+        self.report(result)
+        if options['compare']:
+            with open(options['compare']) as stream:
+                previous = json.load(stream)
+            regressions = compare(previous, result, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def seed(self, posts, random_seed):
+        seeding.seed(
+            users=max(posts // 10, 10), groups=max(posts // 500, 2),
+            posts=posts, comments=posts, follows=posts * 2,
+            random_seed=random_seed,
+        )
+
+    def run_size(self, options):
+        kwargs = sample_kwargs()
+        client = Client()
+        client.force_login(reader())
+        views = {}
+        for pattern in urls.urlpatterns:
+            names = pattern.pattern.converters.keys()
+            url = reverse(
+                f'posts:{pattern.name}',
+                kwargs={name: kwargs[name] for name in names})
+            views[pattern.name] = measure_url(
+                client, url, options['requests'])
+        return views
+
+    def report(self, result):
+        self.stdout.write(
+            f'{"size":>7} {"view":<20} {"status":>6} {"p50 ms":>8} '
+            f'{"p99 ms":>8} {"cold ms":>8} {"queries":>7} {"bytes":>8}')
+        for size, views in result['sizes'].items():
+            for name, row in views.items():
+                self.stdout.write(
+                    f'{size:>7} {name:<20} {row["status"]:>6} '
+                    f'{row["p50_ms"]:>8.2f} {row["p99_ms"]:>8.2f} '
+                    f'{row["cold_ms"]:>8.2f} {row["queries"]:>7} '
+                    f'{row["bytes"]:>8}')
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Переводит авторов, у которых стало меньше подписчиков, с '
+        'подмешивания постов при чтении на раскладку: ленты подписчиков '
+        'дописываются пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.TIMELINE_BATCH_SIZE)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Сколько секунд ждать между пачками.')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Проверять авторов раз в столько секунд, не завершаясь.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                feeds.demote(
+                    options['batch_size'], options['pause'], self.progress)
+                if options['interval'] is None:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def progress(self, author_id, count):
+        self.stdout.write(
+            f'Автор {author_id}: дописаны ленты {count} подписчиков')
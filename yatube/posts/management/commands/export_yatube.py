@@ -0,0 +1,29 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, посты, комментарии, подписки '
+        'и удаления в очереди в NDJSON (.gz - со сжатием).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки, "-" - стандартный вывод.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, path, chunk_size, **options):
+        if path == '-':
+            counts = transfer.export(sys.stdout, chunk_size)
+        else:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'wt', encoding='utf-8') as stream:
+                counts = transfer.export(stream, chunk_size)
+        for name, count in counts.items():
+            self.stderr.write(f'{name}: {count}')
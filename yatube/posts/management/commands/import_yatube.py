@@ -0,0 +1,38 @@
+import gzip
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает NDJSON из export_yatube пачками bulk_create и затем '
+        'пересчитывает счетчики, ленты подписок и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для загрузки, "-" - стандартный ввод.')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument(
+            '--merge', action='store_true',
+            help='Дозагрузить в непустую базу: объекты, которые уже есть, '
+                 'пропускаются, чужой объект с тем же id - ошибка.')
+
+    def handle(self, *args, path, chunk_size, merge, **options):
+        try:
+            if path == '-':
+                counts = transfer.load(sys.stdin, chunk_size, merge)
+            else:
+                opener = gzip.open if path.endswith('.gz') else open
+                with opener(path, 'rt', encoding='utf-8') as stream:
+                    counts = transfer.load(stream, chunk_size, merge)
+        except (OSError, ValueError, IntegrityError) as exc:
+            raise CommandError(exc)
+        transfer.finish()
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
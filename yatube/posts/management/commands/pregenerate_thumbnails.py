@@ -0,0 +1,24 @@
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создает недостающие миниатюры для всех картинок постов.'
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True).distinct().iterator()
+        )
+        pool = thumbnails.executor()
+        futures = [pool.submit(thumbnails.generate, name) for name in names]
+        failed = 0
+        for future in as_completed(futures):
+            if future.exception() is not None:
+                failed += 1
+        self.stdout.write(
+            f'Картинок: {len(futures)}, с ошибками: {failed}')
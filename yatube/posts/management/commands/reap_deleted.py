@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import reaper
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет пачками зависимые строки удаленных пользователей, постов '
+        'и групп, а затем сами объекты; картинки и миниатюры удаляются '
+        'вместе с последним ссылавшимся на них постом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.REAP_BATCH_SIZE)
+        parser.add_argument(
+            '--pause', type=float, default=settings.REAP_PAUSE,
+            help='Сколько секунд ждать между пачками.')
+        parser.add_argument(
+            '--interval', type=float,
+            help='Проверять очередь раз в столько секунд, не завершаясь.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                reaper.reap(
+                    options['batch_size'], options['pause'], self.progress)
+                if options['interval'] is None:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def progress(self, deletion):
+        if deletion.pk is None:
+            self.stdout.write(f'{deletion}: удалено.')
+        else:
+            self.stdout.write(
+                f'{deletion}: обработано {deletion.done} из {deletion.total}')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts import fulltext
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        rows = fulltext.rebuild()
+        self.stdout.write(f'Проиндексировано текстов: {rows}')
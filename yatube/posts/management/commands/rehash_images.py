@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.storage import is_hashed
+from posts import generations, media, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки, загруженные до хранилища по содержимому, '
+        'в него: одинаковые файлы сливаются, старые удаляются.'
+    )
+
+    def handle(self, *args, **options):
+        storage = media.storage()
+        names = [
+            name for name in Post.all_objects.exclude(image='')
+            .values_list('image', flat=True).distinct().iterator()
+            if not is_hashed(name)
+        ]
+        moved = missing = 0
+        for name in names:
+            if not storage.exists(name):
+                missing += 1
+                continue
+            with storage.open(name) as content:
+                new_name = storage.save(name, content)
+            with transaction.atomic():
+                count = Post.all_objects.filter(image=name).update(
+                    image=new_name)
+                media.acquire(new_name, count)
+                media.release(name, count)
+            for post in Post.objects.filter(image=new_name).only(
+                    'author_id', 'group_id'):
+                generations.bump_post(post)
+            thumbnails.submit(new_name)
+            moved += 1
+        self.stdout.write(
+            f'Перенесено файлов: {moved}, не найдено: {missing}')
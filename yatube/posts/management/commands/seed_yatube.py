@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами '
+        'с картинками, комментариями и подписками со степенным '
+        'распределением авторов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument(
+            '--images', type=int, default=10,
+            help='Сколько разных картинок делят между собой посты.')
+        parser.add_argument('--image-ratio', type=float, default=0.3)
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона для подписок.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        counts = seeding.seed(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'],
+            images=options['images'], image_ratio=options['image_ratio'],
+            alpha=options['alpha'], random_seed=options['seed'],
+        )
+        for name, count in counts.items():
+            self.stdout.write(f'{name}: {count}')
@@ -0,0 +1,60 @@
+"""
+Ссылки постов на файлы картинок.
+
+Хранилище по содержимому кладет одинаковые картинки в один файл,
+поэтому файл удаляется, только когда на него не ссылается ни один
+пост: StoredImage.references ведут сигналы постов.
+"""
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .counters import bump
+from .models import Post, StoredImage
+
+
+def storage():
+    return Post._meta.get_field('image').storage
+
+
+def acquire(name, count=1):
+    if not name:
+        return
+    if not bump(StoredImage.objects.filter(name=name), 'references', count):
+        StoredImage.objects.get_or_create(name=name)
+        bump(StoredImage.objects.filter(name=name), 'references', count)
+
+
+def release(name, count=1):
+    if not name:
+        return
+    if not bump(StoredImage.objects.filter(name=name), 'references', -count):
+        # Старый файл без учета ссылок: collect удалит его по пустой строке
+        StoredImage.objects.get_or_create(name=name)
+    transaction.on_commit(lambda: collect(name))
+
+
+def discard(name):
+    """Сохраненный файл не достался посту: удаляем, если он ничей."""
+    if not name:
+        return
+    StoredImage.objects.get_or_create(name=name)
+    collect(name)
+
+
+def collect(name):
+    """Удаляет файл и его миниатюры, если ссылок на него не осталось."""
+    # Проверка и удаление строки - один запрос, а файл удаляется в той же
+    # транзакции: acquire такой же картинки ждет ее конца и не теряет
+    # ни строку, ни файл
+    with transaction.atomic():
+        deleted, _ = StoredImage.objects.filter(
+            name=name, references=0).delete()
+        if not deleted:
+            return
+        try:
+            delete_thumbnails(ImageFile(name, storage()))
+        except SuspiciousFileOperation:
+            # Имя вне MEDIA_ROOT: файл не наш, удалять нечего.
+            pass
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:39
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_stored_images(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredImage = apps.get_model('posts', 'StoredImage')
+    images = (
+        Post.objects.exclude(image='').order_by()
+        .values('image').annotate(total=Count('pk'))
+    )
+    StoredImage.objects.bulk_create(
+        [StoredImage(name=row['image'], references=row['total'])
+         for row in images.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_stored_images, migrations.RunPython.noop),
+    ]
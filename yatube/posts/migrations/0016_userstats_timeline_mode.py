@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def promote_celebrities(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.filter(
+        followers_count__gte=settings.TIMELINE_CELEBRITY_THRESHOLD
+    ).update(timeline_mode='pull')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_soft_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='timeline_mode',
+            field=models.CharField(choices=[('push', 'Раскладываются при публикации'), ('pull', 'Подмешиваются при чтении'), ('demoting', 'Переходят к раскладке')], db_index=True, default='push', max_length=10, verbose_name='Посты в лентах подписчиков'),
+        ),
+        migrations.RunPython(promote_celebrities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_userstats_timeline_mode'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={},
+        ),
+    ]
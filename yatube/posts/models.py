@@ -1,9 +1,18 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
+class VisibleManager(models.Manager):
+    """Строки без отметки об удалении; все строки - all_objects."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted=False)
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -16,6 +25,19 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание группы'
     )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
+    deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удалена'
+    )
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.title
@@ -46,13 +68,42 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+    deleted = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Удален'
+    )
+
+    objects = VisibleManager()
+    all_objects = models.Manager()
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-pub_date']
+        # Ленты читают только видимые посты; скрытые находит reaper
+        # по индексам внешних ключей
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_idx',
+                condition=models.Q(deleted=False)),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx',
+                condition=models.Q(deleted=False)),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx',
+                condition=models.Q(deleted=False)),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -81,6 +132,15 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'),
+            models.Index(
+                fields=['-created', '-id'], name='comment_created_idx'),
+        ]
+
     def __str__(self):
         return self.text[:15]
 
@@ -104,3 +164,157 @@ class Follow (models.Model):
             models.UniqueConstraint(
                 fields=['author', 'user'], name='unique_follow')
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'], name='follow_user_author_idx'),
+        ]
+
+
+class Timeline(models.Model):
+    """Материализованная лента подписок: строка на пару (читатель, пост)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель ленты'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации поста'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_post')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счетчики пользователя, обновляются сигналами."""
+    # Как посты пользователя попадают в ленты подписчиков (posts.feeds)
+    PUSH = 'push'
+    PULL = 'pull'
+    DEMOTING = 'demoting'
+    TIMELINE_MODES = (
+        (PUSH, 'Раскладываются при публикации'),
+        (PULL, 'Подмешиваются при чтении'),
+        (DEMOTING, 'Переходят к раскладке'),
+    )
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+    timeline_mode = models.CharField(
+        max_length=10,
+        choices=TIMELINE_MODES,
+        default=PUSH,
+        db_index=True,
+        verbose_name='Посты в лентах подписчиков'
+    )
+
+    class Meta:
+        verbose_name = 'Счетчики пользователя'
+        verbose_name_plural = 'Счетчики пользователей'
+
+
+class StoredImage(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются."""
+    name = models.CharField(
+        max_length=100,
+        primary_key=True,
+        verbose_name='Имя файла'
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class Deletion(models.Model):
+    """
+    Удаление, которое доделывает reap_deleted: сама строка уже скрыта,
+    зависимые строки удаляются пачками.
+    """
+    USER = 'user'
+    POST = 'post'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (POST, 'Пост'),
+        (GROUP, 'Группа'),
+    )
+
+    kind = models.CharField(
+        max_length=10,
+        choices=KINDS,
+        verbose_name='Что удаляется'
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='id'
+    )
+    requested = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Запрошено'
+    )
+    total = models.PositiveIntegerField(
+        null=True,
+        verbose_name='Зависимых строк'
+    )
+    done = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Обработано строк'
+    )
+
+    class Meta:
+        verbose_name = 'Удаление'
+        verbose_name_plural = 'Удаления'
+        ordering = ['requested']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'], name='unique_deletion')
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}'
+
+    @classmethod
+    def scheduled(cls, kind):
+        """Подзапрос id объектов kind, ждущих удаления (для pk__in)."""
+        return cls.objects.filter(kind=kind).values('object_id')
@@ -0,0 +1,146 @@
+"""
+Отложенное удаление пользователей, постов и групп.
+
+Каскад on_delete у автора с тысячами постов - это одна транзакция на
+все посты, комментарии, подписки и записи лент, и SQLite на все это
+время закрыт для записи. Поэтому schedule() только скрывает строку
+(Post.deleted, Group.deleted, у пользователя - is_active и все его
+посты) и ставит Deletion в очередь, а `manage.py reap_deleted`
+удаляет зависимые строки пачками по REAP_BATCH_SIZE, каждую в своей
+транзакции. Счетчики постов и подписок поправляются сразу при
+скрытии. Удаление идет через Collector, поэтому сигналы постов
+поправляют индекс поиска и поколения кэша и освобождают файлы
+картинок вместе с миниатюрами.
+Сама строка удаляется последней, когда зависимых не осталось.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F
+
+from . import counters, fulltext, generations
+from .models import Comment, Deletion, Follow, Group, Post, Timeline, User
+
+KINDS = {User: Deletion.USER, Post: Deletion.POST, Group: Deletion.GROUP}
+MODELS = {kind: model for model, kind in KINDS.items()}
+
+
+def schedule(obj):
+    """Скрывает объект и ставит удаление его зависимых в очередь."""
+    kind = KINDS[type(obj)]
+    with transaction.atomic():
+        deletion, created = Deletion.objects.get_or_create(
+            kind=kind, object_id=obj.pk)
+        if not created:
+            return deletion
+        if kind == Deletion.USER:
+            # Неактивного пользователя не пускает ModelBackend
+            User.objects.filter(pk=obj.pk).update(is_active=False)
+            counters.user_hidden(obj.pk)
+            hide(Post.all_objects.filter(author_id=obj.pk))
+        elif kind == Deletion.POST:
+            hide(Post.all_objects.filter(pk=obj.pk))
+        else:
+            Group.all_objects.filter(pk=obj.pk).update(deleted=True)
+            generations.bump(generations.GROUP, obj.pk)
+    return deletion
+
+
+def hide(posts):
+    """Скрывает посты из ленты, групп, профиля, поиска и счетчиков."""
+    touched = set(posts.values_list('author_id', 'group_id'))
+    counters.posts_hidden(posts)
+    posts.update(deleted=True)
+    fulltext.remove_posts(posts)
+    generations.bump(generations.GLOBAL)
+    for author_id in {author_id for author_id, _ in touched}:
+        generations.bump(generations.AUTHOR, author_id)
+    for group_id in {group_id for _, group_id in touched} - {None}:
+        generations.bump(generations.GROUP, group_id)
+
+
+def delete(queryset, ids):
+    total, _ = queryset.model._base_manager.filter(pk__in=ids).delete()
+    return total
+
+
+def detach(queryset, ids):
+    """Как SET_NULL, но пачкой и с поколениями затронутых лент."""
+    posts = Post.all_objects.filter(pk__in=ids)
+    authors = set(posts.values_list('author_id', flat=True))
+    updated = posts.update(group=None)
+    generations.bump(generations.GLOBAL)
+    for author_id in authors:
+        generations.bump(generations.AUTHOR, author_id)
+    return updated
+
+
+def steps(deletion):
+    """Зависимые строки в порядке удаления: (queryset, действие)."""
+    pk = deletion.object_id
+    if deletion.kind == Deletion.USER:
+        # Сначала строки, которые иначе ушли бы каскадом целиком:
+        # записи лент постов автора, комментарии к ним
+        return (
+            (Timeline.objects.filter(user_id=pk), delete),
+            (Timeline.objects.filter(post__author_id=pk), delete),
+            (Comment.objects.filter(post__author_id=pk), delete),
+            (Post.all_objects.filter(author_id=pk), delete),
+            (Comment.objects.filter(author_id=pk), delete),
+            (Follow.objects.filter(user_id=pk), delete),
+            (Follow.objects.filter(author_id=pk), delete),
+        )
+    if deletion.kind == Deletion.POST:
+        return (
+            (Timeline.objects.filter(post_id=pk), delete),
+            (Comment.objects.filter(post_id=pk), delete),
+        )
+    return ((Post.all_objects.filter(group_id=pk), detach),)
+
+
+def count(deletion):
+    return sum(queryset.count() for queryset, _ in steps(deletion))
+
+
+def reap_batch(deletion, batch_size):
+    """
+    Обрабатывает одну пачку зависимых строк; когда их не осталось,
+    удаляет сам объект. Возвращает число обработанных строк или None,
+    если удаление завершено.
+    """
+    for queryset, action in steps(deletion):
+        ids = list(queryset.order_by().values_list(
+            'pk', flat=True)[:batch_size])
+        if not ids:
+            continue
+        with transaction.atomic():
+            done = action(queryset, ids)
+            Deletion.objects.filter(pk=deletion.pk).update(
+                done=F('done') + done)
+        deletion.done += done
+        return done
+    model = MODELS[deletion.kind]
+    with transaction.atomic():
+        model._base_manager.filter(pk=deletion.object_id).delete()
+        deletion.delete()
+    return None
+
+
+def reap(batch_size, pause=0, progress=None):
+    """
+    Доводит до конца все удаления из очереди. Между пачками ждет pause
+    секунд, чтобы воркеры успевали писать; progress(deletion) вызывается
+    после каждой пачки.
+    """
+    for deletion in Deletion.objects.all():
+        if deletion.total is None:
+            deletion.total = count(deletion)
+            Deletion.objects.filter(pk=deletion.pk).update(
+                total=deletion.total)
+        while True:
+            done = reap_batch(deletion, batch_size)
+            if progress is not None:
+                progress(deletion)
+            if done is None:
+                break
+            time.sleep(pause)
@@ -0,0 +1,136 @@
+"""
+Синтетические данные для локальных замеров.
+
+Поля заполняет mixer (без сохранения), строки вставляются пачками
+bulk_create. Авторы подписок выбираются по степенному закону (вес
+автора с рангом r - 1 / r ** alpha): несколько «знаменитостей»
+собирают большую часть подписчиков, как в живой соцсети. Посты
+распределены по авторам равномерно и разбросаны по последнему году,
+комментарии появляются в течение недели после поста. Картинок немного,
+и посты ссылаются на них повторно. Производные данные (счетчики,
+ленты, поисковый индекс) пересчитывает transfer.finish.
+"""
+import datetime
+import io
+import random
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from . import media, transfer
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 2000
+IMAGE_SIZE = (960, 540)
+HISTORY = datetime.timedelta(days=365)
+COMMENT_DELAY = datetime.timedelta(days=7)
+
+
+def max_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+
+
+def insert(model, objects):
+    """Вставляет объекты пачками и возвращает id новых строк."""
+    start = max_pk(model)
+    for offset in range(0, len(objects), BATCH_SIZE):
+        with transaction.atomic():
+            model.objects.bulk_create(objects[offset:offset + BATCH_SIZE])
+    return list(model.objects.filter(pk__gt=start).order_by(
+        'pk').values_list('pk', flat=True))
+
+
+def power_law_weights(count, alpha):
+    return [1 / (rank ** alpha) for rank in range(1, count + 1)]
+
+
+def make_images(count, rng):
+    """Сохраняет count разноцветных JPEG и возвращает их имена."""
+    names = []
+    for number in range(count):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        content = io.BytesIO()
+        Image.new('RGB', IMAGE_SIZE, color).save(content, 'JPEG')
+        names.append(media.storage().save(
+            f'posts/seed_{number}.jpg', ContentFile(content.getvalue())))
+    return names
+
+
+def seed(users, groups, posts, comments, follows, images=10,
+         image_ratio=0.3, alpha=1.1, random_seed=None):
+    """Создает данные и возвращает число строк по моделям."""
+    rng = random.Random(random_seed)
+    mixer = Mixer(commit=False)
+    offset = max_pk(User)
+    user_ids = insert(User, [
+        mixer.blend(User, username=f'seed_{offset + number}')
+        for number in range(users)
+    ])
+    group_offset = max_pk(Group)
+    group_ids = insert(Group, [
+        mixer.blend(Group, slug=f'seed-{group_offset + number}')
+        for number in range(groups)
+    ])
+    # Авторы по рангу популярности; ранги перемешаны относительно id
+    ranked = rng.sample(user_ids, len(user_ids))
+    weights = power_law_weights(len(ranked), alpha)
+    image_names = make_images(images, rng) if posts and images else []
+
+    now = timezone.now()
+
+    def post_fields():
+        image = ''
+        if image_names and rng.random() < image_ratio:
+            image = rng.choice(image_names)
+        return {
+            'author': User(pk=rng.choice(user_ids)),
+            'group': Group(pk=rng.choice(group_ids)) if group_ids and (
+                rng.random() < 0.5) else None,
+            'image': image,
+            'pub_date': now - HISTORY * rng.random(),
+        }
+
+    def comment_fields():
+        post = rng.choice(new_posts)
+        return {
+            'post': post,
+            'author': User(pk=rng.choice(user_ids)),
+            'created': min(now, post.pub_date + COMMENT_DELAY * rng.random()),
+        }
+
+    with transfer.explicit_dates():
+        new_posts = [
+            mixer.blend(Post, **post_fields()) for _ in range(posts)]
+        post_ids = insert(Post, new_posts)
+        # bulk_create в SQLite не проставляет id, берем их по порядку
+        for post, pk in zip(new_posts, post_ids):
+            post.pk = pk
+        insert(Comment, [
+            mixer.blend(Comment, **comment_fields())
+            for _ in range(comments if post_ids else 0)
+        ])
+    edges = set()
+    attempts = 0
+    while len(edges) < follows and attempts < follows * 10 and users > 1:
+        attempts += 1
+        user_id = rng.choice(user_ids)
+        author_id = rng.choices(ranked, weights)[0]
+        if user_id != author_id:
+            edges.add((user_id, author_id))
+    insert(Follow, [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in edges
+    ])
+    transfer.finish()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'comments': comments if post_ids else 0,
+        'follows': len(edges),
+        'images': len(image_names),
+    }
@@ -0,0 +1,84 @@
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feeds, fulltext, generations, media, thumbnails
+from .models import Comment, Follow, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        old = Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'image').first()
+        instance._old_group_id, instance._old_image = old or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if created:
+        counters.post_created(instance)
+        feeds.fan_out_post(instance)
+        media.acquire(instance.image.name)
+    elif hasattr(instance, '_old_group_id'):
+        counters.post_moved(old_group_id, instance.group_id)
+        if instance._old_image != instance.image.name:
+            media.acquire(instance.image.name)
+            media.release(instance._old_image)
+    fulltext.index_post(instance)
+    generations.bump_post(instance, old_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_deleted(instance)
+    media.release(instance.image.name)
+    fulltext.remove(fulltext.POST, instance.pk)
+    generations.bump_post(instance)
+    if feeds.is_celebrity(instance.author_id):
+        feeds.forget_recent_posts(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.comment_changed(instance, 1)
+    if not raw:
+        fulltext.index_comment(instance)
+        generations.bump(generations.POST, instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_changed(instance, -1)
+    fulltext.remove(fulltext.COMMENT, instance.pk)
+    generations.bump(generations.POST, instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_changed(instance, 1)
+        feeds.followed(instance.user_id, instance.author_id)
+        generations.bump(generations.FOLLOWER, instance.user_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_changed(instance, -1)
+    feeds.unfollowed(instance.user_id, instance.author_id)
+    generations.bump(generations.FOLLOWER, instance.user_id)
+
+
+@receiver(request_finished)
+def forget_prefetched_thumbnails(sender, **kwargs):
+    thumbnails.forget_prefetched()
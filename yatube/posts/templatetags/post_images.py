@@ -0,0 +1,86 @@
+from django import template
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+from sorl.thumbnail.templatetags.thumbnail import ThumbnailNode
+
+from .. import thumbnails
+
+register = template.Library()
+
+NORESOLVE = {'True': True, 'False': False, 'None': None}
+
+
+class ReadyThumbnailNode(ThumbnailNode):
+    """
+    {% thumbnail %} с тем же синтаксисом, но без генерации в запросе.
+
+    Готовую миниатюру берет из key-value store; пока ее нет, отдает
+    исходную картинку.
+    """
+
+    def _render(self, context):
+        file_ = self.file_.resolve(context)
+        if not file_:
+            return self.nodelist_empty.render(context)
+        geometry = self.geometry.resolve(context)
+        options = {}
+        for key, expr in self.options:
+            value = NORESOLVE.get(str(expr), expr.resolve(context))
+            if key == 'options':
+                options.update(value)
+            else:
+                options[key] = value
+        thumbnail = thumbnails.lookup(file_, geometry, **options)
+        if thumbnail is None:
+            thumbnail = ImageFile(file_)
+        if not self.as_var:
+            return thumbnail.url
+        context.push()
+        context[self.as_var] = thumbnail
+        output = self.nodelist_file.render(context)
+        context.pop()
+        return output
+
+
+@register.tag
+def thumbnail(parser, token):
+    return ReadyThumbnailNode(parser, token)
+
+
+@register.simple_tag
+def picture(image, geometry, **options):
+    """
+    <picture> из готовых вариантов картинки: WebP и JPEG со srcset.
+
+    Пока вариантов нет, выводит <img> с исходной картинкой. Параметр
+    class попадает в <img>, остальные - опции миниатюры.
+    """
+    css_class = options.pop('class', '')
+    if not image:
+        return ''
+    srcsets = {}
+    src = None
+    width = parse_geometry(geometry)[0]
+    for image_format, variant_width, variant, variant_options in (
+            thumbnails.variants(geometry, options)):
+        thumbnail = thumbnails.lookup(image, variant, **variant_options)
+        if thumbnail is None:
+            continue
+        srcsets.setdefault(image_format, []).append(
+            f'{thumbnail.url} {variant_width}w')
+        if image_format == 'JPEG' and (src is None or variant_width == width):
+            src = thumbnail.url
+    if src is None:
+        return format_html('<img class="{}" src="{}">', css_class, image.url)
+    sizes = f'(max-width: {width}px) 100vw, {width}px'
+    sources = [
+        format_html(
+            '<source type="image/webp" srcset="{}" sizes="{}">',
+            ', '.join(srcsets['WEBP']), sizes)
+    ] if 'WEBP' in srcsets else []
+    sources.append(format_html(
+        '<img class="{}" src="{}" srcset="{}" sizes="{}">',
+        css_class, src, ', '.join(srcsets['JPEG']), sizes))
+    return format_html('<picture>{}</picture>', mark_safe(''.join(sources)))
@@ -0,0 +1,119 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminChangeListTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        cls.post = Post.objects.create(
+            author=cls.admin, text='Test', group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.admin, text='Test')
+        Follow.objects.create(
+            user=cls.admin, author=User.objects.create(username='Author'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        authors = [
+            User.objects.create(username=f'Author{i}') for i in range(count)]
+        for author in authors:
+            post = Post.objects.create(
+                author=author, text='Test', group=self.group)
+            Comment.objects.create(post=post, author=author, text='Test')
+            Follow.objects.create(user=author, author=self.admin)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Проверяем, что число запросов списка не зависит от числа строк."""
+        urls = [
+            reverse('admin:posts_post_changelist'),
+            reverse('admin:posts_comment_changelist'),
+            reverse('admin:posts_follow_changelist'),
+        ]
+        before = {url: self.count_queries(url) for url in urls}
+        self.add_rows(5)
+
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+        response = self.client.get(urls[0])
+        self.assertContains(
+            response,
+            f'<option value="{self.group.pk}" selected>{self.group.title}',
+        )
+
+    def test_changelist_count_cached(self):
+        """Проверяем, что COUNT(*) списка считается один раз."""
+        url = reverse('admin:posts_post_changelist')
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+
+        counts = [
+            query['sql'] for query in queries.captured_queries
+            if 'COUNT(' in query['sql']
+        ]
+        self.assertEqual(counts, [])
+
+    def test_change_form_uses_autocomplete(self):
+        """Проверяем, что форма поста не выводит всех пользователей."""
+        self.add_rows(3)
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(self.post.pk,)))
+
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'Author0')
+
+    def test_date_hierarchy_lists_nonempty_periods(self):
+        """Проверяем, что иерархия дат показывает только непустые периоды."""
+        old_post = Post.objects.create(author=self.admin, text='Old')
+        Post.objects.filter(pk=old_post.pk).update(
+            pub_date=timezone.make_aware(datetime.datetime(2019, 5, 1)))
+        url = reverse('admin:posts_post_changelist')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        # Периоды - один запрос, а не проверка каждого года
+        self.assertEqual(len([
+            query for query in queries.captured_queries
+            if 'django_date_trunc' in query['sql']]), 1)
+        self.assertContains(response, '?pub_date__year=2019')
+        self.assertNotContains(response, '?pub_date__year=2020')
+        self.assertContains(
+            response, f'?pub_date__year={timezone.now().year}')
+
+        response = self.client.get(url, {'pub_date__year': 2019})
+        self.assertContains(response, 'pub_date__month=5')
+        self.assertNotContains(response, 'pub_date__month=6')
+        self.assertEqual(list(response.context['cl'].result_list), [old_post])
@@ -0,0 +1,126 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..views import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class FeedApiTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user, text=f'Пост {i}', group=cls.group)
+            for i in range(POSTS_PER_PAGE + 3)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ответ')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_feeds_return_json(self):
+        """Проверяем, что ленты и комментарии отдаются в JSON."""
+        urls = {
+            reverse('posts:api_index'): POSTS_PER_PAGE,
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'}):
+                POSTS_PER_PAGE,
+            reverse('posts:api_profile', kwargs={'username': 'TestUser'}):
+                POSTS_PER_PAGE,
+            reverse('posts:api_post_comments',
+                    kwargs={'post_id': self.post.id}): 1,
+        }
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), count)
+
+    def test_post_serialized(self):
+        """Проверяем, что пост сериализуется со всеми полями."""
+        response = self.client.get(reverse('posts:api_index'))
+
+        item = response.json()['results'][0]
+        self.assertEqual(item['id'], self.post.id)
+        self.assertEqual(item['text'], self.post.text)
+        self.assertEqual(item['author'], 'TestUser')
+        self.assertEqual(item['group'], 'test-slug')
+        self.assertIsNone(item['image'])
+
+    def test_sparse_fields(self):
+        """Проверяем, что fields= оставляет только запрошенные поля."""
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'text,id'})
+
+        self.assertEqual(
+            response.json()['results'][0],
+            {'id': self.post.id, 'text': self.post.text},
+        )
+
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'text,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pagination(self):
+        """Проверяем, что ссылка next ведет на следующую страницу."""
+        response = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id'})
+        next_url = response.json()['next']
+        self.assertIn('fields=id', next_url)
+
+        response = self.client.get(next_url)
+
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [post.id for post in self.posts[2::-1]],
+        )
+        self.assertIsNone(response.json()['next'])
+
+    def test_etag_not_modified(self):
+        """Проверяем, что неизмененная страница отвечает 304 без запроса."""
+        url = reverse('posts:api_index')
+        etag = self.client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_no_model_instances(self):
+        """Проверяем, что ответ собирается без создания моделей."""
+        with mock.patch.object(
+                Post, 'from_db', side_effect=AssertionError) as from_db:
+            self.client.get(reverse('posts:api_index'))
+
+        from_db.assert_not_called()
+
+    def test_unknown_scope(self):
+        """Проверяем, что несуществующая группа отвечает 404 в JSON."""
+        response = self.client.get(
+            reverse('posts:api_group_posts', kwargs={'slug': 'missing'}))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', response.json())
@@ -3,7 +3,7 @@ from django.core.cache import cache
 from django.test import Client, TestCase
 from django.urls import reverse
 
-from ..models import Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 
@@ -13,32 +13,87 @@ class CacheTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create(username='TestUser')
+        cls.author = User.objects.create(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
         cls.post = Post.objects.create(
             author=cls.user,
-            text='Test'
+            text='Test',
+            group=cls.group
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
+    def get_content(self, url):
+        return self.authorized_client.get(url).content.decode()
+
     def test_index_page_cache(self):
-        """Проверяем  работу кеша."""
-        response = self.authorized_client.get(
-            reverse('posts:index')).content
-        first_response = self.authorized_client.get(
-            reverse('posts:index')).content
+        """Проверяем, что фрагмент ленты берется из кэша."""
+        url = reverse('posts:index')
+        self.get_content(url)
+
+        # Обновление мимо ORM-сигналов не меняет поколение.
+        Post.objects.filter(pk=self.post.pk).update(text='Stale')
 
-        self.assertEqual(response, first_response)
+        self.assertNotIn('Stale', self.get_content(url))
+        cache.clear()
+        self.assertIn('Stale', self.get_content(url))
 
-        Post.objects.get(id=self.post.id).delete()
-        second_response = self.authorized_client.get(
-            reverse('posts:index')).content
+    def test_post_changes_invalidate_feeds(self):
+        """Проверяем, что изменение поста сразу сбрасывает его ленты."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+        ]
+        for url in urls:
+            self.get_content(url)
 
-        self.assertEqual(response, second_response)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Edited'
+        post.save()
 
-        cache.clear()
-        third_responce = self.authorized_client.get(
-            reverse('posts:index')).content
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn('Edited', self.get_content(url))
+
+        post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotIn('Edited', self.get_content(url))
+
+    def test_other_scopes_stay_cached(self):
+        """Проверяем, что пост другого автора не сбрасывает чужой профиль."""
+        url = reverse('posts:profile', kwargs={'username': 'TestUser'})
+        self.get_content(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Stale')
+
+        Post.objects.create(author=self.author, text='Other')
+
+        self.assertNotIn('Stale', self.get_content(url))
+
+    def test_follow_invalidates_follow_feed(self):
+        """Проверяем, что подписка сразу меняет ленту подписок."""
+        url = reverse('posts:follow_index')
+        Post.objects.create(author=self.author, text='Author post')
+        self.assertNotIn('Author post', self.get_content(url))
+
+        Follow.objects.create(user=self.user, author=self.author)
+
+        self.assertIn('Author post', self.get_content(url))
+
+    def test_comment_invalidates_post_comments(self):
+        """Проверяем, что новый комментарий сразу виден на странице поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.get_content(url)
+
+        Comment.objects.create(
+            post=self.post, author=self.author, text='New comment')
 
-        self.assertNotEqual(response, third_responce)
+        self.assertIn('New comment', self.get_content(url))
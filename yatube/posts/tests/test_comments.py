@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..views import COMMENTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CommentsPaginationTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.post = Post.objects.create(author=cls.user, text='Test')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create(username=f'Commenter{i}'),
+                text=f'Comment {i}',
+            )
+            for i in range(COMMENTS_PER_PAGE + 5)
+        ]
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id})
+        cls.fragment_url = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.id})
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_first_page_contains_newest_comments(self):
+        """Проверяем, что на странице поста только новые комментарии."""
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+
+        self.assertEqual(
+            list(comments),
+            self.comments[::-1][:COMMENTS_PER_PAGE],
+        )
+        self.assertIsNotNone(comments.next_cursor)
+        self.assertContains(response, 'js-more-comments')
+
+    def test_more_comments_loader_without_jquery(self):
+        """Проверяем, что подгрузка комментариев обходится без jQuery."""
+        response = self.client.get(self.detail_url)
+
+        self.assertContains(response, 'fetch(link.dataset.fragment')
+        self.assertNotContains(response, '$(')
+        self.assertContains(
+            response, f'href="{self.detail_url}?cursor=', count=1)
+
+    def test_fragment_returns_next_page(self):
+        """Проверяем, что фрагмент отдает следующую страницу без base.html."""
+        first_page = self.client.get(self.detail_url).context['comments']
+
+        response = self.client.get(
+            self.fragment_url, {'cursor': first_page.next_cursor})
+
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[::-1][COMMENTS_PER_PAGE:],
+        )
+        self.assertIsNone(response.context['comments'].next_cursor)
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_fragment_for_missing_post(self):
+        """Проверяем, что фрагмент несуществующего поста вернет 404."""
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_authors_are_joined(self):
+        """Проверяем, что авторы комментариев не читаются по одному."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.fragment_url)
+
+        author_queries = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "auth_user"' in query['sql']
+        ]
+        self.assertEqual(author_queries, [])
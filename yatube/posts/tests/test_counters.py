@@ -0,0 +1,105 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.author = User.objects.create(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        cls.other_group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug-other'
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Проверяем счетчики постов автора и группы."""
+        post = Post.objects.create(
+            author=self.author, text='Test', group=self.group)
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={'text': 'Edited', 'group': self.other_group.id}
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.refresh_from_db()
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 0)
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Проверяем счетчики комментариев и подписок."""
+        post = Post.objects.create(author=self.author, text='Test')
+        Comment.objects.create(post=post, author=self.user, text='Test')
+        Follow.objects.create(user=self.user, author=self.author)
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_profile_reads_counters(self):
+        """Проверяем, что профиль не считает посты агрегатом."""
+        Post.objects.create(author=self.author, text='Test')
+
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'TestAuthor'}))
+
+        self.assertEqual(response.context['stats'].posts_count, 1)
+
+    def test_profile_does_not_create_stats(self):
+        """Проверяем, что профиль без строки счетчиков ее не создает."""
+        UserStats.objects.filter(user=self.author).delete()
+
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'TestAuthor'}))
+
+        self.assertEqual(response.context['stats'].posts_count, 0)
+        self.assertFalse(UserStats.objects.filter(user=self.author).exists())
+
+    def test_reconcile_counters(self):
+        """Проверяем, что команда исправляет разошедшиеся счетчики."""
+        Post.objects.create(author=self.author, text='Test', group=self.group)
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Group.objects.filter(pk=self.group.pk).update(posts_count=0)
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -186,7 +187,9 @@ class PostsFormsTests(TestCase):
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
         post = Post.objects.first()
-        self.assertEqual(post.image, 'posts/small.gif')
+        digest = hashlib.sha256(self.small_gif).hexdigest()
+        self.assertEqual(
+            post.image, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif')
 
     def test_create_commen(self):
         """
@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class QueryPlanTests(TestCase):
+    """Запросы лент не должны сканировать таблицы и сортировать во временном
+    B-дереве: для каждого пути чтения есть составной индекс."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.author = User.objects.create(username='TestAuthor')
+        cls.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Test {i}', group=cls.group)
+            for i in range(15)
+        ])
+        cls.post = Post.objects.first()
+        Comment.objects.create(post=cls.post, author=cls.user, text='Test')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'posts_' not in sql:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plans[sql] = [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def test_feed_queries_use_indexes(self):
+        """Проверяем планы запросов всех лент и страницы поста."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'TestAuthor'}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+        ]
+        for url in urls:
+            plans = self.get_plans(url)
+            self.assertTrue(plans)
+            for sql, plan in plans.items():
+                for step in plan:
+                    with self.subTest(url=url, sql=sql, step=step):
+                        self.assertNotIn('TEMP B-TREE', step)
+                        if step.startswith('SCAN'):
+                            self.assertIn('USING', step)
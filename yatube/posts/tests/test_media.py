@@ -0,0 +1,110 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from .. import media, thumbnails
+from ..models import Post, StoredImage
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class StoredImageTests(TransactionTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create(username='TestUser')
+
+    def tearDown(self):
+        # Потоки миниатюр пишут в базу, которую TransactionTestCase очищает
+        thumbnails.wait()
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text='Test',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_duplicates_share_file_until_last_reference(self):
+        """Проверяем, что файл удаляется вместе с последней ссылкой."""
+        first = self.create_post('meme.gif')
+        second = self.create_post('repost.gif')
+        name = first.image.name
+
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(StoredImage.objects.get(name=name).references, 2)
+
+        first.delete()
+        self.assertTrue(media.storage().exists(name))
+
+        second.delete()
+        self.assertFalse(media.storage().exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_collect_keeps_new_reference(self):
+        """Проверяем, что сборка не удаляет снова занятую картинку."""
+        post = self.create_post('meme.gif')
+        name = post.image.name
+        # Последнюю ссылку сняли, но до сборки та же картинка загружена
+        # снова
+        StoredImage.objects.filter(name=name).update(references=0)
+        media.acquire(name)
+
+        media.collect(name)
+
+        self.assertTrue(media.storage().exists(name))
+        self.assertEqual(StoredImage.objects.get(name=name).references, 1)
+
+    def test_replaced_image_released(self):
+        """Проверяем, что замененная картинка теряет ссылку."""
+        post = self.create_post('meme.gif')
+        old_name = post.image.name
+
+        post.image = SimpleUploadedFile('new.gif', SMALL_GIF + b'\0')
+        post.save()
+
+        self.assertFalse(media.storage().exists(old_name))
+        self.assertEqual(
+            StoredImage.objects.get(name=post.image.name).references, 1)
+
+    def test_rehash_legacy_images(self):
+        """Проверяем перенос старых картинок в хранилище по содержимому."""
+        storage = media.storage()
+        os.makedirs(storage.path('posts'), exist_ok=True)
+        for legacy in ('posts/a.gif', 'posts/b.gif'):
+            with open(storage.path(legacy), 'wb') as output:
+                output.write(SMALL_GIF)
+        post = self.create_post('meme.gif')
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Old', image=legacy)
+            for legacy in ('posts/a.gif', 'posts/b.gif')
+        ])
+
+        call_command('rehash_images', stdout=io.StringIO())
+
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)),
+            {post.image.name})
+        self.assertEqual(
+            StoredImage.objects.get(name=post.image.name).references, 3)
+        self.assertFalse(storage.exists('posts/a.gif'))
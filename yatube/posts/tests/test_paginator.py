@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginator import page_window
+
+from ..models import Post
+from ..views import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Test {i}') for i in range(25)
+        ])
+        cls.expected = list(
+            Post.objects.order_by('-pub_date', '-id')
+            .values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_ids(self, url):
+        response = self.client.get(url)
+        page_obj = response.context['page_obj']
+        return [post.id for post in page_obj], page_obj
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        """Проверяем, что курсоры обходят ленту без пропусков и повторов."""
+        url = reverse('posts:index')
+        seen = []
+        cursors = []
+        ids, page_obj = self.get_ids(url)
+        seen += ids
+        while page_obj.next_cursor:
+            cursors.append(page_obj.next_cursor)
+            ids, page_obj = self.get_ids(f'{url}?cursor={cursors[-1]}')
+            seen += ids
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(page_obj.number, 3)
+
+        ids, page_obj = self.get_ids(
+            f'{url}?cursor={page_obj.previous_cursor}')
+        self.assertEqual(ids, self.expected[10:20])
+        self.assertEqual(page_obj.number, 2)
+
+    def test_cursor_page_does_not_count(self):
+        """Проверяем, что курсорная страница обходится без COUNT(*)."""
+        url = reverse('posts:index')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Проверяем, что испорченный курсор отдает первую страницу."""
+        ids, _ = self.get_ids(reverse('posts:index') + '?cursor=broken')
+
+        self.assertEqual(ids, self.expected[:10])
+
+    def test_page_number_fallback(self):
+        """Проверяем, что старые ссылки `?page=N` продолжают работать."""
+        ids, _ = self.get_ids(reverse('posts:index') + '?page=3')
+
+        self.assertEqual(ids, self.expected[20:])
+
+    def test_page_number_count_cached(self):
+        """Проверяем, что COUNT(*) номерных страниц берется из кэша."""
+        url = reverse('posts:index') + '?page=2'
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            ids, page_obj = self.get_ids(url)
+
+        self.assertEqual(ids, self.expected[10:20])
+        self.assertEqual(page_obj.paginator.count, 25)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+
+        Post.objects.create(author=self.user, text='New')
+        self.assertEqual(
+            self.get_ids(url)[1].paginator.count, 26)
+
+
+class PageWindowTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        Post.objects.bulk_create([
+            Post(author=cls.user, text=f'Test {i}')
+            for i in range(POSTS_PER_PAGE * 30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_window(self):
+        """Проверяем окно номеров вокруг текущей страницы."""
+        self.assertEqual(
+            page_window(50, 100), [1, None, 48, 49, 50, 51, 52, None, 100])
+        self.assertEqual(page_window(2, 100), [1, 2, 3, 4, None, 100])
+        self.assertEqual(
+            page_window(97, 100), [1, None, 95, 96, 97, 98, 99, 100])
+        self.assertEqual(page_window(3, 7), [1, 2, 3, 4, 5, 6, 7])
+
+    def test_navigation_is_windowed(self):
+        """Проверяем, что навигация не перечисляет все страницы."""
+        response = self.client.get(reverse('posts:index'), {'page': 15})
+
+        content = response.content.decode()
+        self.assertIn('href="?page=14"', content)
+        self.assertIn('href="?page=30"', content)
+        self.assertNotIn('href="?page=10"', content)
+        self.assertIn('&hellip;', content)
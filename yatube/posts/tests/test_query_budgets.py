@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import urls
+from ..models import Comment, Follow, Group, Post
+from ..views import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class QueryBudgetTests(TestCase):
+    """Каждое представление posts укладывается в свой бюджет запросов
+    (QueryBudgetMiddleware бросает исключение при превышении), и число
+    запросов не растет с числом постов на странице."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.authors = [
+            User.objects.create(username=f'TestAuthor{i}', first_name='Имя')
+            for i in range(POSTS_PER_PAGE)
+        ]
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', description='Описание', slug=f'slug-{i}')
+            for i in range(POSTS_PER_PAGE)
+        ]
+        cls.posts = [
+            Post.objects.create(author=author, group=group, text='Тест')
+            for author, group in zip(cls.authors, cls.groups)
+        ]
+        cls.post = cls.posts[-1]
+        for author in cls.authors:
+            Comment.objects.create(post=cls.post, author=author, text='Тест')
+            Follow.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def url_kwargs(self):
+        return {
+            'slug': self.groups[0].slug,
+            'username': self.authors[0].username,
+            'post_id': self.post.id,
+        }
+
+    def test_all_views_within_budget(self):
+        """Проверяем все адреса posts с холодным кэшем."""
+        kwargs = self.url_kwargs()
+        for pattern in urls.urlpatterns:
+            with self.subTest(name=pattern.name):
+                self.assertIsNotNone(
+                    getattr(pattern.callback, 'query_budget', None))
+                url = reverse(f'posts:{pattern.name}', kwargs={
+                    name: kwargs[name]
+                    for name in pattern.pattern.converters
+                })
+                cache.clear()
+                response = self.authorized_client.get(url)
+                self.assertLess(response.status_code, 400)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_page(self):
+        """Проверяем, что авторы, группы и комментарии не грузятся по
+        одному на пост."""
+        addresses = [
+            reverse('posts:index'),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        full = [self.count_queries(url) for url in addresses]
+        Post.objects.exclude(pk=self.post.pk).delete()
+        Comment.objects.exclude(pk=self.post.comments.first().pk).delete()
+
+        single = [self.count_queries(url) for url in addresses]
+
+        self.assertEqual(full, single)
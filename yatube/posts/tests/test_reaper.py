@@ -0,0 +1,202 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import counters, media, reaper, thumbnails
+from ..models import (Comment, Deletion, Follow, Group, Post, StoredImage,
+                      Timeline, UserStats)
+from .test_media import SMALL_GIF
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ReaperTests(TransactionTestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='TestAuthor')
+        self.reader = User.objects.create(username='TestReader')
+        self.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Тест')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        self.posts = [
+            Post.objects.create(
+                author=self.author, text=f'Пост {i}', group=self.group)
+            for i in range(5)
+        ]
+        self.reader_post = Post.objects.create(
+            author=self.reader, text='Чужой пост', group=self.group)
+        for post in self.posts:
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий')
+        Comment.objects.create(
+            post=self.reader_post, author=self.author, text='Комментарий')
+
+    def tearDown(self):
+        # Потоки миниатюр пишут в базу, которую TransactionTestCase очищает
+        thumbnails.wait()
+
+    def reap(self, batch_size=2):
+        progress = []
+        reaper.reap(batch_size, progress=lambda deletion: progress.append(
+            (deletion.done, deletion.total, deletion.pk is None)))
+        return progress
+
+    def test_post_hidden_then_reaped(self):
+        """Проверяем, что пост скрыт сразу, а удаляется reaper-ом."""
+        post = self.posts[0]
+
+        reaper.schedule(post)
+
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(
+            post, self.client.get(reverse('posts:index')).context['page_obj'])
+        self.assertFalse(Timeline.objects.filter(
+            user=self.reader, post__deleted=False, post=post).exists())
+        self.assertTrue(Post.all_objects.filter(pk=post.pk).exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 4)
+        self.assertEqual(Group.objects.get().posts_count, 5)
+
+        self.reap()
+
+        self.assertFalse(Post.all_objects.filter(pk=post.pk).exists())
+        self.assertFalse(Comment.objects.filter(post_id=post.pk).exists())
+        self.assertFalse(Deletion.objects.exists())
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 4)
+
+    def test_user_reaped_in_batches(self):
+        """Проверяем удаление автора пачками с прогрессом."""
+        reaper.schedule(self.author)
+
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'TestAuthor'}))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[0].id}))
+        self.assertEqual(response.status_code, 404)
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+                    reverse('posts:search') + '?q=Пост'):
+            with self.subTest(url=url):
+                self.assertNotContains(self.client.get(url), 'Пост 0')
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count), (0, 0))
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        self.assertFalse(any(counters.reconcile().values()))
+
+        progress = self.reap(batch_size=2)
+
+        self.assertGreater(len(progress), 5)
+        done, total, finished = progress[-1]
+        # своя лента, записи лент с постами автора, комментарии к ним,
+        # посты, свой комментарий, две подписки
+        self.assertEqual(total, 1 + 5 + 5 + 5 + 1 + 2)
+        self.assertGreaterEqual(done, total)
+        self.assertTrue(finished)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.all_objects.filter(
+            author_id=self.author.pk).exists())
+        self.assertFalse(Comment.objects.filter(
+            author_id=self.author.pk).exists())
+        self.assertFalse(Follow.objects.exists())
+        stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(
+            (stats.followers_count, stats.following_count), (0, 0))
+        self.reader_post.refresh_from_db()
+        self.assertEqual(self.reader_post.comments_count, 0)
+
+    def test_inactive_user_visible(self):
+        """Проверяем, что просто неактивный автор не пропадает с сайта."""
+        User.objects.filter(pk=self.author.pk).update(is_active=False)
+
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'TestAuthor'}))
+
+        self.assertContains(response, 'Пост 0')
+
+    def test_group_detached_in_batches(self):
+        """Проверяем, что посты удаленной группы остаются без группы."""
+        reaper.schedule(self.group)
+
+        response = self.client.get(
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}))
+        self.assertEqual(response.status_code, 404)
+
+        self.reap(batch_size=4)
+
+        self.assertFalse(Group.all_objects.exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 6)
+
+    def test_image_released(self):
+        """Проверяем, что файл картинки удаляется вместе с постом."""
+        post = Post.objects.create(
+            author=self.author, text='С картинкой',
+            image=SimpleUploadedFile('meme.gif', SMALL_GIF, 'image/gif'))
+        name = post.image.name
+
+        reaper.schedule(post)
+        self.assertTrue(media.storage().exists(name))
+        call_command('reap_deleted', stdout=io.StringIO())
+
+        self.assertFalse(media.storage().exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_admin_delete_deferred(self):
+        """Проверяем, что админка не удаляет автора каскадом сразу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        url = reverse('admin:auth_user_delete', args=(self.author.pk,))
+
+        response = client.get(url)
+        self.assertNotContains(response, 'Пост 0')
+
+        client.post(url, {'post': 'yes'})
+
+        self.assertTrue(Deletion.objects.filter(
+            kind=Deletion.USER, object_id=self.author.pk).exists())
+        self.assertEqual(
+            Post.all_objects.filter(author=self.author).count(), 5)
+
+    def test_admin_delete_checks_related_permissions(self):
+        """Проверяем, что админка требует права на удаление зависимых."""
+        staff = User.objects.create_user('staff', password='password')
+        staff.is_staff = True
+        staff.save()
+        staff.user_permissions.add(
+            Permission.objects.get(codename='delete_user'))
+        client = Client()
+        client.force_login(staff)
+        url = reverse('admin:auth_user_delete', args=(self.author.pk,))
+
+        response = client.get(url)
+
+        self.assertIn(
+            Post._meta.verbose_name, response.context['perms_lacking'])
+        client.post(url, {'post': 'yes'})
+        self.assertFalse(Deletion.objects.exists())
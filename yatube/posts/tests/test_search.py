@@ -0,0 +1,131 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import fulltext
+from ..models import Comment, Post
+from ..views import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+def found(query):
+    results = fulltext.SearchResults(query)
+    return results[:results.count()]
+
+
+class FullTextIndexTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+
+    def test_post_indexed_on_save(self):
+        """Проверяем, что пост попадает в индекс и обновляется в нем."""
+        post = Post.objects.create(author=self.user, text='Первый снег')
+        self.assertEqual(found('снег'), [post])
+
+        post.text = 'Теплый дождь'
+        post.save()
+
+        self.assertEqual(found('снег'), [])
+        self.assertEqual(found('дождь'), [post])
+
+    def test_comment_finds_its_post(self):
+        """Проверяем, что пост находится по тексту комментария."""
+        post = Post.objects.create(author=self.user, text='Без слов')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Отличная фотография')
+
+        self.assertEqual(found('фотограф'), [post])
+
+        comment.delete()
+        self.assertEqual(found('фотограф'), [])
+
+    def test_deleted_post_removed(self):
+        """Проверяем, что удаленный пост и комментарии уходят из индекса."""
+        post = Post.objects.create(author=self.user, text='Удаляемый пост')
+        Comment.objects.create(post=post, author=self.user, text='Удаляемый')
+
+        post.delete()
+
+        self.assertEqual(fulltext.SearchResults('удаляемый').count(), 0)
+
+    def test_query_syntax_is_escaped(self):
+        """Проверяем, что синтаксис FTS5 из запроса не ломает поиск."""
+        post = Post.objects.create(author=self.user, text='Кот AND пес')
+
+        for query in ('"кот', 'кот AND (', 'NEAR(кот', '*', ''):
+            with self.subTest(query=query):
+                found(query)
+        self.assertEqual(found('кот AND'), [post])
+
+    def test_rebuild(self):
+        """Проверяем, что команда восстанавливает индекс целиком."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Comment.objects.create(post=post, author=self.user, text='Ответ')
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Массовая загрузка'),
+        ])
+        self.assertEqual(found('массовая'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(len(found('массовая')), 1)
+        self.assertEqual(found('ответ'), [post])
+
+
+class SearchViewTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.relevant = Post.objects.create(
+            author=cls.user, text='Море, море, море и солнце')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {i} про море')
+            for i in range(POSTS_PER_PAGE)
+        ]
+        Post.objects.create(author=cls.user, text='Горы')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_results_ranked_and_paginated(self):
+        """Проверяем, что выдача упорядочена по релевантности и разбита."""
+        response = self.client.get(reverse('posts:search'), {'q': 'море'})
+        page_obj = response.context['page_obj']
+
+        self.assertEqual(page_obj.paginator.count, POSTS_PER_PAGE + 1)
+        self.assertEqual(page_obj[0], self.relevant)
+        self.assertEqual(len(page_obj), POSTS_PER_PAGE)
+        self.assertContains(response, '?q=%D0%BC%D0%BE%D1%80%D0%B5&amp;page=2')
+
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'море', 'page': 2})
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_empty_query(self):
+        """Проверяем, что пустой запрос показывает пустую страницу."""
+        response = self.client.get(reverse('posts:search'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 0)
+
+    def test_admin_search_uses_index(self):
+        """Проверяем, что поиск в админке ищет по индексу текстов постов."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'горы'})
+
+        self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,81 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..management.commands.bench_views import compare
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_counts(self):
+        """Проверяем, что команда создает запрошенные данные."""
+        call_command(
+            'seed_yatube', users=50, groups=3, posts=200, comments=100,
+            follows=300, images=2, image_ratio=0.5, seed=1,
+            stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 300)
+        images = set(Post.objects.exclude(image='').values_list(
+            'image', flat=True))
+        self.assertEqual(len(images), 2)
+
+    def test_follow_graph_is_skewed(self):
+        """Проверяем, что подписчики сосредоточены у немногих авторов."""
+        call_command(
+            'seed_yatube', users=200, groups=1, posts=10, comments=0,
+            follows=1000, images=0, seed=1, stdout=StringIO())
+
+        followers = sorted(UserStats.objects.values_list(
+            'followers_count', flat=True), reverse=True)
+        self.assertEqual(sum(followers), 1000)
+        self.assertGreater(sum(followers[:20]), sum(followers[20:]))
+
+    def test_derived_data(self):
+        """Проверяем, что счетчики и даты комментариев согласованы."""
+        call_command(
+            'seed_yatube', users=20, groups=2, posts=50, comments=50,
+            follows=40, images=0, seed=2, stdout=StringIO())
+
+        for post in Post.objects.filter(comments_count__gt=0):
+            self.assertEqual(post.comments_count, post.comments.count())
+            self.assertFalse(post.comments.filter(
+                created__lt=post.pub_date).exists())
+
+
+class CompareTests(TestCase):
+
+    def test_regressions_found(self):
+        """Проверяем, что сравнение прогонов находит регрессии."""
+        previous = {'sizes': {'100': {'index': {
+            'p50_ms': 10, 'queries': 3, 'bytes': 1000}}}}
+        current = {'sizes': {'100': {'index': {
+            'p50_ms': 11, 'queries': 4, 'bytes': 1000}}}}
+
+        self.assertEqual(
+            compare(previous, current, tolerance=0.2),
+            ['100 index queries: 3 -> 4'],
+        )
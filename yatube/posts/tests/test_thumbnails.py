@@ -0,0 +1,115 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_jpeg(size):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 100, 50)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Test',
+            image=SimpleUploadedFile(
+                'photo.jpg', make_jpeg((1200, 900)), 'image/jpeg'),
+        )
+
+    def test_page_does_not_generate_thumbnail(self):
+        """Проверяем, что страница не создает миниатюру сама."""
+        content = self.client.get(reverse('posts:index')).content.decode()
+
+        self.assertIn(self.post.image.url, content)
+        self.assertIsNone(
+            thumbnails.lookup(self.post.image, '960x339', crop='center',
+                              upscale=True))
+
+    def test_generated_thumbnail_shown(self):
+        """Проверяем, что готовая миниатюра сразу попадает в ленту."""
+        url = reverse('posts:index')
+        self.client.get(url)
+
+        thumbnails.generate(self.post.image.name)
+
+        thumbnail = thumbnails.lookup(
+            self.post.image, '960x339', crop='center', upscale=True)
+        self.assertIsNotNone(thumbnail)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        content = self.client.get(url).content.decode()
+        self.assertIn(f'src="{thumbnail.url}"', content)
+        self.assertIn(' 480w, ', content)
+        self.assertIn(' 1440w"', content)
+        self.assertNotIn(self.post.image.url, content)
+        if 'WEBP' in thumbnails.FORMATS:
+            self.assertIn('<source type="image/webp"', content)
+
+    def test_page_thumbnails_prefetched(self):
+        """Проверяем, что миниатюры страницы читаются одним запросом."""
+        for i in range(9):
+            Post.objects.create(
+                author=self.user,
+                text=f'Test {i}',
+                image=SimpleUploadedFile(
+                    f'photo{i}.jpg', make_jpeg((100 + i, 100)),
+                    'image/jpeg'),
+            )
+        for post in Post.objects.all():
+            thumbnails.generate(post.image.name)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'TestUser'}),
+        ]
+        for url in urls:
+            cache.clear()
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    content = self.client.get(url).content.decode()
+                self.assertEqual(content.count('<picture>'), 10)
+                self.assertEqual(sum(
+                    'thumbnail_kvstore' in query['sql']
+                    for query in queries.captured_queries
+                ), 1)
+
+    def test_draft_mode_decodes_downscaled(self):
+        """Проверяем, что большой JPEG декодируется уже уменьшенным."""
+        source = default.engine.get_image(io.BytesIO(make_jpeg((4000, 3000))))
+        options = {'crop': 'center', 'upscale': True, 'cropbox': None}
+
+        thumbnails.DraftEngine().draft(source, (960, 339), options)
+
+        self.assertEqual(source.size, (1000, 750))
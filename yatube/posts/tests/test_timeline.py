@@ -0,0 +1,162 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import feeds
+from ..models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.author = User.objects.create(username='TestAuthor')
+        cls.old_post = Post.objects.create(author=cls.author, text='Old')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow_page_ids(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return [post.id for post in response.context['page_obj']]
+
+    def test_follow_backfills_timeline(self):
+        """Проверяем, что подписка добавляет в ленту старые посты автора."""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'TestAuthor'})
+        )
+
+        self.assertEqual(self.follow_page_ids(), [self.old_post.id])
+
+    @override_settings(TIMELINE_BATCH_SIZE=2)
+    def test_new_post_pushed_to_all_followers(self):
+        """Проверяем, что новый пост раскладывается во все ленты пачками."""
+        followers = [
+            User.objects.create(username=f'Follower{i}') for i in range(5)
+        ]
+        for follower in followers:
+            Follow.objects.create(user=follower, author=self.author)
+
+        post = Post.objects.create(author=self.author, text='New')
+
+        self.assertEqual(
+            Timeline.objects.filter(post=post).count(), len(followers))
+
+    def test_fan_out_skips_existing_entries(self):
+        """Проверяем, что раскладка не падает на уже добавленных записях."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='New')
+
+        # Запись уже добавила параллельная backfill_timeline
+        feeds.fan_out_post(post)
+
+        self.assertEqual(Timeline.objects.filter(post=post).count(), 1)
+
+    def test_unfollow_prunes_timeline(self):
+        """Проверяем, что отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.create(author=self.author, text='New')
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': 'TestAuthor'})
+        )
+
+        self.assertEqual(self.follow_page_ids(), [])
+        self.assertFalse(Timeline.objects.filter(user=self.user).exists())
+
+    def test_timeline_ordered_newest_first(self):
+        """Проверяем, что лента подписок идет от новых постов к старым."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='New')
+
+        self.assertEqual(
+            self.follow_page_ids(), [new_post.id, self.old_post.id])
+
+
+@override_settings(TIMELINE_CELEBRITY_THRESHOLD=2)
+class HybridTimelineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='TestUser')
+        cls.fan = User.objects.create(username='TestFan')
+        cls.star = User.objects.create(username='TestStar')
+        cls.author = User.objects.create(username='TestAuthor')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        Follow.objects.create(user=self.user, author=self.star)
+        Follow.objects.create(user=self.fan, author=self.star)
+        Follow.objects.create(user=self.user, author=self.author)
+
+    def tearDown(self):
+        cache.clear()
+
+    def follow_page_ids(self, url=None):
+        response = self.authorized_client.get(
+            url or reverse('posts:follow_index'))
+        page_obj = response.context['page_obj']
+        return [post.id for post in page_obj], page_obj
+
+    def test_celebrity_posts_merged_on_read(self):
+        """Проверяем, что посты знаменитости видны в ленте без копирования."""
+        star_post = Post.objects.create(author=self.star, text='Star')
+        author_post = Post.objects.create(author=self.author, text='Author')
+
+        self.assertFalse(Timeline.objects.filter(post=star_post).exists())
+        self.assertTrue(Timeline.objects.filter(post=author_post).exists())
+        ids, _ = self.follow_page_ids()
+        self.assertEqual(ids, [author_post.id, star_post.id])
+
+    def test_merged_feed_paginates_without_gaps(self):
+        """Проверяем обход смешанной ленты курсорами."""
+        posts = []
+        for i in range(12):
+            author = self.star if i % 2 else self.author
+            posts.append(Post.objects.create(author=author, text=f'Test {i}'))
+        expected = [post.id for post in reversed(posts)]
+
+        ids, page_obj = self.follow_page_ids()
+        next_ids, _ = self.follow_page_ids(
+            reverse('posts:follow_index') + f'?cursor={page_obj.next_cursor}')
+
+        self.assertEqual(ids + next_ids, expected)
+
+    def test_demoted_author_backfilled(self):
+        """Проверяем, что после понижения посты автора раскладываются."""
+        star_post = Post.objects.create(author=self.star, text='Star')
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+
+        ids, _ = self.follow_page_ids()
+        self.assertIn(star_post.id, ids)
+        self.assertFalse(Timeline.objects.filter(post=star_post).exists())
+
+        call_command('demote_celebrities', stdout=StringIO())
+
+        self.assertTrue(
+            Timeline.objects.filter(user=self.user, post=star_post).exists())
+        self.assertFalse(feeds.is_celebrity(self.star.id))
+        ids, _ = self.follow_page_ids()
+        self.assertEqual(ids.count(star_post.id), 1)
+
+    @override_settings(TIMELINE_CELEBRITY_DEMOTE_RATIO=0.5)
+    def test_author_near_threshold_not_demoted(self):
+        """Проверяем, что автор у порога не понижается при отписке."""
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        call_command('demote_celebrities', stdout=StringIO())
+        star_post = Post.objects.create(author=self.star, text='Star')
+
+        self.assertTrue(feeds.is_celebrity(self.star.id))
+        self.assertFalse(Timeline.objects.filter(post=star_post).exists())
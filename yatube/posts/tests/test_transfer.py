@@ -0,0 +1,146 @@
+import datetime
+import gzip
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import fulltext, reaper
+from ..models import (Comment, Deletion, Follow, Group, Post, Timeline,
+                      UserStats)
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='TestAuthor', password='secret')
+        self.reader = User.objects.create(username='TestReader')
+        self.group = Group.objects.create(
+            title='Тестовый заголовок',
+            description='Тестовое описание',
+            slug='test-slug'
+        )
+        self.post = Post.objects.create(
+            author=self.author, text='Тестовый пост', group=self.group)
+        self.pub_date = timezone.make_aware(
+            datetime.datetime(2019, 5, 1, 12, 30, 15, 123456))
+        Post.objects.filter(pk=self.post.pk).update(pub_date=self.pub_date)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, 'dump.ndjson.gz')
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.remove, self.path)
+
+    def export_and_wipe(self):
+        call_command('export_yatube', self.path, stderr=StringIO())
+        self.wipe()
+
+    def wipe(self):
+        User.objects.all().delete()
+        Group.all_objects.all().delete()
+        Deletion.objects.all().delete()
+        self.assertFalse(Post.objects.exists())
+
+    def test_round_trip(self):
+        """Проверяем, что выгрузка загружается обратно без потерь."""
+        self.export_and_wipe()
+
+        call_command('import_yatube', self.path, stdout=StringIO())
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Тестовый пост')
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.group.slug, 'test-slug')
+        self.assertTrue(post.author.check_password('secret'))
+        self.assertTrue(Comment.objects.filter(
+            post=post, author__username='TestReader').exists())
+        self.assertTrue(Follow.objects.filter(
+            user__username='TestReader', author=post.author).exists())
+
+    def test_derived_data_rebuilt(self):
+        """Проверяем, что счетчики, ленты и индекс пересчитаны."""
+        self.export_and_wipe()
+
+        call_command('import_yatube', self.path, stdout=StringIO())
+
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        stats = UserStats.objects.get(user__username='TestAuthor')
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+        self.assertTrue(Timeline.objects.filter(
+            user__username='TestReader', post=post).exists())
+        self.assertEqual(fulltext.SearchResults('комментарий').count(), 1)
+
+    def test_pending_deletions_kept(self):
+        """Проверяем, что удаления из очереди переносятся вместе с данными."""
+        reaper.schedule(self.reader)
+        reaper.schedule(self.group)
+        self.export_and_wipe()
+
+        call_command('import_yatube', self.path, stdout=StringIO())
+
+        self.assertEqual(
+            set(Deletion.objects.values_list('kind', 'object_id')),
+            {(Deletion.USER, self.reader.pk),
+             (Deletion.GROUP, self.group.pk)})
+
+    def test_import_is_repeatable(self):
+        """Проверяем, что повторная загрузка с --merge не дублирует строки."""
+        self.export_and_wipe()
+
+        for _ in range(2):
+            call_command(
+                'import_yatube', self.path, merge=True, stdout=StringIO())
+
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+
+    def test_non_empty_target_refused(self):
+        """Проверяем, что без --merge непустая база не принимает загрузку."""
+        call_command('export_yatube', self.path, stderr=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('import_yatube', self.path, stdout=StringIO())
+
+    def test_merge_conflict(self):
+        """Проверяем, что --merge не смешивает чужой объект с тем же id."""
+        call_command('export_yatube', self.path, stderr=StringIO())
+        Post.objects.filter(pk=self.post.pk).update(text='Другой пост')
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_yatube', self.path, merge=True, stdout=StringIO())
+
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text, 'Другой пост')
+
+    def test_integrity_error(self):
+        """Проверяем, что ошибка целостности - ошибка команды, а не сбой."""
+        line = ('{"type": "group", "id": 1, "title": "Группа", '
+                '"slug": "group", "description": ""}\n')
+        with gzip.open(self.path, 'wt') as stream:
+            stream.write(line * 2)
+        self.wipe()
+
+        with self.assertRaises(CommandError):
+            call_command('import_yatube', self.path, stdout=StringIO())
+
+    def test_broken_line(self):
+        """Проверяем, что неизвестный объект останавливает загрузку."""
+        with gzip.open(self.path, 'wt') as stream:
+            stream.write('{"type": "unknown"}\n')
+
+        with self.assertRaises(CommandError):
+            call_command('import_yatube', self.path, stdout=StringIO())
@@ -0,0 +1,50 @@
+import io
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from ..uploads import normalize
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def make_upload(name, image_format, size, exif=None):
+    buffer = io.BytesIO()
+    options = {'exif': exif.tobytes()} if exif is not None else {}
+    Image.new('RGB', size, (10, 200, 30)).save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class NormalizeTests(SimpleTestCase):
+
+    def test_orientation_fixed_and_metadata_stripped(self):
+        """Проверяем поворот по EXIF и удаление метаданных."""
+        exif = Image.Exif()
+        exif[ORIENTATION] = 6
+        exif[MAKE] = 'Camera'
+
+        upload = normalize(make_upload('photo.jpg', 'JPEG', (300, 200), exif))
+
+        image = Image.open(upload)
+        self.assertEqual(upload.name, 'photo.jpg')
+        self.assertEqual(image.size, (200, 300))
+        self.assertEqual(len(image.getexif()), 0)
+
+    @override_settings(POST_IMAGE_MAX_SIDE=500)
+    def test_large_image_capped(self):
+        """Проверяем, что большая картинка уменьшается до предела."""
+        upload = normalize(make_upload('large.png', 'PNG', (3000, 1000)))
+
+        self.assertEqual(Image.open(upload).size, (500, 167))
+
+    def test_other_formats_kept(self):
+        """Проверяем, что GIF сохраняется без изменений."""
+        original = make_upload('small.gif', 'GIF', (10, 10))
+        content = original.read()
+
+        upload = normalize(original)
+
+        self.assertIs(upload, original)
+        self.assertEqual(upload.read(), content)
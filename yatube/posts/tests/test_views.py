@@ -267,7 +267,7 @@ class PostsPagesTests(TestCase):
         first_object = response.context.get('post')
 
         self.assertEqual(first_object.author, post.author)
-        self.assertEqual(first_object.image, 'posts/gif')
+        self.assertEqual(first_object.image, post.image)
         self.assertEqual(first_object.text, post.text)
         self.assertEqual(first_object.group, post.group)
 
@@ -0,0 +1,196 @@
+import os
+import socket
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import writer
+from core.writer import Writer, WriterError
+
+from .. import writes
+from ..models import Comment, Follow, Post, StoredImage
+from .test_media import SMALL_GIF
+
+User = get_user_model()
+
+
+# Процесс записи работает в потоке теста на его подключении, и его
+# запросы попали бы в бюджет представления
+@override_settings(QUERY_BUDGET_CHECKS=False)
+class WriterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='TestAuthor')
+        self.user = User.objects.create(username='TestUser')
+        self.post = Post.objects.create(author=self.author, text='Тест')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'writer.sock')
+        self.writer = Writer(path, batch_wait=0.2)
+        override = override_settings(WRITER_SOCKET=path)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.connection = connections['default']
+        self.connection.inc_thread_sharing()
+        self.addCleanup(self.connection.dec_thread_sharing)
+        ready = threading.Event()
+        thread = threading.Thread(target=self.serve, args=(ready,))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.writer.stop)
+        ready.wait()
+
+    def serve(self, ready):
+        connections['default'] = self.connection
+        self.writer.serve(ready)
+
+    def submit_concurrently(self, calls):
+        results = [None] * len(calls)
+
+        def call(index, func, kwargs):
+            try:
+                results[index] = func(**kwargs)
+            except WriterError as exc:
+                results[index] = exc
+
+        threads = [
+            threading.Thread(target=call, args=(index, func, kwargs))
+            for index, (func, kwargs) in enumerate(calls)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_views_write_through_writer(self):
+        """Проверяем, что комментарий и подписка идут через процесс записи."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'})
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'TestAuthor'}))
+        self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'})
+
+        self.assertTrue(Comment.objects.filter(
+            post=self.post, author=self.user, text='Комментарий').exists())
+        self.assertTrue(Follow.objects.filter(
+            user=self.user, author=self.author).exists())
+        self.assertTrue(Post.objects.filter(
+            author=self.user, text='Новый пост').exists())
+        self.assertEqual(self.writer.committed, 3)
+
+    def test_group_commit(self):
+        """Проверяем, что одновременные записи фиксируются одной пачкой."""
+        calls = [
+            (writes.add_comment, {
+                'post_id': self.post.id, 'author_id': self.user.id,
+                'text': f'Комментарий {i}'})
+            for i in range(5)
+        ]
+
+        ids = self.submit_concurrently(calls)
+
+        self.assertEqual(Comment.objects.filter(pk__in=ids).count(), 5)
+        self.assertEqual(self.writer.batches, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 5)
+
+    def test_failed_operation_isolated(self):
+        """Проверяем, что ошибка одной операции не отменяет пачку."""
+        calls = [
+            (writes.create_post, {'author_id': self.user.id, 'text': None}),
+            (writes.create_post, {'author_id': self.user.id, 'text': 'Ок'}),
+        ]
+
+        with self.assertLogs('core.writer', 'ERROR'):
+            failed, created = self.submit_concurrently(calls)
+
+        self.assertIsInstance(failed, WriterError)
+        self.assertIn('IntegrityError', str(failed))
+        self.assertTrue(Post.objects.filter(pk=created, text='Ок').exists())
+
+    def test_writer_unavailable(self):
+        """Проверяем, что без процесса записи воркер пишет сам."""
+        with self.settings(WRITER_SOCKET='/nonexistent/writer.sock'), \
+                self.assertLogs('core.writer', 'WARNING'):
+            writes.follow(user_id=self.user.id, author_id=self.author.id)
+
+        self.assertTrue(Follow.objects.filter(
+            user=self.user, author=self.author).exists())
+
+    def test_writer_gone_before_retry(self):
+        """Проверяем, что воркер пишет сам, если повтор не соединился."""
+        with mock.patch.object(writer, 'send_frame',
+                               side_effect=BrokenPipeError), \
+                mock.patch.object(writer, 'connect', side_effect=[
+                    mock.Mock(), ConnectionRefusedError]), \
+                self.assertLogs('core.writer', 'WARNING'):
+            writes.follow(user_id=self.user.id, author_id=self.author.id)
+
+        self.assertTrue(Follow.objects.filter(
+            user=self.user, author=self.author).exists())
+
+    def test_lost_reply_not_duplicated(self):
+        """Проверяем, что повтор после потерянного ответа не дублирует."""
+        recv_frame = writer.recv_frame
+
+        def lose_reply(sock):
+            response = recv_frame(sock)
+            # Процесс записи читает запросы той же функцией
+            if threading.current_thread() is threading.main_thread():
+                raise socket.timeout('timed out')
+            return response
+
+        with mock.patch.object(writer, 'recv_frame', side_effect=lose_reply), \
+                self.assertLogs('core.writer', 'WARNING'):
+            comment_id = writes.add_comment(
+                post_id=self.post.id, author_id=self.user.id,
+                text='Комментарий')
+
+        self.assertEqual(
+            list(Comment.objects.values_list('pk', flat=True)), [comment_id])
+        self.assertEqual(self.writer.committed, 1)
+
+    def test_token_executes_once(self):
+        """Проверяем, что операция с тем же токеном выполняется один раз."""
+        kwargs = {
+            'post_id': self.post.id, 'author_id': self.user.id,
+            'text': 'Комментарий'}
+
+        first = writer.run(writes.add_comment.operation, kwargs, 'token')
+        second = writer.run(writes.add_comment.operation, kwargs, 'token')
+
+        self.assertEqual(first, second)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_failed_post_discards_image(self):
+        """Проверяем, что файл картинки не остается без поста."""
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        image = SimpleUploadedFile('meme.gif', SMALL_GIF, 'image/gif')
+
+        with self.settings(MEDIA_ROOT=media_root.name), \
+                mock.patch.object(writes, 'create_post',
+                                  side_effect=WriterError('create_post')), \
+                self.assertRaises(WriterError):
+            self.authorized_client.post(
+                reverse('posts:post_create'),
+                {'text': 'Пост', 'image': image})
+
+        self.assertFalse(StoredImage.objects.exists())
+        self.assertEqual(
+            [files for _, _, files in os.walk(media_root.name) if files], [])
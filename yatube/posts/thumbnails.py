@@ -0,0 +1,240 @@
+"""
+Миниатюры картинок постов.
+
+Шаблоны не генерируют миниатюры: тег {% thumbnail %} из post_images
+только ищет готовую в key-value store sorl-thumbnail. Готовит их пул
+потоков после сохранения картинки (schedule), а пока миниатюры нет,
+шаблон показывает исходную картинку. Старые картинки догоняет команда
+pregenerate_thumbnails.
+
+Для каждой геометрии шаблона готовятся варианты шириной SCALES от нее
+в JPEG и, если Pillow собран с libwebp, в WebP; тег {% picture %}
+собирает из готовых вариантов <picture> со srcset.
+
+Ключи миниатюр страницы ленты BatchKVStore читает одним get_many
+(prefetch), а не отдельным запросом на каждый тег.
+"""
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.engines.pil_engine import Engine
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+from sorl.thumbnail.parsers import parse_geometry
+
+from . import generations, media
+from .models import Post
+
+# Все геометрии, которые используют шаблоны
+GEOMETRIES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+# Ширины вариантов для srcset относительно геометрии шаблона
+SCALES = (0.5, 1, 1.5)
+FORMATS = ('WEBP', 'JPEG') if features.check('webp') else ('JPEG',)
+
+_executor = None
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+class DraftEngine(Engine):
+    """PIL-движок, который декодирует JPEG сразу в уменьшенном масштабе."""
+
+    def create(self, image, geometry, options):
+        if image.format == 'JPEG' and not options.get('cropbox'):
+            self.draft(image, geometry, options)
+        return super().create(image, geometry, options)
+
+    def draft(self, image, geometry, options):
+        # Декодер JPEG умеет уменьшать в 2, 4 и 8 раз почти бесплатно;
+        # draft выбирает наибольшее уменьшение не меньше нужного размера.
+        x_image, y_image = image.size
+        if self._flip_dimensions(image):
+            x_image, y_image = y_image, x_image
+        factor = self._calculate_scaling_factor(
+            x_image, y_image, geometry, options)
+        if factor >= 1:
+            return
+        image.draft(image.mode, (
+            math.ceil(image.size[0] * factor),
+            math.ceil(image.size[1] * factor),
+        ))
+
+
+class BatchKVStore(KVStore):
+    """
+    Key-value store sorl-thumbnail с пакетной подгрузкой.
+
+    prefetch() запоминает ключи миниатюр страницы, и первый же запрос
+    любого из них читает все разом: get_many из кэша и один запрос к
+    таблице за промахами. Подгруженное живет до конца запроса (forget).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    def _state(self):
+        state = self._local.__dict__
+        return state.setdefault('pending', set()), state.setdefault(
+            'values', {})
+
+    def prefetch(self, image_files):
+        pending, values = self._state()
+        pending.update(
+            key for key in map(add_prefix, (f.key for f in image_files))
+            if key not in values
+        )
+
+    def forget(self):
+        self._local.__dict__.clear()
+
+    def _fetch_pending(self):
+        pending, values = self._state()
+        keys = list(pending)
+        pending.clear()
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            rows = dict(
+                KVStoreModel.objects.filter(key__in=missing)
+                .values_list('key', 'value')
+            )
+            fetched = {key: rows.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(fetched)
+        values.update(found)
+
+    def _get_raw(self, key):
+        pending, values = self._state()
+        if key in pending:
+            self._fetch_pending()
+        if key not in values:
+            return super()._get_raw(key)
+        value = values[key]
+        return None if value == EMPTY_VALUE else value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self._state()[1].pop(key, None)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        values = self._state()[1]
+        for key in keys:
+            values.pop(key, None)
+
+
+def prepare_options(source, options):
+    """Дополняет опции так же, как ThumbnailBackend.get_thumbnail."""
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_file(file_, geometry, **options):
+    """ImageFile миниатюры с тем же именем, что даст get_thumbnail."""
+    source = ImageFile(file_)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, prepare_options(source, options))
+    return ImageFile(name, default.storage)
+
+
+def variants(geometry, options):
+    """Варианты геометрии: (формат, ширина, геометрия, опции)."""
+    width, height = parse_geometry(geometry)
+    for image_format in FORMATS:
+        for scale in SCALES:
+            size = round(width * scale), round(height * scale)
+            yield image_format, size[0], '{}x{}'.format(*size), {
+                **options, 'format': image_format}
+
+
+def all_variants():
+    for geometry, options in GEOMETRIES:
+        for _, _, variant, variant_options in variants(geometry, options):
+            yield variant, variant_options
+
+
+def lookup(file_, geometry, **options):
+    """Готовая миниатюра из key-value store или None; ничего не создает."""
+    return default.kvstore.get(thumbnail_file(file_, geometry, **options))
+
+
+def prefetch(posts):
+    """Готовит чтение миниатюр всех картинок страницы одним пакетом."""
+    default.kvstore.prefetch([
+        thumbnail_file(post.image, geometry, **options)
+        for post in posts if post.image
+        for geometry, options in all_variants()
+    ])
+
+
+def forget_prefetched():
+    default.kvstore.forget()
+
+
+def generate(name):
+    """Создает все миниатюры картинки и сбрасывает фрагменты с ней."""
+    try:
+        source = ImageFile(name, media.storage())
+        for geometry, options in all_variants():
+            get_thumbnail(source, geometry, **options)
+        for post in Post.objects.filter(image=name).only(
+                'author_id', 'group_id'):
+            generations.bump_post(post)
+    finally:
+        with _pending_lock:
+            _pending.discard(name)
+        close_old_connections()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def submit(name):
+    """Ставит картинку в очередь, если она еще не в работе."""
+    with _pending_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    executor().submit(generate, name)
+
+
+def wait():
+    """Дожидается миниатюр из очереди; следующий submit создаст пул."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+def schedule(image):
+    """Генерирует миниатюры после фиксации транзакции с картинкой."""
+    if image:
+        name = image.name
+        transaction.on_commit(lambda: submit(name))
@@ -0,0 +1,161 @@
+"""
+Потоковый перенос данных в формате NDJSON.
+
+Строка файла - один объект: {"type": "post", "id": 1, ...}. Объекты
+идут в порядке зависимостей (пользователи, группы, посты, комментарии,
+подписки, удаления в очереди), поэтому импорт вставляет их пачками по
+мере чтения и не держит файл в памяти. bulk_create не посылает
+сигналов, поэтому счетчики, ленты подписок и поисковый индекс
+пересчитываются один раз в конце (finish). Файлы картинок не
+переносятся, только их имена.
+"""
+import json
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from core.paginator import CursorEncoder
+
+from . import counters, feeds, fulltext
+from .models import Comment, Deletion, Follow, Group, Post, User
+
+TYPES = (
+    ('user', User, (
+        'id', 'username', 'password', 'first_name', 'last_name', 'email',
+        'is_staff', 'is_active', 'is_superuser', 'last_login',
+        'date_joined',
+    )),
+    ('group', Group, ('id', 'title', 'slug', 'description', 'deleted')),
+    ('post', Post, (
+        'id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+        'deleted')),
+    ('comment', Comment, ('id', 'post_id', 'author_id', 'text', 'created')),
+    ('follow', Follow, ('id', 'user_id', 'author_id')),
+    # Начатые до экспорта удаления доделает reap_deleted
+    ('deletion', Deletion, ('id', 'kind', 'object_id', 'requested')),
+)
+MODELS = {name: (model, fields) for name, model, fields in TYPES}
+
+
+def export(stream, chunk_size):
+    """Пишет все объекты в stream; возвращает число строк по типам."""
+    counts = {}
+    for name, model, fields in TYPES:
+        # Скрытые строки тоже: на них ссылаются комментарии и посты
+        rows = model._base_manager.order_by('pk').values(*fields)
+        counts[name] = 0
+        for row in rows.iterator(chunk_size=chunk_size):
+            stream.write(json.dumps(
+                {'type': name, **row}, cls=CursorEncoder,
+                ensure_ascii=False))
+            stream.write('\n')
+            counts[name] += 1
+    return counts
+
+
+@contextmanager
+def explicit_dates():
+    """Даты из файла вместо auto_now_add на время загрузки."""
+    fields = [
+        field for _, model, _ in TYPES for field in model._meta.fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def is_empty():
+    return not any(
+        model._base_manager.exists() for _, model, _ in TYPES)
+
+
+def conflicts(name, records):
+    """id объектов пачки, которые в базе заняты другими объектами."""
+    model, fields = MODELS[name]
+    rows = model._base_manager.filter(
+        pk__in=[record['id'] for record in records]).values(*fields)
+    # Сравниваем в том же виде, в каком строки выгружены
+    existing = {
+        row['id']: json.loads(json.dumps(row, cls=CursorEncoder))
+        for row in rows
+    }
+    return [
+        record['id'] for record in records
+        if record['id'] in existing and any(
+            existing[record['id']][field] != value
+            for field, value in record.items())
+    ]
+
+
+def insert(name, records, merge):
+    model, _ = MODELS[name]
+    # Каждая пачка - своя транзакция: прерванную загрузку можно
+    # дозагрузить с merge, уже вставленные строки будут пропущены.
+    with transaction.atomic():
+        if merge:
+            taken = conflicts(name, records)
+            if taken:
+                raise ValueError(
+                    f'{name}: id {", ".join(map(str, taken[:10]))} '
+                    'уже заняты другими объектами.')
+        model.objects.bulk_create(
+            [model(**record) for record in records], ignore_conflicts=merge)
+
+
+def load(lines, chunk_size, merge=False):
+    """
+    Вставляет объекты из строк NDJSON пачками по chunk_size.
+
+    Без merge база должна быть пустой. С merge объекты, которые уже
+    есть в базе, пропускаются, а занятый другим объектом id - ошибка.
+    Возвращает число строк по типам; ValueError - строка с ошибкой или
+    конфликт.
+    """
+    if not merge and not is_empty():
+        raise ValueError('База не пуста; дозагрузка - только с --merge.')
+    counts = dict.fromkeys(MODELS, 0)
+    batch = []
+    batch_name = None
+    with explicit_dates():
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                name = record.pop('type')
+                _, fields = MODELS[name]
+                if 'id' not in record:
+                    raise KeyError('id')
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise ValueError(f'Строка {number}: неизвестный объект.')
+            if name != batch_name or len(batch) >= chunk_size:
+                if batch:
+                    insert(batch_name, batch, merge)
+                batch, batch_name = [], name
+            batch.append({
+                field: record[field] for field in fields if field in record
+            })
+            counts[name] += 1
+        if batch:
+            insert(batch_name, batch, merge)
+    return counts
+
+
+def finish():
+    """Пересчитывает все, что обычно поддерживают сигналы."""
+    models = [model for _, model, _ in TYPES]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+    counters.reconcile()
+    feeds.rebuild_timeline()
+    fulltext.rebuild()
+    # Поколения, кэшированные COUNT(*) и списки знаменитостей устарели
+    cache.clear()
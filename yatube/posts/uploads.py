@@ -0,0 +1,53 @@
+"""
+Нормализация загруженных картинок постов.
+
+Картинка поворачивается по EXIF, теряет метаданные (кроме цветового
+профиля) и уменьшается до POST_IMAGE_MAX_SIDE по большей стороне.
+Форматы, которые Pillow не умеет пересохранить без потерь смысла
+(GIF с анимацией и прочие), сохраняются как есть.
+"""
+import io
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+# Формат файла: формат, в котором он пересохраняется
+NORMALIZED_FORMATS = {
+    'JPEG': 'JPEG',
+    'MPO': 'JPEG',
+    'PNG': 'PNG',
+    'WEBP': 'WEBP',
+}
+
+
+def save_options(image_format):
+    quality = settings.POST_IMAGE_QUALITY
+    if image_format == 'JPEG':
+        return {'quality': quality, 'optimize': True, 'progressive': True}
+    if image_format == 'WEBP':
+        return {'quality': quality}
+    return {'optimize': True}
+
+
+def normalize(upload):
+    """Возвращает нормализованную копию загрузки или ее саму."""
+    upload.seek(0)
+    image = Image.open(upload)
+    image_format = NORMALIZED_FORMATS.get(image.format)
+    if image_format is None:
+        upload.seek(0)
+        return upload
+    side = settings.POST_IMAGE_MAX_SIDE
+    # thumbnail() сам включает draft у JPEG, поэтому поворот после него
+    image.thumbnail((side, side), Image.LANCZOS)
+    image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    options = save_options(image_format)
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return SimpleUploadedFile(
+        upload.name, buffer.getvalue(), Image.MIME[image_format])
@@ -1,86 +1,183 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_GET, require_http_methods
+from django.utils.http import urlencode
+from django.views.decorators.http import require_http_methods
 
+from core.paginator import CursorPaginator
+from core.querybudget import query_budget
+from core.replicas import require_GET
+
+from . import (counters, feeds, fulltext, generations, media, thumbnails,
+               writes)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Deletion, Follow, Group, Post, User
+
+POSTS_PER_PAGE = 10
+POSTS_ORDERING = ('-pub_date', '-id')
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+COMMENTS_PER_PAGE = 20
+COMMENTS_ORDERING = ('-created', '-id')
+
+
+def get_page_obj(request, posts, ordering=POSTS_ORDERING, merge=None,
+                 count_key=None):
+    """Курсорная страница ленты; `?page=N` - для старых ссылок."""
+    paginator = CursorPaginator(
+        posts, POSTS_PER_PAGE, ordering=ordering, merge=merge,
+        count_key=count_key, count_timeout=settings.PAGINATOR_COUNT_TIMEOUT)
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        return paginator.get_page(page_number)
+    return paginator.get_cursor_page(request.GET.get('cursor'))
 
 
+def get_comments_page(request, post):
+    """Страница комментариев поста по курсору, от новых к старым."""
+    paginator = CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_PER_PAGE,
+        ordering=COMMENTS_ORDERING)
+    return paginator.get_cursor_page(request.GET.get('cursor'))
+
+
+def cache_context(*scopes):
+    """TTL и поколения кэша для фрагментов ленты."""
+    return {
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'cache_version': generations.version(*scopes),
+    }
+
+
+@query_budget(6)
 @require_GET
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related('author', 'group')
+    cache_options = cache_context((generations.GLOBAL,))
+    page_obj = get_page_obj(
+        request, posts, count_key=cache_options['cache_version'])
+    thumbnails.prefetch(page_obj)
     context = {
         'page_obj': page_obj,
+        **cache_options,
     }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(7)
 @require_GET
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.select_related('author')
+    cache_options = cache_context((generations.GROUP, group.id))
+    page_obj = get_page_obj(
+        request, posts, count_key=cache_options['cache_version'])
+    thumbnails.prefetch(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
         'posts': posts,
+        **cache_options,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(9)
 @require_GET
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.exclude(pk__in=Deletion.scheduled(Deletion.USER)),
+        username=username)
+    posts = author.posts.select_related('group')
     following = (
         request.user.is_authenticated
         and request.user != author
         and Follow.objects.filter(user=request.user, author=author).exists()
     )
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    cache_options = cache_context((generations.AUTHOR, author.id))
+    page_obj = get_page_obj(
+        request, posts, count_key=cache_options['cache_version'])
+    thumbnails.prefetch(page_obj)
     context = {
         'author': author,
         'posts': posts,
         'page_obj': page_obj,
-        'count_posts': paginator.count,
-        'following': following
+        'stats': counters.get_stats(author),
+        'following': following,
+        **cache_options,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(8)
 @require_GET
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    comments = get_comments_page(request, post)
+    thumbnails.prefetch([post])
     author = post.author
-    count_posts = author.posts.count()
     form = CommentForm(request.POST)
     context = {
         'comments': comments,
         'form': form,
         'post': post,
-        'count_posts': count_posts,
-        'author': author
+        'stats': counters.get_stats(author),
+        'author': author,
+        **cache_context((generations.POST, post.id)),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@query_budget(4)
+@require_GET
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев для подгрузки."""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comments_page(request, post),
+        **cache_context((generations.POST, post.id)),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
+@query_budget(6)
+@require_GET
+def search(request):
+    """Поиск по текстам постов и комментариев, по релевантности."""
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(fulltext.SearchResults(query), POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    thumbnails.prefetch(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@query_budget(16)
 @require_http_methods(['GET', 'POST'])
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
-        post.author = request.user
-        post.save()
+        image = post.image
+        # Файл сохраняет воркер, процессу записи уходит только имя
+        if image and not image._committed:
+            image.save(image.name, image.file, save=False)
+        try:
+            writes.create_post(
+                author_id=request.user.id, text=post.text,
+                group_id=post.group_id, image=image.name or '')
+        except Exception:
+            # Пост не создан: на файл никто не сослался
+            media.discard(image.name)
+            raise
+        thumbnails.schedule(image)
         return redirect('posts:profile', request.user)
     context = {
         'form': form,
@@ -88,6 +185,7 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(20)
 @require_http_methods(['GET', 'POST'])
 @login_required
 def post_edit(request, post_id):
@@ -100,7 +198,10 @@ def post_edit(request, post_id):
     if request.user != post.author:
         return redirect('posts:post_detail', post_id)
     if form.is_valid():
-        post.save()
+        # Счетчики обновляются через F(), их нельзя перезаписывать.
+        post.save(update_fields=PostForm.Meta.fields)
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -110,39 +211,53 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(8)
 @login_required
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     post = get_object_or_404(Post, pk=post_id)
     if form.is_valid():
-        comment = form.save(commit=False)
-        comment.author = request.user
-        comment.post = post
-        comment.save()
+        writes.add_comment(
+            post_id=post.id, author_id=request.user.id,
+            text=form.cleaned_data['text'])
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(8)
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'page_obj': page_obj}
+    entries = feeds.timeline_entries(request.user)
+    cache_options = cache_context(
+        (generations.GLOBAL,), (generations.FOLLOWER, request.user.id))
+    page_obj = get_page_obj(
+        request, entries, ordering=TIMELINE_ORDERING,
+        merge=feeds.celebrity_merge(request.user),
+        count_key=cache_options['cache_version']
+    )
+    page_obj.object_list = [entry.post for entry in page_obj.object_list]
+    thumbnails.prefetch(page_obj)
+    context = {
+        'page_obj': page_obj,
+        **cache_options,
+    }
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(14)
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.exclude(pk__in=Deletion.scheduled(Deletion.USER)),
+        username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        writes.follow(user_id=request.user.id, author_id=author.id)
     return redirect('posts:profile', username=username)
 
 
+@query_budget(12)
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.filter(user=request.user, author=author).delete()
+        writes.unfollow(user_id=request.user.id, author_id=author.id)
     return redirect('posts:profile', username=username)
@@ -0,0 +1,39 @@
+"""
+Записи, которые представления отдают процессу записи (core.writer).
+
+Проверки форм и прав остаются в представлениях; сюда приходят только
+готовые значения. Сигналы моделей (счетчики, ленты, индекс поиска,
+поколения кэша) срабатывают в процессе, который выполняет операцию.
+"""
+from core.writer import operation
+
+from .models import Comment, Follow, Post
+
+
+@operation
+def create_post(author_id, text, group_id=None, image=''):
+    """Создает пост и возвращает его id."""
+    return Post.objects.create(
+        author_id=author_id, text=text, group_id=group_id, image=image).pk
+
+
+@operation
+def add_comment(post_id, author_id, text):
+    """Добавляет комментарий и возвращает его id."""
+    return Comment.objects.create(
+        post_id=post_id, author_id=author_id, text=text).pk
+
+
+@operation
+def follow(user_id, author_id):
+    """Подписывает пользователя; True - подписка новая."""
+    return Follow.objects.get_or_create(
+        user_id=user_id, author_id=author_id)[1]
+
+
+@operation
+def unfollow(user_id, author_id):
+    """Отписывает пользователя; True - подписка была."""
+    deleted, _ = Follow.objects.filter(
+        user_id=user_id, author_id=author_id).delete()
+    return bool(deleted)
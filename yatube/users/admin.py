@@ -0,0 +1,15 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts.admin import DeferredDeleteMixin
+
+User = get_user_model()
+
+
+class DeferredDeleteUserAdmin(DeferredDeleteMixin, UserAdmin):
+    pass
+
+
+admin.site.unregister(User)
+admin.site.register(User, DeferredDeleteUserAdmin)
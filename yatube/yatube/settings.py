@@ -27,6 +27,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'testserver', '[::1]', ]
 
+# С этих адресов доступна страница /metrics
+INTERNAL_IPS = ['127.0.0.1', '::1']
+
 
 # Application definition
 
@@ -45,6 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # первым, чтобы в замер попали все остальные
+    'core.metrics.MetricsMiddleware',
+    'core.querybudget.QueryBudgetMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,7 +67,10 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # стандартный бэкенд с замером времени отрисовки для метрик
+        'BACKEND': 'core.metrics.DjangoTemplates',
+        # алиас по умолчанию берется из пути бэкенда, оставляем прежний
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,12 +91,56 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.db - sqlite3 с PRAGMA при подключении и проверкой постоянных
+# подключений
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.db',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        # подключение живет между запросами воркера
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'pragmas': {
+                # читатели не ждут писателя
+                'journal_mode': 'WAL',
+                # в WAL безопасно: при сбое питания теряется только
+                # последняя транзакция, но не целостность
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                # в КиБ, если значение отрицательное
+                'cache_size': -64 * 1024,
+                # мс ожидания блокировки вместо «database is locked»
+                'busy_timeout': 5000,
+                'temp_store': 'MEMORY',
+            },
+            # транзакции сразу берут блокировку записи
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Снимок основной базы (manage.py refresh_replicas) для чтений
+    # в представлениях с core.replicas.require_GET
+    'replica': {
+        'ENGINE': 'core.db',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'pragmas': {
+                'query_only': 1,
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+                'busy_timeout': 5000,
+            },
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
 }
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+DATABASE_REPLICAS = ['replica']
+# Реплика старше этого числа секунд не используется
+REPLICA_MAX_LAG = 10
+REPLICA_REFRESH_INTERVAL = 1
+# Сколько секунд после записи чтения пользователя идут в основную базу
+REPLICA_PIN_SECONDS = 15
 
 
 # Password validation
@@ -147,7 +201,92 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
+    # LRU воркера (L1) перед общим кэшем 'shared' (L2) с защитой
+    # от одновременной пересборки истекших записей
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.tiered.TieredCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_TIMEOUT': 2,
+            'L1_MAX_ENTRIES': 512,
+            # сколько секунд после срока отдавать старое значение,
+            # пока запись пересобирает другой запрос
+            'GRACE': 60,
+            # поколения меняют через incr другие процессы: только из L2
+            'L2_ONLY': ('gen:',),
+        },
+    },
+    # Общий для всех воркеров машины кэш в отображенном в память файле
+    'shared': {
+        'BACKEND': 'core.cache.shared.SharedMemoryCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'shared.bin'),
+        'OPTIONS': {
+            # размер слота в байтах: число слотов
+            'SLABS': {1024: 4096, 4096: 2048, 16384: 1024, 65536: 256},
+        },
+    },
 }
+
+# Тесты открывают общий кэш и пишут метрики во временном каталоге,
+# а не в файлах работающего сайта
+TEST_RUNNER = 'core.testing.TestRunner'
+
+# Фрагменты лент сбрасываются сменой поколения, а не по времени
+FEED_CACHE_TIMEOUT = 60 * 60 * 4
+# Число постов для номерных страниц тоже привязано к поколению ленты
+PAGINATOR_COUNT_TIMEOUT = FEED_CACHE_TIMEOUT
+# Число строк в списках админки может немного отставать
+ADMIN_COUNT_TIMEOUT = 60
+
+# Загруженные картинки пересохраняются без метаданных и не больше
+# этого размера по большей стороне
+POST_IMAGE_MAX_SIDE = 2560
+POST_IMAGE_QUALITY = 85
+
+# Миниатюры готовит пул потоков после загрузки картинки, JPEG
+# декодируется сразу в уменьшенном масштабе (draft mode)
+THUMBNAIL_ENGINE = 'posts.thumbnails.DraftEngine'
+# Метаданные миниатюр страницы читаются одним пакетом
+THUMBNAIL_KVSTORE = 'posts.thumbnails.BatchKVStore'
+THUMBNAIL_WORKERS = 2
+
+# Размер пачки при раскладке постов по лентам подписчиков
+TIMELINE_BATCH_SIZE = 500
+# С этого числа подписчиков посты автора не раскладываются по лентам,
+# а подмешиваются при чтении из кэша последних постов
+TIMELINE_CELEBRITY_THRESHOLD = 10000
+# Обратно автора переводят, только когда подписчиков меньше этой доли
+# порога: у границы он не переключается на каждой подписке. Ленты его
+# подписчиков дописывает пачками `manage.py demote_celebrities`
+TIMELINE_CELEBRITY_DEMOTE_RATIO = 0.8
+TIMELINE_CELEBRITY_RECENT_POSTS = 200
+
+# Каждый процесс сбрасывает свои метрики в файл этого каталога не чаще
+# раза в METRICS_FLUSH_INTERVAL секунд; /metrics складывает все файлы
+METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+METRICS_FLUSH_INTERVAL = 5
+
+# В разработке и тестах запросы сверяются с бюджетами представлений
+# (@query_budget), а повторяющиеся запросы пишутся в лог
+QUERY_BUDGET_CHECKS = DEBUG
+QUERY_REPEAT_THRESHOLD = 3
+# Переопределение бюджетов по имени маршрута: {'posts:index': 12}
+QUERY_BUDGETS = {}
+
+# Единственный процесс записи (manage.py run_writer): если задан сокет,
+# посты, комментарии и подписки пишутся через него пачками. Без сокета
+# или без запущенного процесса воркеры пишут сами
+WRITER_SOCKET = None
+WRITER_BATCH_SIZE = 64
+# сколько секунд собирать пачку после первой операции
+WRITER_BATCH_WAIT = 0.002
+WRITER_TIMEOUT = 30
+# Сколько секунд хранить токены выполненных операций: повтор после
+# потерянного ответа приходит намного раньше
+WRITER_TOKEN_TTL = 60 * 60
+
+# Удаление пользователя, поста или группы скрывает строку сразу, а
+# зависимые строки удаляет manage.py reap_deleted пачками по
+# REAP_BATCH_SIZE с паузой REAP_PAUSE секунд между ними
+REAP_BATCH_SIZE = 500
+REAP_PAUSE = 0.05